@@ -1,35 +1,95 @@
-from flask import Flask, request, jsonify, make_response
+import time
+
+# Reference point for the startup timing report
+BOOT_STARTED = time.time()
+
+from flask import (
+    Flask,
+    Response,
+    json,
+    jsonify,
+    make_response,
+    request,
+    send_file,
+    stream_with_context,
+)
 import joblib
 import pandas as pd
 import numpy as np
 import os
 import logging
+import log_config
 from flask_cors import CORS
-from pymongo import MongoClient
-from bson.objectid import ObjectId
-from transformers import (
-    AutoTokenizer,
-    AutoModelForSequenceClassification,
-    DistilBertTokenizer,
-    DistilBertForSequenceClassification,
-)
-import torch
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 import io
-from datetime import datetime
+import threading
+from feature_encoding import (
+    FEATURE_COLUMNS,
+    FEATURE_RENAME_MAP,
+    FeatureEncoder,
+    encoder_paths,
+    feature_source_keys,
+)
+from feedback_ingest import (
+    GENERAL_REQUIRED_COLUMNS,
+    SURVEY_REQUIRED_COLUMNS,
+    FeedbackIngestor,
+    missing_columns,
+)
+from forest_engine import CompiledForest
+from jobs import JobManager
+import metrics
+from micro_batcher import MicroBatcher
+from model_registry import registry as model_registry
+from mongo_connection import ForkSafeMongo
+from prefork import memory_report
+import profiling
+from response_cache import ResponseCache
+from risk_scoring import (
+    INTERNAL_FIELDS,
+    RiskDriverStore,
+    RiskScoreStore,
+    file_fingerprint,
+    top_drivers,
+)
+from scenarios import ScenarioBuilder
+from sentiment_cache import SentimentCache
+from sentiment_dashboard import (
+    empty_response,
+    sentiment_filters,
+    sentiment_pipeline,
+    sentiment_response,
+    summary_from_facets,
+)
+from sentiment_rollups import SentimentRollups
 
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "http://localhost:3000"}})
+metrics.instrument_flask(app)
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
+# Set up logging: records go through a bounded queue to a background writer,
+# so request threads never wait on stderr (see log_config)
+log_config.configure_logging()
 logger = logging.getLogger(__name__)
 
-# MongoDB connection
+# MongoDB connection. Collections are fork-safe proxies: a prefork worker
+# opens its own client instead of reusing the one the parent booted with
 try:
-    client = MongoClient("mongodb://localhost:27017/")
-    db = client["prescient"]
-    employees_collection = db["employees"]
-    sentiment_collection = db["sentimentfeedbacks"]  # New collection for feedback
+    mongo = ForkSafeMongo(
+        "mongodb://localhost:27017/",
+        "prescient",
+        event_listeners=[metrics.MongoCommandTimer(), profiling.MongoCommandTally()],
+    )
+    mongo.client
+    employees_collection = mongo.collection("employees")
+    sentiment_collection = mongo.collection("sentimentfeedbacks")  # New collection for feedback
+    sentiment_cache_collection = mongo.collection("sentimentcache")
+    sentiment_rollup_collection = mongo.collection("sentimentrollups")
+    sentiment_employee_rollup_collection = mongo.collection("sentimentemployeerollups")
+    sentiment_rollup_meta_collection = mongo.collection("sentimentrollupmeta")
+    jobs_collection = mongo.collection("jobs")
+    job_results_collection = mongo.collection("jobresults")
     logger.info("Connected to MongoDB successfully")
 except Exception as e:
     logger.error(f"Error connecting to MongoDB: {e}")
@@ -39,138 +99,456 @@ except Exception as e:
 MODEL_PATH = "../rf_attrition_model.pkl"
 ENCODERS_PATH = "../Encoders/"
 BERT_MODEL_PATH = "../bert_model/"
+BERT_INT8_PATH = "../bert_model_int8/"
+SST2_MODEL_NAME = "distilbert-base-uncased-finetuned-sst-2-english"
 
-# Load the trained Random Forest model
-try:
-    model = joblib.load(MODEL_PATH)
-    logger.info("Model loaded successfully")
-except Exception as e:
-    logger.error(f"Error loading model: {e}")
-    raise
+# Per-prediction info logs are sampled: one in LOG_SAMPLE_EVERY is written
+LOG_SAMPLE_EVERY = int(os.environ.get("LOG_SAMPLE_EVERY", 100))
 
-# Load label encoders
-try:
-    encoders = {}
-    for col in [
-        "JobRole",
-        "Department",
-        "BusinessTravel",
-        "Gender",
-        "OverTime",
-        "MaritalStatus",
-        "EducationField",
-    ]:
-        encoders[col] = joblib.load(
-            os.path.join(ENCODERS_PATH, f"label_encoder_{col.lower()}.pkl")
-        )
-    logger.info("Encoders loaded successfully")
-except Exception as e:
-    logger.error(f"Error loading encoders: {e}")
-    raise
+# Employee listing: page size cap and Mongo cursor batch size for NDJSON streaming
+EMPLOYEE_PAGE_MAX_LIMIT = int(os.environ.get("EMPLOYEE_PAGE_MAX_LIMIT", 1000))
+EMPLOYEE_STREAM_BATCH_SIZE = int(os.environ.get("EMPLOYEE_STREAM_BATCH_SIZE", 500))
+
+# /predict/bulk: rows scored and written per chunk
+PREDICT_BULK_CHUNK_SIZE = int(os.environ.get("PREDICT_BULK_CHUNK_SIZE", 1000))
+
+# /api/employees/drivers: drivers stored per employee, and most employees
+# explained per request
+RISK_DRIVERS_STORED = int(os.environ.get("RISK_DRIVERS_STORED", 10))
+RISK_DRIVERS_MAX_EMPLOYEES = int(os.environ.get("RISK_DRIVERS_MAX_EMPLOYEES", 10000))
+
+# /api/employees/at-risk: largest K a caller may ask for
+TOP_RISK_MAX_K = int(os.environ.get("TOP_RISK_MAX_K", 500))
+
+# /predict/scenarios: most variants (base row included) scored per request
+SCENARIO_MAX_VARIANTS = int(os.environ.get("SCENARIO_MAX_VARIANTS", 20000))
+
+# Random Forest inference engine for this process: "sklearn" or "compiled"
+RF_INFERENCE_ENGINE = os.environ.get("RF_INFERENCE_ENGINE", "sklearn").lower()
+
+# Sentiment batching: texts per forward pass and padded-token budget per batch
+SENTIMENT_BATCH_SIZE = int(os.environ.get("SENTIMENT_BATCH_SIZE", 32))
+SENTIMENT_MAX_TOKENS_PER_BATCH = int(
+    os.environ.get("SENTIMENT_MAX_TOKENS_PER_BATCH", 16384)
+)
+
+# /analyze-sentiment BERT precision: "fp32" or "int8" (dynamic quantization of
+# the Linear layers; run quantization.py for its agreement with fp32)
+SENTIMENT_BERT_PRECISION = os.environ.get("SENTIMENT_BERT_PRECISION", "fp32").lower()
+
+# Sentiment score cache: in-process LRU size and MongoDB tier retention
+SENTIMENT_CACHE_MAX_ENTRIES = int(os.environ.get("SENTIMENT_CACHE_MAX_ENTRIES", 50000))
+SENTIMENT_CACHE_TTL_DAYS = int(os.environ.get("SENTIMENT_CACHE_TTL_DAYS", 90))
+
+# /sentiment reads the materialized rollups once they have been rebuilt
+# (python sentiment_rollups.py rebuild); "0" forces the live aggregation
+SENTIMENT_ROLLUPS_ENABLED = os.environ.get("SENTIMENT_ROLLUPS_ENABLED", "1") == "1"
+
+# Read endpoint response cache: entry bound and maximum age in seconds
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 256))
+RESPONSE_CACHE_TTL_SECONDS = float(os.environ.get("RESPONSE_CACHE_TTL_SECONDS", 30))
+
+# /predict micro-batching (opt-in): concurrent calls are scored together,
+# waiting at most PREDICT_BATCH_WINDOW_MS for up to PREDICT_BATCH_MAX_SIZE rows
+PREDICT_BATCHING = os.environ.get("PREDICT_BATCHING", "0") == "1"
+PREDICT_BATCH_MAX_SIZE = int(os.environ.get("PREDICT_BATCH_MAX_SIZE", 32))
+PREDICT_BATCH_WINDOW_MS = float(os.environ.get("PREDICT_BATCH_WINDOW_MS", 2))
+
+# Background jobs (?async=1 uploads): job store ("mongo" or "memory"), pool
+# size, rows per progress step and how long finished jobs stay queryable
+JOB_STORE = os.environ.get("JOB_STORE", "mongo").lower()
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+FEEDBACK_JOB_CHUNK_SIZE = int(os.environ.get("FEEDBACK_JOB_CHUNK_SIZE", 256))
+JOB_RETENTION_HOURS = int(os.environ.get("JOB_RETENTION_HOURS", 24))
+
+# On-demand profiling: requests carrying PROFILE_ADMIN_TOKEN in X-Profile (or
+# ?profile=) and a PROFILE_SAMPLE_RATE share of all requests are profiled.
+# Both unset (the default) leaves request handling untouched. /profiles needs
+# the token when one is set, and is open when only sampling is configured
+PROFILE_ADMIN_TOKEN = os.environ.get("PROFILE_ADMIN_TOKEN")
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "../profiles/")
+PROFILE_MAX_CAPTURES = int(os.environ.get("PROFILE_MAX_CAPTURES", 50))
+
+request_profiler = profiling.RequestProfiler(
+    PROFILE_DIR,
+    token=PROFILE_ADMIN_TOKEN,
+    sample_rate=PROFILE_SAMPLE_RATE,
+    max_captures=PROFILE_MAX_CAPTURES,
+)
+profiling.instrument_flask(app, request_profiler)
+
+response_cache = ResponseCache(
+    max_entries=RESPONSE_CACHE_MAX_ENTRIES, ttl_seconds=RESPONSE_CACHE_TTL_SECONDS
+)
+
+job_manager = JobManager(
+    jobs_collection if JOB_STORE == "mongo" else None,
+    max_workers=JOB_WORKERS,
+    retention_hours=JOB_RETENTION_HOURS,
+    results_collection=job_results_collection,
+)
+
+# Every model is a registry entry: it loads in the background at boot (see
+# start_background_loading) or on first use, and a route only waits for the
+# models it needs
+ENCODER_PATHS = encoder_paths(ENCODERS_PATH)
+
+
+def load_rf_model():
+    return joblib.load(MODEL_PATH)
+
+
+def load_feature_encoder():
+    # Built from the label encoders and verified against the original per-cell
+    # preprocessing, so a drift in encoder files can never silently change scores
+    encoders = {col: joblib.load(path) for col, path in ENCODER_PATHS.items()}
+    feature_encoder = FeatureEncoder(encoders, FEATURE_COLUMNS)
+    if not feature_encoder.verify(feature_encoder.sample_frame()):
+        raise RuntimeError("FeatureEncoder output differs from reference preprocessing")
+    return feature_encoder
+
+
+def load_compiled_forest():
+    # Optional array-backed forest for low-latency single-row and small-batch scoring
+    forest = CompiledForest.from_sklearn(model_registry.get("rf_model"))
+    feature_encoder = model_registry.get("feature_encoder")
+    if not forest.matches(feature_encoder.transform(feature_encoder.sample_frame())):
+        raise RuntimeError("Compiled forest output differs from sklearn")
+    return forest
+
+
+# transformers and torch are only imported by the sentiment loaders, so they
+# never delay the attrition routes
+def load_local_bert():
+    from sentiment_engine import SentimentScorer, checkpoint_revision
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
 
-# Load BERT model and tokenizer
-try:
     tokenizer = AutoTokenizer.from_pretrained(BERT_MODEL_PATH)
     bert_model = AutoModelForSequenceClassification.from_pretrained(BERT_MODEL_PATH)
-    logger.info("BERT model and tokenizer loaded successfully")
-except Exception as e:
-    logger.error(f"Error loading BERT model: {e}")
-    raise
+    return SentimentScorer(
+        tokenizer,
+        bert_model,
+        batch_size=SENTIMENT_BATCH_SIZE,
+        max_tokens_per_batch=SENTIMENT_MAX_TOKENS_PER_BATCH,
+        model_id=f"bert_local@{checkpoint_revision(BERT_MODEL_PATH)}",
+    )
+
+
+def load_local_bert_int8():
+    from quantization import quantized_checkpoint
+    from sentiment_engine import SentimentScorer, checkpoint_revision
+    from transformers import AutoTokenizer
+
+    revision = checkpoint_revision(BERT_MODEL_PATH)
+    tokenizer = AutoTokenizer.from_pretrained(BERT_MODEL_PATH)
+    bert_model = quantized_checkpoint(BERT_MODEL_PATH, BERT_INT8_PATH, revision)
+    return SentimentScorer(
+        tokenizer,
+        bert_model,
+        batch_size=SENTIMENT_BATCH_SIZE,
+        max_tokens_per_batch=SENTIMENT_MAX_TOKENS_PER_BATCH,
+        model_id=f"bert_local@{revision}:int8",
+    )
+
+
+def load_sst2_distilbert():
+    from sentiment_engine import SentimentScorer
+    from transformers import DistilBertForSequenceClassification, DistilBertTokenizer
+
+    tokenizer = DistilBertTokenizer.from_pretrained(SST2_MODEL_NAME)
+    distilbert_model = DistilBertForSequenceClassification.from_pretrained(
+        SST2_MODEL_NAME
+    )
+    return SentimentScorer(
+        tokenizer,
+        distilbert_model,
+        batch_size=SENTIMENT_BATCH_SIZE,
+        max_tokens_per_batch=SENTIMENT_MAX_TOKENS_PER_BATCH,
+        model_id=SST2_MODEL_NAME,
+    )
+
+
+model_registry.register("rf_model", load_rf_model)
+model_registry.register("feature_encoder", load_feature_encoder)
+model_registry.register("compiled_forest", load_compiled_forest)
+model_registry.register("bert_local", load_local_bert)
+model_registry.register("bert_local_int8", load_local_bert_int8)
+model_registry.register("sst2_distilbert", load_sst2_distilbert)
+
+sentiment_cache = SentimentCache(
+    sentiment_cache_collection,
+    max_entries=SENTIMENT_CACHE_MAX_ENTRIES,
+    ttl_days=SENTIMENT_CACHE_TTL_DAYS,
+)
+
+
+GENERAL_SENTIMENT_MODEL = (
+    "bert_local_int8" if SENTIMENT_BERT_PRECISION == "int8" else "bert_local"
+)
+
+
+# Models the feedback routes actually use, for warm-up
+SERVING_SENTIMENT_MODELS = [GENERAL_SENTIMENT_MODEL, "sst2_distilbert"]
+
+
+def score_general_feedback(texts):
+    # /analyze-sentiment scores with the local BERT checkpoint
+    return sentiment_cache.predict_proba(model_registry.get(GENERAL_SENTIMENT_MODEL), texts)
 
-FEATURE_COLUMNS = [
-    "Age",
-    "BusinessTravel",
-    "DailyRate",
-    "Department",
-    "DistanceFromHome",
-    "Education",
-    "EducationField",
-    "EnvironmentSatisfaction",
-    "Gender",
-    "HourlyRate",
-    "JobInvolvement",
-    "JobLevel",
-    "JobRole",
-    "JobSatisfaction",
-    "MaritalStatus",
-    "MonthlyIncome",
-    "MonthlyRate",
-    "NumCompaniesWorked",
-    "OverTime",
-    "PercentSalaryHike",
-    "PerformanceRating",
-    "RelationshipSatisfaction",
-    "StockOptionLevel",
-    "TotalWorkingYears",
-    "TrainingTimesLastYear",
-    "WorkLifeBalance",
-    "YearsAtCompany",
-    "YearsInCurrentRole",
-    "YearsSinceLastPromotion",
-    "YearsWithCurrManager",
-]
+
+def score_survey_feedback(texts):
+    # /upload-feedback scores with the SST-2 DistilBERT
+    return sentiment_cache.predict_proba(model_registry.get("sst2_distilbert"), texts)
+
+
+sentiment_rollups = SentimentRollups(
+    sentiment_rollup_collection,
+    sentiment_employee_rollup_collection,
+    sentiment_rollup_meta_collection,
+    feedback_source=sentiment_collection,
+    employee_source=employees_collection,
+)
+
+feedback_ingestor = FeedbackIngestor(
+    employees_collection,
+    sentiment_collection,
+    score_general_feedback,
+    score_survey_feedback,
+    rollups=sentiment_rollups,
+)
+
+
+def encode_features(df):
+    return model_registry.get("feature_encoder").transform(df)
 
 
 def preprocess_data(df):
-    df = df.copy()
-    rename_map = {
-        "age": "Age",
-        "businessTravel": "BusinessTravel",
-        "dailyRate": "DailyRate",
-        "department": "Department",
-        "distanceFromHome": "DistanceFromHome",
-        "education": "Education",
-        "educationField": "EducationField",
-        "environmentSatisfaction": "EnvironmentSatisfaction",
-        "gender": "Gender",
-        "hourlyRate": "HourlyRate",
-        "jobInvolvement": "JobInvolvement",
-        "jobLevel": "JobLevel",
-        "jobRole": "JobRole",
-        "jobSatisfaction": "JobSatisfaction",
-        "maritalStatus": "MaritalStatus",
-        "monthlyIncome": "MonthlyIncome",
-        "monthlyRate": "MonthlyRate",
-        "numCompaniesWorked": "NumCompaniesWorked",
-        "overTime": "OverTime",
-        "percentSalaryHike": "PercentSalaryHike",
-        "performanceRating": "PerformanceRating",
-        "relationshipSatisfaction": "RelationshipSatisfaction",
-        "stockOptionLevel": "StockOptionLevel",
-        "totalWorkingYears": "TotalWorkingYears",
-        "trainingTimesLastYear": "TrainingTimesLastYear",
-        "workLifeBalance": "WorkLifeBalance",
-        "yearsAtCompany": "YearsAtCompany",
-        "yearsInCurrentRole": "YearsInCurrentRole",
-        "yearsSinceLastPromotion": "YearsSinceLastPromotion",
-        "yearsWithCurrManager": "YearsWithCurrManager",
-    }
-    df = df.rename(columns=rename_map)
+    feature_encoder = model_registry.get("feature_encoder")
+    with metrics.stage("preprocess"):
+        return feature_encoder.to_frame(feature_encoder.transform(df))
 
-    for col in encoders:
-        if col in df.columns:
-            df[col] = df[col].apply(
-                lambda x: (
-                    x if x in encoders[col].classes_ else encoders[col].classes_[0]
-                )
+
+def compiled_forest():
+    # None (score with sklearn) unless the compiled engine is enabled and built
+    if RF_INFERENCE_ENGINE != "compiled":
+        return None
+    if model_registry.state("compiled_forest") == "failed":
+        return None
+    try:
+        return model_registry.get("compiled_forest")
+    except Exception:
+        logger.error("Compiled Random Forest unavailable, falling back to sklearn")
+        return None
+
+
+def predict_attrition_proba(features):
+    # features is the frame returned by preprocess_data
+    forest = compiled_forest()
+    if forest is not None:
+        name, predict, rows = "rf_compiled", forest.predict_proba, features.to_numpy(dtype=np.float64)
+    else:
+        name, predict, rows = "rf_sklearn", model_registry.get("rf_model").predict_proba, features
+    start = time.perf_counter()
+    with metrics.stage("predict_proba"):
+        probabilities = predict(rows)
+    metrics.observe_model(name, time.perf_counter() - start, len(features))
+    return probabilities
+
+
+def score_attrition_risk(records):
+    probabilities = predict_attrition_proba(preprocess_data(pd.DataFrame(records)))
+    return [round(probability[1] * 100, 2) for probability in probabilities]
+
+
+# Stored attritionRisk values are stamped with the model version and a hash of
+# the features they were computed from, so reads only rescore what changed
+RF_MODEL_VERSION = os.environ.get("RF_MODEL_VERSION") or file_fingerprint(
+    [MODEL_PATH] + list(ENCODER_PATHS.values())
+)
+risk_store = RiskScoreStore(
+    employees_collection,
+    score_attrition_risk,
+    RF_MODEL_VERSION,
+    [key for keys in feature_source_keys(FEATURE_COLUMNS).values() for key in keys],
+)
+logger.info(f"Attrition model version {RF_MODEL_VERSION}")
+
+# Drivers are reported under the camelCase names employee documents use
+DRIVER_FEATURE_NAMES = [
+    {target: source for source, target in FEATURE_RENAME_MAP.items()}.get(col, col)
+    for col in FEATURE_COLUMNS
+]
+
+
+def explain_attrition_risk(docs):
+    # Decision-path contributions from the flattened forest; rows with a
+    # missing feature get None
+    features = model_registry.get("feature_encoder").transform_records(docs)
+    complete = ~np.isnan(features).any(axis=1)
+    drivers = [None] * len(docs)
+    if complete.any():
+        start = time.perf_counter()
+        with metrics.stage("explain"):
+            _, contributions = model_registry.get("compiled_forest").contributions(
+                features[complete]
             )
-            df[col] = encoders[col].transform(df[col])
+        metrics.observe_model(
+            "rf_contributions", time.perf_counter() - start, int(complete.sum())
+        )
+        ranked = top_drivers(contributions, DRIVER_FEATURE_NAMES, RISK_DRIVERS_STORED)
+        for index, row in zip(np.flatnonzero(complete), ranked):
+            drivers[index] = row
+    return drivers
+
+
+driver_store = RiskDriverStore(employees_collection, explain_attrition_risk, risk_store)
+
+
+def predict_records_proba(records):
+    # One encoder pass and one predict_proba call for a list of /predict payloads
+    feature_encoder = model_registry.get("feature_encoder")
+    with metrics.stage("preprocess"):
+        features = feature_encoder.to_frame(feature_encoder.transform_records(records))
+    return predict_attrition_proba(features)
+
+
+predict_batcher = (
+    MicroBatcher(
+        predict_records_proba,
+        max_batch_size=PREDICT_BATCH_MAX_SIZE,
+        max_wait_ms=PREDICT_BATCH_WINDOW_MS,
+    )
+    if PREDICT_BATCHING
+    else None
+)
+
+ATTRITION_MODELS = ["rf_model", "feature_encoder"] + (
+    ["compiled_forest"] if RF_INFERENCE_ENGINE == "compiled" else []
+)
+
+# Models loaded in parallel at boot; BOOT_MODELS="" leaves all of them to
+# first use
+BOOT_MODELS = [
+    name
+    for name in os.environ.get(
+        "BOOT_MODELS", ",".join(ATTRITION_MODELS + SERVING_SENTIMENT_MODELS)
+    ).split(",")
+    if name
+]
+
+startup = {"indexes": {"state": "pending"}}
+index_thread = None
+
+
+def ensure_mongo_indexes():
+    started = time.perf_counter()
+    try:
+        sentiment_cache.ensure_indexes()
+        job_manager.ensure_indexes()
+        # Jobs left queued or running by a previous run of the API
+        job_manager.fail_orphans()
+        sentiment_rollups.ensure_indexes()
+        risk_store.ensure_indexes()
+        startup["indexes"] = {
+            "state": "ready",
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+    except Exception as e:
+        logger.error(f"Error creating MongoDB indexes: {e}")
+        startup["indexes"] = {"state": "failed", "error": str(e)}
+
 
-    missing_cols = [col for col in FEATURE_COLUMNS if col not in df.columns]
-    if missing_cols:
-        raise ValueError(f"Missing columns: {missing_cols}")
+def backfill_risk_scores(filters=None):
+    # Rescores stored attritionRisk values left stale by a new model or by
+    # edits that bypassed scoring, so /api/employees/at-risk sees them
+    if index_thread is not None:
+        index_thread.join()
+    started = time.perf_counter()
+    try:
+        rescored = risk_store.backfill(filters)
+    except Exception as e:
+        logger.error(f"Error backfilling attrition risk scores: {e}")
+        return
+    if rescored:
+        response_cache.invalidate("employees")
+    logger.info(
+        f"Risk score backfill rescored {rescored} employees in "
+        f"{time.perf_counter() - started:.1f}s"
+    )
+
+
+def schedule_risk_backfill(filters=None):
+    threading.Thread(
+        target=backfill_risk_scores, args=(filters,), name="risk-backfill", daemon=True
+    ).start()
+
+
+def start_background_loading():
+    global index_thread
+    index_thread = threading.Thread(
+        target=ensure_mongo_indexes, name="mongo-indexes", daemon=True
+    )
+    index_thread.start()
+    model_registry.load_in_background(BOOT_MODELS)
+    # Not joined by wait_until_loaded: under prefork it keeps running in the
+    # parent while the workers serve
+    schedule_risk_backfill()
+
+
+def wait_until_loaded(timeout=None):
+    """Block until the boot loads and index creation have finished."""
+    loaded = model_registry.wait_for_background(timeout)
+    if index_thread is not None:
+        index_thread.join(timeout)
+    logger.info(f"Startup report: {json.dumps(startup_report())}")
+    return loaded
+
+
+def startup_report():
+    # Seconds are measured from the first line of this module
+    models = {}
+    for name, stats in model_registry.stats().items():
+        models[name] = {"state": stats["state"]}
+        if stats["state"] == "ready":
+            models[name]["loadSeconds"] = stats["loadSeconds"]
+            models[name]["readyAfterSeconds"] = round(stats["loadedAt"] - BOOT_STARTED, 3)
+        elif stats["state"] == "failed":
+            models[name]["error"] = stats["error"]
+    return {
+        "importSeconds": startup.get("importSeconds"),
+        "uptimeSeconds": round(time.time() - BOOT_STARTED, 3),
+        "indexes": startup["indexes"],
+        "bootModels": BOOT_MODELS,
+        "models": models,
+    }
 
-    return df[FEATURE_COLUMNS]
+
+def predict_one(data):
+    """(predicted class, attritionRisk percentage) for one /predict payload."""
+    if predict_batcher is not None:
+        # Same "Missing columns" error as the unbatched path, before the
+        # record can be scored with NaN features alongside complete ones
+        model_registry.get("feature_encoder").check_record(data)
+        trace = profiling.offthread_trace()
+        probability = predict_batcher.submit(data, trace=trace)
+        profiling.record_offthread("microBatcher", trace)
+    else:
+        probability = predict_records_proba([data])[0]
+    prediction = model_registry.get("rf_model").classes_[int(np.argmax(probability))]
+    return prediction, round(probability[1] * 100, 2)
 
 
 @app.route("/predict", methods=["POST"])
+@response_cache.invalidates("employees")
 def predict():
     try:
-        data = request.get_json()
+        with metrics.stage("parse"):
+            data = request.get_json()
         if not data:
             return jsonify({"status": "error", "message": "No data provided"}), 400
 
-        logger.info(f"Received data: {data}")
+        logger.debug("Received data: %s", data)
 
         # Validate employeeId
         if "employeeId" in data and (
@@ -187,29 +565,30 @@ def predict():
                 400,
             )
 
-        input_df = pd.DataFrame([data])
-        input_df = preprocess_data(input_df)
-        prediction = model.predict(input_df)
-        probability = model.predict_proba(input_df)[0]
-        attrition_risk = round(probability[1] * 100, 2)
+        prediction, attrition_risk = predict_one(data)
 
         employee_data = {**data, "attritionRisk": attrition_risk}
-        logger.info(f"Employee data to store: {employee_data}")
-
-        if "employeeId" in data:
-            employee_id = int(data["employeeId"])
-            result = employees_collection.update_one(
-                {"employeeId": employee_id}, {"$set": employee_data}, upsert=True
-            )
-            logger.info(
-                f"Employee {employee_id} upserted: {result.modified_count} modified, upserted_id: {result.upserted_id}"
-            )
-        else:
-            result = employees_collection.insert_one(employee_data)
-            logger.info(f"New employee inserted with ID: {result.inserted_id}")
+        logger.debug("Employee data to store: %s", employee_data)
+
+        stored_data = {**employee_data, **risk_store.stamp(data)}
+        with metrics.stage("mongo_write"):
+            if "employeeId" in data:
+                employee_id = int(data["employeeId"])
+                result = employees_collection.update_one(
+                    {"employeeId": employee_id}, {"$set": stored_data}, upsert=True
+                )
+                logger.debug(
+                    "Employee %s upserted: %s modified, upserted_id: %s",
+                    employee_id, result.modified_count, result.upserted_id,
+                )
+            else:
+                result = employees_collection.insert_one(stored_data)
+                logger.debug("New employee inserted with ID: %s", result.inserted_id)
 
         logger.info(
-            f"Prediction made for employeeId {data.get('employeeId')}: {prediction[0]}, Attrition Risk: {attrition_risk}%"
+            "Prediction made for employeeId %s: %s, Attrition Risk: %s%%",
+            data.get("employeeId"), prediction, attrition_risk,
+            extra={"sample_every": LOG_SAMPLE_EVERY},
         )
         return jsonify(employee_data)
     except Exception as e:
@@ -217,23 +596,204 @@ def predict():
         return jsonify({"status": "error", "message": str(e)}), 400
 
 
+@app.route("/predict/scenarios", methods=["POST"])
+def predict_scenarios():
+    # Read-only what-if scoring: nothing is written back to MongoDB
+    try:
+        with metrics.stage("parse"):
+            data = request.get_json()
+        if not data or not ("employee" in data or "employeeId" in data):
+            return (
+                jsonify({"status": "error", "message": "Provide employee or employeeId"}),
+                400,
+            )
+
+        base = {}
+        if "employeeId" in data:
+            if invalid_employee_id(data):
+                return (
+                    jsonify({"status": "error", "message": "Invalid employeeId, must be a number"}),
+                    400,
+                )
+            with metrics.stage("mongo_read"):
+                stored = employees_collection.find_one({"employeeId": int(data["employeeId"])})
+            if stored is None:
+                return jsonify({"status": "error", "message": "Employee not found"}), 404
+            base = RiskScoreStore.public_view(stored)
+        # Fields in "employee" override the stored document
+        base.update(data.get("employee") or {})
+
+        builder = ScenarioBuilder(
+            model_registry.get("feature_encoder"), max_variants=SCENARIO_MAX_VARIANTS
+        )
+        try:
+            with metrics.stage("preprocess"):
+                matrix, layout = builder.build(base, data.get("sweeps"), data.get("grid"))
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        metrics.batch_rows.observe(len(matrix), "scenarios:variants")
+
+        probabilities = predict_attrition_proba(builder.feature_encoder.to_frame(matrix))
+        with metrics.stage("serialize"):
+            table = builder.sensitivity_table(layout, probabilities[:, 1] * 100)
+            return jsonify({"employeeId": base.get("employeeId"), **table})
+    except Exception as e:
+        logger.error(f"Error in /predict/scenarios: {str(e)}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@app.route("/predict/batching", methods=["GET"])
+def get_predict_batching_stats():
+    if predict_batcher is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **predict_batcher.stats()})
+
+
+def parse_employee_listing(args):
+    """Translate /api/employees query parameters into a Mongo query plan."""
+    listing = {
+        "filter": {},
+        "projection": None,
+        "fields": None,
+        "min_risk": None,
+        "limit": None,
+        "sorted": False,
+    }
+
+    if args.get("limit") is not None:
+        limit = int(args["limit"])
+        if limit < 1 or limit > EMPLOYEE_PAGE_MAX_LIMIT:
+            raise ValueError(f"limit must be between 1 and {EMPLOYEE_PAGE_MAX_LIMIT}")
+        listing["limit"] = limit
+        listing["sorted"] = True
+
+    if args.get("after") is not None:
+        listing["filter"]["employeeId"] = {"$gt": float(args["after"])}
+        listing["sorted"] = True
+
+    if args.get("department"):
+        listing["filter"]["department"] = args["department"]
+
+    if args.get("minRisk") is not None:
+        min_risk = float(args["minRisk"])
+        listing["min_risk"] = min_risk
+        # Stored scores from an older model may be out of date, so those
+        # documents are fetched too and filtered after rescoring
+        listing["filter"]["$or"] = [
+            {"attritionRisk": {"$gte": min_risk}},
+            {"riskModelVersion": {"$ne": RF_MODEL_VERSION}},
+        ]
+
+    fields = [f for f in args.get("fields", "").split(",") if f]
+    needs_scoring = (
+        not fields or "attritionRisk" in fields or listing["min_risk"] is not None
+    )
+    if fields:
+        listing["fields"] = fields
+        projected = set(fields) | {"employeeId"}
+        if needs_scoring:
+            projected |= set(risk_store.feature_keys) | {"attritionRisk"}
+            projected |= {"riskModelVersion", "riskFeatureHash"}
+        listing["projection"] = {field: 1 for field in projected}
+    listing["score"] = needs_scoring
+    return listing
+
+
+def find_employees(listing, batch_size=None):
+    cursor = employees_collection.find(listing["filter"], listing["projection"])
+    if listing["sorted"]:
+        cursor = cursor.sort("employeeId", 1)
+    if listing["limit"]:
+        cursor = cursor.limit(listing["limit"])
+    if batch_size:
+        cursor = cursor.batch_size(batch_size)
+    return cursor
+
+
+def present_employees(batch, listing):
+    # Rescore stale documents in this batch, then apply the risk threshold
+    # and field selection to what is returned
+    if listing["score"]:
+        with metrics.stage("rescore"):
+            risk_store.refresh(batch)
+    return employee_views(batch, listing)
+
+
+def employee_views(batch, listing):
+    employees = []
+    for doc in batch:
+        risk = doc.get("attritionRisk")
+        if listing["min_risk"] is not None and (
+            risk is None or risk < listing["min_risk"]
+        ):
+            continue
+        view = RiskScoreStore.public_view(doc)
+        if listing["fields"]:
+            view = {field: view[field] for field in listing["fields"] if field in view}
+        employees.append(view)
+    return employees
+
+
+def stream_employees(listing):
+    def generate():
+        batch = []
+        sent = 0
+        try:
+            for doc in find_employees(listing, EMPLOYEE_STREAM_BATCH_SIZE):
+                batch.append(doc)
+                if len(batch) >= EMPLOYEE_STREAM_BATCH_SIZE:
+                    rows = present_employees(batch, listing)
+                    sent += len(rows)
+                    yield "".join(json.dumps(row) + "\n" for row in rows)
+                    batch = []
+            if batch:
+                rows = present_employees(batch, listing)
+                sent += len(rows)
+                yield "".join(json.dumps(row) + "\n" for row in rows)
+            logger.info(f"Streamed {sent} employees")
+        except Exception as e:
+            # Headers are already sent; report the failure as the last line
+            logger.error(f"Error streaming /api/employees: {str(e)}")
+            yield json.dumps({"status": "error", "message": str(e)}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
 @app.route("/api/employees", methods=["GET"])
+@response_cache.cached("employees")
 def get_employees():
     try:
-        employees = list(employees_collection.find({}, {"_id": 0}))
-        logger.info(f"Fetched {len(employees)} employees from MongoDB: {employees}")
+        try:
+            listing = parse_employee_listing(request.args)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+
+        if request.args.get("format") == "ndjson" or (
+            "application/x-ndjson" in request.headers.get("Accept", "")
+        ):
+            return stream_employees(listing)
+
+        with metrics.stage("mongo_read"):
+            employees = list(find_employees(listing))
+        metrics.batch_rows.observe(len(employees), "employees:rows")
+        logger.debug("Fetched %d employees from MongoDB", len(employees))
+
+        if listing["limit"]:
+            # Keyset pagination: resume after the last employeeId scanned
+            next_cursor = None
+            if len(employees) == listing["limit"]:
+                next_cursor = employees[-1].get("employeeId")
+            page = present_employees(employees, listing)
+            return jsonify({"employees": page, "nextCursor": next_cursor})
+
         if not employees:
             logger.info("No employees in database")
             return jsonify([])
 
-        df = pd.DataFrame(employees)
-        df_processed = preprocess_data(df)
-        probabilities = model.predict_proba(df_processed)
+        # Only employees whose features or model version changed are rescored
+        employees = present_employees(employees, listing)
 
-        for i, emp in enumerate(employees):
-            emp["attritionRisk"] = round(probabilities[i][1] * 100, 2)
-
-        logger.info(f"Returning {len(employees)} employees with updated attritionRisk")
+        logger.info(f"Returning {len(employees)} employees with current attritionRisk")
         return jsonify(employees)
     except Exception as e:
         logger.error(f"Error in /api/employees: {str(e)}")
@@ -241,12 +801,15 @@ def get_employees():
 
 
 @app.route("/api/employees/<int:employeeId>", methods=["DELETE"])
+@response_cache.invalidates("employees")
 def delete_employee(employeeId):
     try:
         result = employees_collection.delete_one({"employeeId": employeeId})
         if result.deleted_count == 0:
             logger.info(f"Employee {employeeId} not found")
             return jsonify({"status": "error", "message": "Employee not found"}), 404
+        # Sends /sentiment to the raw pipeline while the rollups are rebuilt
+        sentiment_rollups.remove_employee(employeeId)
         logger.info(f"Deleted employeeId {employeeId}")
         return jsonify(
             {"status": "success", "message": "Employee deleted successfully"}
@@ -256,58 +819,295 @@ def delete_employee(employeeId):
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+@app.route("/api/employees/at-risk", methods=["GET"])
+@response_cache.cached("employees")
+def get_top_at_risk():
+    # ?k=20&department=&jobRole=&minRisk=&fields=; highest attritionRisk first
+    try:
+        k = int(request.args.get("k", 20))
+        if k < 1 or k > TOP_RISK_MAX_K:
+            raise ValueError(f"k must be between 1 and {TOP_RISK_MAX_K}")
+        min_risk = request.args.get("minRisk")
+        if min_risk is not None:
+            min_risk = float(min_risk)
+        filters = {
+            field: request.args[field]
+            for field in ("department", "jobRole")
+            if request.args.get(field)
+        }
+        fields = [f for f in request.args.get("fields", "").split(",") if f] or None
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    try:
+        with metrics.stage("mongo_read"):
+            docs = risk_store.top(filters, k, min_risk=min_risk, fields=fields)
+        metrics.batch_rows.observe(len(docs), "at_risk:rows")
+        with metrics.stage("serialize"):
+            employees = []
+            for doc in docs:
+                view = RiskScoreStore.public_view(doc)
+                if fields:
+                    view = {field: view[field] for field in fields if field in view}
+                employees.append(view)
+        return jsonify({"employees": employees, "k": k})
+    except Exception as e:
+        logger.error(f"Error in /api/employees/at-risk: {str(e)}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@app.route("/api/employees/drivers", methods=["GET"])
+@response_cache.cached("employees")
+def get_employee_drivers():
+    # ?employeeIds=1,2,3 or ?department=&jobRole= selects employees; ?top= drivers each
+    try:
+        top = int(request.args.get("top", 5))
+        if top < 1 or top > RISK_DRIVERS_STORED:
+            raise ValueError(f"top must be between 1 and {RISK_DRIVERS_STORED}")
+        query = {}
+        if request.args.get("employeeIds"):
+            ids = [int(i) for i in request.args["employeeIds"].split(",") if i]
+            query["employeeId"] = {"$in": ids}
+        for field in ("department", "jobRole"):
+            if request.args.get(field):
+                query[field] = request.args[field]
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    try:
+        projection = set(risk_store.feature_keys) | {
+            "employeeId",
+            "attritionRisk",
+            "riskModelVersion",
+            "riskFeatureHash",
+            "riskDrivers",
+            "riskDriversStamp",
+        }
+        with metrics.stage("mongo_read"):
+            docs = list(
+                employees_collection.find(query, {field: 1 for field in projection})
+                .sort("employeeId", 1)
+                .limit(RISK_DRIVERS_MAX_EMPLOYEES + 1)
+            )
+        truncated = len(docs) > RISK_DRIVERS_MAX_EMPLOYEES
+        docs = docs[:RISK_DRIVERS_MAX_EMPLOYEES]
+        metrics.batch_rows.observe(len(docs), "drivers:rows")
+
+        # Scores first, so drivers are stamped against the current features
+        with metrics.stage("rescore"):
+            risk_store.refresh(docs)
+        explained = driver_store.refresh(docs)
+
+        with metrics.stage("serialize"):
+            employees = []
+            for doc in docs:
+                drivers = doc.get("riskDrivers")
+                if drivers is not None:
+                    drivers = [
+                        {**driver, "value": doc.get(driver["feature"])}
+                        for driver in drivers[:top]
+                    ]
+                employees.append(
+                    {
+                        "employeeId": doc.get("employeeId"),
+                        "attritionRisk": doc.get("attritionRisk"),
+                        "drivers": drivers,
+                    }
+                )
+        logger.info(
+            f"Returning risk drivers for {len(employees)} employees ({explained} computed)"
+        )
+        return jsonify({"employees": employees, "truncated": truncated})
+    except Exception as e:
+        logger.error(f"Error in /api/employees/drivers: {str(e)}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+def invalid_employee_id(emp):
+    return "employeeId" in emp and (
+            not isinstance(emp["employeeId"], (int, float))
+            or pd.isna(emp["employeeId"])
+    )
+
+
+def score_bulk_chunk(chunk):
+    # One predict_proba call per chunk; if the chunk fails, score rows one by
+    # one so a single bad row only fails itself
+    try:
+        return score_attrition_risk([emp for _, emp in chunk]), []
+    except Exception:
+        risks, errors = [], []
+        for index, emp in chunk:
+            try:
+                risks.append(score_attrition_risk([emp])[0])
+            except Exception as e:
+                risks.append(None)
+                errors.append(
+                    {"index": index, "employeeId": emp.get("employeeId"), "message": str(e)}
+                )
+        return risks, errors
+
+
 @app.route("/predict/bulk", methods=["POST"])
+@response_cache.invalidates("employees")
 def predict_bulk():
     try:
-        data = request.get_json()
+        with metrics.stage("parse"):
+            data = request.get_json()
         if not data or "employees" not in data:
             return jsonify({"status": "error", "message": "No employees provided"}), 400
 
         employees = data["employees"]
+        metrics.batch_rows.observe(len(employees), "predict_bulk:request")
         logger.info(f"Received {len(employees)} employees for bulk prediction")
 
-        # Validate employeeId in bulk data
-        for emp in employees:
-            if "employeeId" in emp and (
-                    not isinstance(emp["employeeId"], (int, float))
-                    or pd.isna(emp["employeeId"])
-            ):
-                return (
-                    jsonify(
-                        {
-                            "status": "error",
-                            "message": f"Invalid employeeId in employee data: {emp}",
-                        }
-                    ),
-                    400,
+        # Invalid rows are reported individually instead of failing the batch
+        errors = []
+        valid = []
+        for index, emp in enumerate(employees):
+            if not isinstance(emp, dict):
+                errors.append(
+                    {"index": index, "employeeId": None, "message": "Employee must be an object"}
                 )
-
-        input_df = pd.DataFrame(employees)
-        input_df = preprocess_data(input_df)
-        probabilities = model.predict_proba(input_df)
-
-        for i, emp in enumerate(employees):
-            emp["attritionRisk"] = round(probabilities[i][1] * 100, 2)
-            # Only set sentimentScore to null during bulk import unless feedback is provided
-            emp["sentimentScore"] = None
-
-        for emp in employees:
-            employee_id = emp.get("employeeId")
-            if employee_id is not None:
-                employees_collection.update_one(
-                    {"employeeId": employee_id}, {"$set": emp}, upsert=True
+            elif invalid_employee_id(emp):
+                errors.append(
+                    {
+                        "index": index,
+                        "employeeId": emp["employeeId"],
+                        "message": "Invalid employeeId, must be a number",
+                    }
                 )
+            else:
+                valid.append((index, emp))
+
+        chunks = []
+        scored = {}
+        for start in range(0, len(valid), PREDICT_BULK_CHUNK_SIZE):
+            chunk = valid[start:start + PREDICT_BULK_CHUNK_SIZE]
+            metrics.batch_rows.observe(len(chunk), "predict_bulk:chunk")
+
+            score_start = time.perf_counter()
+            risks, chunk_errors = score_bulk_chunk(chunk)
+            score_ms = (time.perf_counter() - score_start) * 1000
+            errors.extend(chunk_errors)
+
+            operations = []
+            operation_rows = []
+            for (index, emp), risk in zip(chunk, risks):
+                if risk is None:
+                    continue
+                emp["attritionRisk"] = risk
+                # Only set sentimentScore to null during bulk import unless feedback is provided
+                emp["sentimentScore"] = None
+                scored[index] = emp
+                if emp.get("employeeId") is not None:
+                    operations.append(
+                        UpdateOne(
+                            {"employeeId": emp["employeeId"]},
+                            {"$set": {**emp, **risk_store.stamp(emp)}},
+                            upsert=True,
+                        )
+                    )
+                    operation_rows.append(index)
+
+            write_start = time.perf_counter()
+            if operations:
+                try:
+                    employees_collection.bulk_write(operations, ordered=False)
+                except BulkWriteError as e:
+                    for write_error in e.details.get("writeErrors", []):
+                        index = operation_rows[write_error["index"]]
+                        scored.pop(index, None)
+                        errors.append(
+                            {
+                                "index": index,
+                                "employeeId": employees[index].get("employeeId"),
+                                "message": write_error.get("errmsg", "Write failed"),
+                            }
+                        )
+            write_ms = (time.perf_counter() - write_start) * 1000
+            metrics.stage_latency.observe(write_ms / 1000, metrics.current_route(), "mongo_write")
+
+            chunks.append(
+                {
+                    "chunk": len(chunks),
+                    "rows": len(chunk),
+                    "scored": sum(risk is not None for risk in risks),
+                    "scoreMs": round(score_ms, 2),
+                    "writeMs": round(write_ms, 2),
+                }
+            )
 
-        logger.info(f"Bulk processed and stored {len(employees)} employees")
-        return jsonify(
-            {"status": "success", "message": "Bulk prediction and storage complete", "employees": employees}
+        errors.sort(key=lambda error: error["index"])
+        if not scored and errors:
+            return (
+                jsonify(
+                    {
+                        "status": "error",
+                        "message": "No employees could be processed",
+                        "errors": errors,
+                        "chunks": chunks,
+                    }
+                ),
+                400,
+            )
+
+        logger.info(
+            f"Bulk processed and stored {len(scored)} employees in {len(chunks)} chunks, {len(errors)} errors"
         )
+        with metrics.stage("serialize"):
+            return jsonify(
+                {
+                    "status": "success",
+                    "message": "Bulk prediction and storage complete",
+                    "employees": [scored[index] for index in sorted(scored)],
+                    "errors": errors,
+                    "chunks": chunks,
+                }
+            )
     except Exception as e:
         logger.error(f"Error in /predict/bulk: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 400
 
 
+def wants_async():
+    return request.args.get("async", "0").lower() in ("1", "true")
+
+
+def submit_feedback_job(kind, ingest, df, build_result):
+    """Queue a feedback CSV for background ingestion; returns the 202 response."""
+
+    def ingest_chunk(chunk):
+        items = ingest(chunk)
+        # Dashboards see each chunk as soon as it is stored
+        response_cache.invalidate(
+            "employees", "sentiment", *{f"feedback:{item['employeeId']}" for item in items}
+        )
+        return items
+
+    def run(progress):
+        items = feedback_ingestor.ingest_in_chunks(
+            ingest_chunk, df, FEEDBACK_JOB_CHUNK_SIZE, progress=progress
+        )
+        return build_result(items)
+
+    job_id = job_manager.submit(kind, run, total=len(df))
+    response = jsonify({"status": "accepted", "jobId": job_id, "statusUrl": f"/jobs/{job_id}"})
+    response.status_code = 202
+    response.headers["Location"] = f"/jobs/{job_id}"
+    return response
+
+
+def general_feedback_result(results):
+    return {
+        "status": "success",
+        "message": "Sentiment analysis complete",
+        "results": results,
+    }
+
+
 @app.route("/analyze-sentiment", methods=["POST"])
+@response_cache.invalidates("employees", "sentiment")
 def analyze_sentiment():
     try:
         if "feedbackFile" not in request.files:
@@ -321,12 +1121,7 @@ def analyze_sentiment():
         df = pd.read_csv(io.BytesIO(file.read()))
         logger.info(f"Received CSV with {len(df)} rows")
 
-        required_columns = [
-            "Employee ID",
-            "Email",
-            "GeneralFeedback",
-        ]  # Updated to match your CSV
-        missing_cols = [col for col in required_columns if col not in df.columns]
+        missing_cols = missing_columns(df, GENERAL_REQUIRED_COLUMNS)
         if missing_cols:
             return (
                 jsonify(
@@ -335,269 +1130,60 @@ def analyze_sentiment():
                 400,
             )
 
-        # Process feedback with BERT
-        results = []
-        for index, row in df.iterrows():
-            employee_id = row["Employee ID"] if pd.notna(row["Employee ID"]) else None
-            email = row["Email"] if pd.notna(row["Email"]) else None
-            general_feedback = (
-                str(row["GeneralFeedback"]) if pd.notna(row["GeneralFeedback"]) else ""
-            )
-            specific_feedback = (
-                str(row["SpecificFeedback"])
-                if "SpecificFeedback" in df.columns
-                   and pd.notna(row["SpecificFeedback"])
-                else None
-            )
-            satisfaction = (
-                int(row["How satisfied are you with your current job overall?"])
-                if "How satisfied are you with your current job overall?" in df.columns
-                   and pd.notna(
-                    row["How satisfied are you with your current job overall?"]
-                )
-                else None
+        if wants_async():
+            return submit_feedback_job(
+                "analyze-sentiment",
+                feedback_ingestor.ingest_general,
+                df,
+                general_feedback_result,
             )
 
-            # Find employee in MongoDB using either employeeId or email
-            query = {}
-            if employee_id is not None:
-                query["employeeId"] = employee_id
-            elif email is not None:
-                query["email"] = email
-            else:
-                logger.warning(f"No valid Employee ID or Email for row {index}")
-                continue
-
-            employee = employees_collection.find_one(query)
-            if not employee:
-                logger.warning(
-                    f"Employee not found for ID/Email: {employee_id or email}"
-                )
-                continue
-
-            # Run BERT on GeneralFeedback
-            inputs = tokenizer(
-                general_feedback,
-                return_tensors="pt",
-                truncation=True,
-                padding=True,
-                max_length=512,
-            )
-            with torch.no_grad():
-                outputs = bert_model(**inputs)
-            logits = outputs.logits
-            score = torch.softmax(logits, dim=1).tolist()[0]  # [negative, positive]
-            sentiment_score = score[1] - score[0]  # Scale -1 to 1
-
-            # Store in SentimentFeedback collection
-            feedback_data = {
-                "employee": str(employee["_id"]),  # Store ObjectId as string
-                "generalFeedback": general_feedback,
-                "specificFeedback": specific_feedback,
-                "sentimentScore": sentiment_score,
-                "satisfactionRating": satisfaction,
-                "date": pd.Timestamp.now().isoformat(),
-            }
-            sentiment_collection.insert_one(feedback_data)
-
-            # Update Employee collection with latest sentimentScore
-            employees_collection.update_one(
-                {"employeeId": employee["employeeId"]},
-                {"$set": {"sentimentScore": sentiment_score}},
-            )
-
-            results.append(
-                {
-                    "employeeId": employee["employeeId"],
-                    "sentimentScore": sentiment_score,
-                }
-            )
+        results = feedback_ingestor.ingest_general(df)
+        response_cache.invalidate(*{f"feedback:{r['employeeId']}" for r in results})
 
         logger.info(f"Processed {len(results)} feedback entries")
-        return jsonify(
-            {
-                "status": "success",
-                "message": "Sentiment analysis complete",
-                "results": results,
-            }
-        )
+        return jsonify(general_feedback_result(results))
     except Exception as e:
         logger.error(f"Error in /analyze-sentiment: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
 @app.route('/sentiment', methods=['GET'])
+@response_cache.cached('sentiment', 'employees')  # Joins employee departments
 def get_sentiment():
     try:
         logger.info("Starting sentiment route")
 
-        # Get filter parameters from query string
-        type_param = request.args.get('type', 'all').lower()  # Sentiment type: all, positive, negative, neutral
-        date_range = request.args.get('dateRange', 'Last 6 Months')  # Date range filter
-        department_filter = request.args.get('department', 'All Departments')  # Department filter
-
-        # Define date filter
-        from datetime import timedelta
-        today = datetime.now()
-        if date_range == 'Last 7 Days':
-            start_date = today - timedelta(days=7)
-        elif date_range == 'Last 30 Days':
-            start_date = today - timedelta(days=30)
-        elif date_range == 'Last Year':
-            start_date = today - timedelta(days=365)
-        else:  # Last 6 Months
-            start_date = today - timedelta(days=180)
-
-        # Build MongoDB query with date filter
-        query = {'date': {'$gte': start_date}} if date_range != 'All' else {}
-        raw_sentiment_data = list(sentiment_collection.find(query).sort('date', -1))
-        total_feedback = len(raw_sentiment_data)  # Initial count (before additional filters)
-
-        if not raw_sentiment_data:
-            logger.info("No feedback found, returning default response")
-            return jsonify({
-                'totalFeedback': 0,
-                'positiveSentiment': 0,
-                'negativeSentiment': 0,
-                'overallScore': 0,
-                'trendData': [],
-                'departmentData': [],
-                'distributionData': [
-                    {'name': 'Positive', 'value': 0, 'color': '#36B37E'},
-                    {'name': 'Neutral', 'value': 0, 'color': '#6554C0'},
-                    {'name': 'Negative', 'value': 0, 'color': '#FF5630'}
-                ],
-                'employeesData': []
-            })
-
-        # Map employees
-        employee_ids = [str(item['employee']) for item in raw_sentiment_data]
-        employees = list(employees_collection.find({'_id': {'$in': [ObjectId(id) for id in employee_ids]}}))
-        employee_map = {str(emp['_id']): emp for emp in employees}
-
-        # Combine data and apply filters
-        combined_data = []
-        for record in raw_sentiment_data:
-            emp_id = str(record['employee'])
-            emp = employee_map.get(emp_id)
-            if emp and 'employeeId' in emp:
-                combined_data.append({
-                    'employeeId': emp['employeeId'],
-                    'email': emp.get('email', ''),
-                    'name': emp.get('name', 'N/A'),
-                    'department': emp.get('department', 'Unknown'),
-                    'sentimentScore': record['sentimentScore'],
-                    'date': record.get('date', '')
-                })
-
-        # Apply department filter
-        if department_filter != 'All Departments':
-            combined_data = [e for e in combined_data if e['department'] == department_filter]
-
-        # Apply sentiment type filter
-        if type_param == 'positive':
-            combined_data = [e for e in combined_data if e['sentimentScore'] > 0.5]
-        elif type_param == 'negative':
-            combined_data = [e for e in combined_data if e['sentimentScore'] < 0]
-        elif type_param == 'neutral':
-            combined_data = [e for e in combined_data if 0 <= e['sentimentScore'] <= 0.5]
-
-        # Update total_feedback after filtering
-        total_feedback = len(combined_data)
-
-        # If no data after filtering
-        if total_feedback == 0:
+        type_param, start_date, department_filter = sentiment_filters(request.args)
+
+        if SENTIMENT_ROLLUPS_ENABLED and sentiment_rollups.ready():
+            # Day/department buckets and per-employee latest scores kept up to
+            # date at ingest; date ranges start at the beginning of their first day
+            summary = sentiment_rollups.summary(type_param, start_date, department_filter)
+        else:
+            # Filtering, the employee join and all grouping happen in MongoDB;
+            # only the per-month/per-department summary comes back
+            pipeline = sentiment_pipeline(
+                type_param, start_date, department_filter, employees_collection.name
+            )
+            facets = next(sentiment_collection.aggregate(pipeline, allowDiskUse=True), {})
+            summary = summary_from_facets(facets)
+
+        if summary['total'] == 0:
             logger.info("No feedback after filtering, returning default response")
-            return jsonify({
-                'totalFeedback': 0,
-                'positiveSentiment': 0,
-                'negativeSentiment': 0,
-                'overallScore': 0,
-                'trendData': [],
-                'departmentData': [],
-                'distributionData': [
-                    {'name': 'Positive', 'value': 0, 'color': '#36B37E'},
-                    {'name': 'Neutral', 'value': 0, 'color': '#6554C0'},
-                    {'name': 'Negative', 'value': 0, 'color': '#FF5630'}
-                ],
-                'employeesData': []
-            })
-
-        # Aggregate employeesData by employeeId, keeping the most recent feedback
-        employees_map = {}  # Temporary map to deduplicate
-        for entry in combined_data:
-            employee_id = entry['employeeId']
-            if employee_id not in employees_map or pd.to_datetime(entry['date']) > pd.to_datetime(employees_map[employee_id]['date']):
-                employees_map[employee_id] = entry
-
-        employees_data = [e for e in employees_map.values() if e['sentimentScore'] < 0]
-        employees_data.sort(key=lambda x: x['sentimentScore'])
-
-        # Calculate metrics using the full combined_data
-        positive_sentiment = len([e for e in combined_data if e['sentimentScore'] > 0.5]) / total_feedback * 100 if total_feedback > 0 else 0
-        negative_sentiment = len([e for e in combined_data if e['sentimentScore'] < 0]) / total_feedback * 100 if total_feedback > 0 else 0
-        neutral_sentiment = 100 - positive_sentiment - negative_sentiment
-
-        # Debug overall score calculation
-        score_sum = sum(e['sentimentScore'] for e in combined_data)
-        overall_score = score_sum / total_feedback if total_feedback > 0 else 0
-        logger.info(f"Overall score calculation: sum={score_sum}, total_feedback={total_feedback}, overall_score={overall_score}")
-
-        # Trend data
-        trend_map = {}
-        for e in combined_data:
-            date = pd.to_datetime(e['date'])
-            month = date.strftime('%b %Y')
-            if month not in trend_map:
-                trend_map[month] = {'sum': 0, 'count': 0}
-            trend_map[month]['sum'] += e['sentimentScore']
-            trend_map[month]['count'] += 1
-        trend_data = [{'month': month, 'score': data['sum'] / data['count']} for month, data in trend_map.items()]
-        trend_data.sort(key=lambda x: pd.to_datetime(x['month'], format='%b %Y'))
-
-        # Department data
-        dept_map = {}
-        for e in combined_data:
-            dept = e['department']
-            if dept not in dept_map:
-                dept_map[dept] = {'sum': 0, 'count': 0}
-            dept_map[dept]['sum'] += e['sentimentScore']
-            dept_map[dept]['count'] += 1
-        department_data = [{'department': dept, 'score': data['sum'] / data['count']} for dept, data in dept_map.items()]
-
-        # Distribution data
-        distribution_data = [
-            {'name': 'Positive', 'value': round(positive_sentiment), 'color': '#36B37E'},
-            {'name': 'Neutral', 'value': round(neutral_sentiment), 'color': '#6554C0'},
-            {'name': 'Negative', 'value': round(negative_sentiment), 'color': '#FF5630'}
-        ]
+            return jsonify(empty_response())
 
-        logger.info(f"Returning sentiment data: totalFeedback={total_feedback}, overallScore={overall_score}")
-        return jsonify({
-            'totalFeedback': total_feedback,
-            'positiveSentiment': round(positive_sentiment),
-            'negativeSentiment': round(negative_sentiment),
-            'overallScore': overall_score,
-            'trendData': trend_data,
-            'departmentData': department_data,
-            'distributionData': distribution_data,
-            'employeesData': [  # Format dates for frontend
-                {**e, 'date': pd.to_datetime(e['date']).strftime('%Y-%m-%d') if e['date'] else 'N/A'}
-                for e in employees_data
-            ]
-        })
+        response = sentiment_response(summary)
+        logger.info(f"Returning sentiment data: totalFeedback={response['totalFeedback']}, overallScore={response['overallScore']}")
+        return jsonify(response)
     except Exception as e:
         logger.error(f"Error in /sentiment: {str(e)}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
 @app.route('/upload-feedback', methods=['POST'])
+@response_cache.invalidates('employees', 'sentiment')
 def upload_feedback():
-    print('Request received at /upload-feedback')
-    print('Request headers:', request.headers)
-    print('Request files:', request.files)
-    print('Request form:', request.form)
-
     try:
         if 'feedbackFile' not in request.files:
             logger.error('No feedbackFile in request.files')
@@ -610,98 +1196,24 @@ def upload_feedback():
 
         # Load CSV
         df = pd.read_csv(file)
-        logger.info(f'CSV loaded with {len(df)} rows')
-
-        # Define column names
-        feedback_col = 'How do you feel about your current working environment?'
-        satisfaction_col = 'How satisfied are you with your current job overall?'
-        comments_col = 'Is there anything specific (e.g., workload, management, growth opportunities) you would like to mention?'
+        logger.info('CSV %s loaded with %d rows', file.filename, len(df))
 
         # Validate required columns
-        required_cols = ['Employee ID', feedback_col]
-        missing_cols = [col for col in required_cols if col not in df.columns]
+        missing_cols = missing_columns(df, SURVEY_REQUIRED_COLUMNS)
         if missing_cols:
             logger.error(f'Missing required columns: {missing_cols}')
             return jsonify({'status': 'error', 'message': f'Missing columns: {missing_cols}'}), 400
 
-        # Load DistilBERT model for sentiment analysis
-        tokenizer = DistilBertTokenizer.from_pretrained('distilbert-base-uncased-finetuned-sst-2-english')
-        model = DistilBertForSequenceClassification.from_pretrained('distilbert-base-uncased-finetuned-sst-2-english')
-
-        feedbacks = []
-
-        # Process each row in the CSV
-        for index, row in df.iterrows():
-            employee_id = int(row['Employee ID']) if pd.notna(row['Employee ID']) else None
-            if not employee_id:
-                logger.warning(f'No valid Employee ID at row {index}, skipping')
-                continue
-
-            feedback = str(row[feedback_col]) if pd.notna(row[feedback_col]) else ''
-            satisfaction = (
-                int(row[satisfaction_col])
-                if satisfaction_col in df.columns and pd.notna(row[satisfaction_col])
-                else None
-            )
-            comments = (
-                str(row[comments_col])
-                if comments_col in df.columns and pd.notna(row[comments_col])
-                else ''
+        if wants_async():
+            return submit_feedback_job(
+                'upload-feedback',
+                feedback_ingestor.ingest_survey,
+                df,
+                lambda feedbacks: {'feedbacks': feedbacks},
             )
 
-            # Check if employee exists
-            employee = employees_collection.find_one({'employeeId': employee_id})
-            if not employee:
-                logger.warning(f'Employee ID {employee_id} not found, skipping')
-                continue
-
-            # Sentiment analysis
-            sentiment_score = 0.0
-            if feedback and feedback.lower() != 'nan':
-                inputs = tokenizer(feedback, return_tensors='pt', truncation=True, padding=True, max_length=512)
-                with torch.no_grad():
-                    outputs = model(**inputs)
-                scores = torch.softmax(outputs.logits, dim=1).detach().numpy()[0]
-                logger.info(f"Employee {employee_id} raw scores: negative={scores[0]}, positive={scores[1]}")
-                sentiment_score = float(scores[1] - scores[0])  # Scale -1 to 1
-
-            # Prepare feedback data for SentimentFeedback
-            feedback_data = {
-                'employee': employee['_id'],  # Use ObjectId directly
-                'employeeId': employee_id,    # Optional: for easier querying
-                'sentimentScore': sentiment_score,
-                'date': (
-                    datetime.strptime(row['Timestamp'], '%m/%d/%Y %H:%M:%S')
-                    if 'Timestamp' in df.columns and pd.notna(row['Timestamp'])
-                    else datetime.now()
-                ),
-                'feedbackText': feedback,
-                'satisfactionScore': satisfaction,
-                'additionalComments': comments
-            }
-
-            # Insert into SentimentFeedback collection
-            sentiment_result = sentiment_collection.insert_one(feedback_data)
-            logger.info(f'Inserted feedback for employee {employee_id} with ID {sentiment_result.inserted_id}')
-
-            # Update Employee collection with the sentimentScore
-            employee_result = employees_collection.update_one(
-                {'employeeId': employee_id},
-                {'$set': {'sentimentScore': sentiment_score}}
-            )
-            if employee_result.modified_count > 0:
-                logger.info(f'Updated Employee {employee_id} with sentimentScore: {sentiment_score}')
-            else:
-                logger.info(f'No update needed for Employee {employee_id} (sentimentScore unchanged)')
-
-            # Add to response for Node.js
-            feedbacks.append({
-                'employeeId': employee_id,
-                'sentimentScore': sentiment_score,
-                'feedbackText': feedback,
-                'satisfactionScore': satisfaction,
-                'additionalComments': comments
-            })
+        feedbacks = feedback_ingestor.ingest_survey(df)
+        response_cache.invalidate(*{f"feedback:{f['employeeId']}" for f in feedbacks})
 
         logger.info(f'Processed and synced {len(feedbacks)} feedback entries')
         return jsonify({
@@ -717,8 +1229,9 @@ def not_found(error):
     return make_response(jsonify({'status': 'error', 'message': 'Resource not found'}), 404)
 
 @app.route('/feedback/<int:employee_id>', methods=['GET'])
+@response_cache.cached(tags_for=lambda employee_id: [f'feedback:{employee_id}'])
 def get_feedback(employee_id):
-    logger.info(f'Request received at /feedback/{employee_id}')
+    logger.debug('Request received at /feedback/%s', employee_id)
     feedbacks = list(sentiment_collection.find({'employeeId': employee_id}).sort('date', -1))
     if not feedbacks:
         return jsonify({'status': 'error', 'message': 'Feedback not found'}), 404
@@ -726,10 +1239,186 @@ def get_feedback(employee_id):
         feedback['_id'] = str(feedback['_id'])
         feedback['employee'] = str(feedback['employee'])
         feedback['date'] = feedback['date'].strftime('%Y-%m-%d') if feedback['date'] else 'N/A'
-    logger.info(f'Feedback found: {len(feedbacks)} entries')
+    logger.debug('Feedback found: %d entries', len(feedbacks))
     return jsonify({'feedbacks': feedbacks}), 200
 
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Job not found"}), 404
+    return jsonify(job)
+
+
+@app.route("/models", methods=["GET"])
+def get_models():
+    return jsonify({"models": model_registry.stats()})
+
+
+@app.route("/workers/memory", methods=["GET"])
+def get_worker_memory():
+    # Shared vs private pages per process; under prefork.py covers the whole pool
+    return jsonify(memory_report())
+
+
+def profiles_visible():
+    supplied = request.headers.get("X-Profile") or request.args.get("profile")
+    return request_profiler.can_browse(supplied)
+
+
+@app.route("/profiles", methods=["GET"])
+def list_profiles():
+    # Captures from every worker sharing PROFILE_DIR, newest first
+    if not profiles_visible():
+        return jsonify({"status": "error", "message": "Resource not found"}), 404
+    limit = request.args.get("limit", default=50, type=int)
+    return jsonify({"profiles": request_profiler.list_captures(limit)})
+
+
+@app.route("/profiles/<capture_id>", methods=["GET"])
+def get_profile(capture_id):
+    # ?format=pstats downloads the raw profile; the default is the JSON summary
+    if not profiles_visible():
+        return jsonify({"status": "error", "message": "Resource not found"}), 404
+    fmt = request.args.get("format", "json")
+    if fmt not in ("json", "pstats"):
+        return jsonify({"status": "error", "message": "format must be json or pstats"}), 400
+    path = request_profiler.capture_path(capture_id, f".{fmt}")
+    if path is None:
+        return jsonify({"status": "error", "message": "Profile not found"}), 404
+    if fmt == "json":
+        return send_file(os.path.abspath(path), mimetype="application/json")
+    return send_file(
+        os.path.abspath(path), as_attachment=True, download_name=f"{capture_id}.pstats"
+    )
+
+
+@app.route("/cache/sentiment", methods=["GET"])
+def get_sentiment_cache_stats():
+    return jsonify(sentiment_cache.stats())
+
+
+@app.route("/cache/responses", methods=["GET"])
+def get_response_cache_stats():
+    return jsonify(response_cache.stats())
+
+
+@metrics.registry.collector
+def component_metrics():
+    # Read from the counters the caches, batcher and registry already keep
+    sentiment = sentiment_cache.stats()
+    responses = response_cache.stats()
+    families = [
+        (
+            "prescient_sentiment_cache_lookups_total",
+            "counter",
+            "Sentiment cache lookups by outcome",
+            [
+                ({"outcome": "memory_hit"}, sentiment["memoryHits"]),
+                ({"outcome": "persistent_hit"}, sentiment["persistentHits"]),
+                ({"outcome": "miss"}, sentiment["misses"]),
+            ],
+        ),
+        (
+            "prescient_sentiment_cache_hit_ratio",
+            "gauge",
+            "Share of sentiment lookups served from the cache",
+            [({}, sentiment["hitRate"])],
+        ),
+        (
+            "prescient_response_cache_lookups_total",
+            "counter",
+            "Response cache lookups by outcome",
+            [({"outcome": "hit"}, responses["hits"]), ({"outcome": "miss"}, responses["misses"])],
+        ),
+        (
+            "prescient_response_cache_hit_ratio",
+            "gauge",
+            "Share of cacheable reads served from the response cache",
+            [({}, responses["hitRate"])],
+        ),
+        (
+            "prescient_model_ready",
+            "gauge",
+            "1 when the model is loaded",
+            [
+                ({"model": name}, int(stats["state"] == "ready"))
+                for name, stats in model_registry.stats().items()
+            ],
+        ),
+    ]
+    logs = log_config.stats()
+    if logs["configured"]:
+        families += [
+            (
+                "prescient_log_queue_depth",
+                "gauge",
+                "Log records waiting for the writer thread",
+                [({}, logs["queued"])],
+            ),
+            (
+                "prescient_log_dropped_total",
+                "counter",
+                "Log records dropped because the queue was full",
+                [({}, logs["dropped"])],
+            ),
+        ]
+    if predict_batcher is not None:
+        batching = predict_batcher.stats()
+        families.append(
+            (
+                "prescient_predict_batcher_queued",
+                "gauge",
+                "/predict requests waiting for a micro-batch",
+                [({}, batching["queued"])],
+            )
+        )
+    return families
+
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    return Response(metrics.registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    # Liveness only: the process is up and serving requests
+    return jsonify({"status": "ok", "uptimeSeconds": round(time.time() - BOOT_STARTED, 3)})
+
+
+@app.route("/readyz", methods=["GET"])
+def readyz():
+    # ?models=rf_model,feature_encoder checks only what a caller depends on
+    names = [name for name in request.args.get("models", "").split(",") if name]
+    names = names or BOOT_MODELS
+    try:
+        states = {name: model_registry.state(name) for name in names}
+    except KeyError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    ready = all(state == "ready" for state in states.values())
+    return jsonify({"ready": ready, "models": states}), 200 if ready else 503
+
+
+@app.route("/startup", methods=["GET"])
+def get_startup_report():
+    return jsonify(startup_report())
+
+
+@app.route("/models/warmup", methods=["POST"])
+def warm_up_models():
+    try:
+        data = request.get_json(silent=True) or {}
+        stats = model_registry.warm_up(data.get("models") or SERVING_SENTIMENT_MODELS)
+        return jsonify({"status": "success", "models": stats})
+    except KeyError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in /models/warmup: {str(e)}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
 @app.route("/api/employees/bulk", methods=["POST"])
+@response_cache.invalidates("employees")
 def bulk_employees():
     try:
         data = request.get_json()
@@ -741,10 +1430,7 @@ def bulk_employees():
 
         # Validate employeeId in bulk data
         for emp in employees:
-            if "employeeId" in emp and (
-                    not isinstance(emp["employeeId"], (int, float))
-                    or pd.isna(emp["employeeId"])
-            ):
+            if invalid_employee_id(emp):
                 return (
                     jsonify(
                         {
@@ -756,14 +1442,15 @@ def bulk_employees():
                 )
 
         # Perform bulk upsert
+        # Score stamps are left alone: rows that just came back from
+        # /predict/bulk keep their fresh scores, and an edited row no longer
+        # matches its stored feature hash, so the backfill below rescores it
         bulk_operations = [
-            {
-                "updateOne": {
-                    "filter": {"employeeId": int(emp["employeeId"])},
-                    "update": {"$set": emp},
-                    "upsert": True,
-                }
-            }
+            UpdateOne(
+                {"employeeId": int(emp["employeeId"])},
+                {"$set": {key: value for key, value in emp.items() if key not in INTERNAL_FIELDS}},
+                upsert=True,
+            )
             for emp in employees
             if "employeeId" in emp
         ]
@@ -771,6 +1458,9 @@ def bulk_employees():
         logger.info(
             f"Bulk operation completed: {result.upserted_count} upserted, {result.modified_count} modified"
         )
+        if result.upserted_count or result.modified_count:
+            employee_ids = [int(emp["employeeId"]) for emp in employees if "employeeId" in emp]
+            schedule_risk_backfill({"employeeId": {"$in": employee_ids}})
 
         return jsonify(
             {
@@ -784,7 +1474,17 @@ def bulk_employees():
         logger.error(f"Error in /api/employees/bulk: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+
+startup["importSeconds"] = round(time.time() - BOOT_STARTED, 3)
+
+# The debug reloader's watcher process never serves requests, so only its
+# serving child loads models
+if __name__ != "__main__" or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+    start_background_loading()
+
 if __name__ == "__main__":
+    if os.environ.get("WARM_UP_MODELS", "0") == "1" and index_thread is not None:
+        wait_until_loaded()
     app.run(
         host="localhost", port=5001, debug=True
     )  # Port 5001 to avoid clash with Node.js
\ No newline at end of file
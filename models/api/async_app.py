@@ -0,0 +1,362 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+
+from pymongo import ASCENDING
+from quart import Quart, Response, jsonify, request
+from werkzeug.exceptions import HTTPException
+
+# Models, encoders, configuration and the request helpers are shared with the
+# Flask app; importing it starts the same background model loads
+import app as api
+from inference_pool import InferencePool, PoolSaturated
+from sentiment_dashboard import (
+    empty_response,
+    sentiment_filters,
+    sentiment_pipeline,
+    sentiment_response,
+    summary_from_facets,
+)
+from sentiment_rollups import (
+    META_ID,
+    bucket_query,
+    fold_buckets,
+    meta_ready,
+    negative_employee,
+    negative_employees_query,
+)
+
+logger = logging.getLogger(__name__)
+
+# Async MongoDB pool: size limits, idle reaping and how long a request may
+# wait for a free connection before failing instead of piling up
+ASYNC_MONGO_URI = os.environ.get("ASYNC_MONGO_URI", "mongodb://localhost:27017/")
+ASYNC_MONGO_MAX_POOL_SIZE = int(os.environ.get("ASYNC_MONGO_MAX_POOL_SIZE", 100))
+ASYNC_MONGO_MIN_POOL_SIZE = int(os.environ.get("ASYNC_MONGO_MIN_POOL_SIZE", 10))
+ASYNC_MONGO_MAX_IDLE_MS = int(os.environ.get("ASYNC_MONGO_MAX_IDLE_MS", 60000))
+ASYNC_MONGO_WAIT_QUEUE_TIMEOUT_MS = int(
+    os.environ.get("ASYNC_MONGO_WAIT_QUEUE_TIMEOUT_MS", 2000)
+)
+ASYNC_MONGO_SERVER_SELECTION_MS = int(
+    os.environ.get("ASYNC_MONGO_SERVER_SELECTION_MS", 5000)
+)
+
+# Inference offload: scoring threads and the backlog allowed before 503s
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", 2))
+INFERENCE_MAX_PENDING = int(os.environ.get("INFERENCE_MAX_PENDING", 64))
+INFERENCE_RETRY_AFTER_SECONDS = int(os.environ.get("INFERENCE_RETRY_AFTER_SECONDS", 1))
+
+FRONTEND_ORIGIN = "http://localhost:3000"
+
+
+def motor_database(uri=ASYNC_MONGO_URI):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(
+        uri,
+        maxPoolSize=ASYNC_MONGO_MAX_POOL_SIZE,
+        minPoolSize=ASYNC_MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=ASYNC_MONGO_MAX_IDLE_MS,
+        waitQueueTimeoutMS=ASYNC_MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        serverSelectionTimeoutMS=ASYNC_MONGO_SERVER_SELECTION_MS,
+    )
+    return client["prescient"]
+
+
+def stand_in_database():
+    # In-memory MongoDB stand-in for local runs: python async_app.py --mongo-stand-in.
+    # The Flask routes behind dispatch are switched to the same in-memory
+    # client, so both paths see one database
+    import mongomock
+    from mongomock_motor import AsyncMongoMockClient
+
+    client = mongomock.MongoClient()
+    api.mongo.use_client(client)
+    return AsyncMongoMockClient(mock_mongo_client=client)[api.mongo.database]
+
+
+def create_app(db=None, inference=None):
+    """Quart app serving the read paths and /predict without blocking on I/O.
+
+    Must be called with an event loop running. ``db`` is an async database
+    handle (Motor, or a stand-in such as mongomock_motor); by default one is
+    opened with the tuned pool settings above.
+    """
+    db = db if db is not None else motor_database()
+    inference = inference or InferencePool(INFERENCE_WORKERS, INFERENCE_MAX_PENDING)
+    employees_collection = db["employees"]
+    sentiment_collection = db["sentimentfeedbacks"]
+    rollup_buckets = db["sentimentrollups"]
+    rollup_employees = db["sentimentemployeerollups"]
+    rollup_meta = db["sentimentrollupmeta"]
+
+    async_app = Quart(__name__)
+
+    @async_app.errorhandler(PoolSaturated)
+    async def saturated(error):
+        response = jsonify({"status": "error", "message": str(error)})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(INFERENCE_RETRY_AFTER_SECONDS)
+        return response
+
+    @async_app.after_request
+    async def allow_frontend(response):
+        response.headers["Access-Control-Allow-Origin"] = FRONTEND_ORIGIN
+        response.headers["Access-Control-Allow-Headers"] = "Content-Type"
+        return response
+
+    @async_app.after_serving
+    async def stop_inference():
+        inference.shutdown()
+
+    @async_app.route("/healthz", methods=["GET"])
+    async def healthz():
+        return jsonify({"status": "ok", "mode": "async"})
+
+    @async_app.route("/readyz", methods=["GET"])
+    async def readyz():
+        names = [name for name in request.args.get("models", "").split(",") if name]
+        names = names or api.BOOT_MODELS
+        try:
+            states = {name: api.model_registry.state(name) for name in names}
+        except KeyError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        try:
+            await db.command("ping")
+            mongo = "ready"
+        except Exception as e:
+            mongo = f"failed: {e}"
+        ready = mongo == "ready" and all(state == "ready" for state in states.values())
+        return (
+            jsonify({"ready": ready, "mongo": mongo, "models": states}),
+            200 if ready else 503,
+        )
+
+    @async_app.route("/inference", methods=["GET"])
+    async def get_inference_stats():
+        return jsonify(inference.stats())
+
+    # The Flask routes this app falls back to (/api/employees/at-risk,
+    # /drivers, ...) cache reads, so writes here invalidate them the same way
+    @async_app.route("/predict", methods=["POST"])
+    @api.response_cache.invalidates("employees")
+    async def predict():
+        try:
+            data = await request.get_json()
+            if not data:
+                return jsonify({"status": "error", "message": "No data provided"}), 400
+            if api.invalid_employee_id(data):
+                return (
+                    jsonify(
+                        {"status": "error", "message": "Invalid employeeId, must be a number"}
+                    ),
+                    400,
+                )
+
+            prediction, attrition_risk = await inference.run(api.predict_one, data)
+            employee_data = {**data, "attritionRisk": attrition_risk}
+            stored_data = {**employee_data, **api.risk_store.stamp(data)}
+            if "employeeId" in data:
+                await employees_collection.update_one(
+                    {"employeeId": int(data["employeeId"])},
+                    {"$set": stored_data},
+                    upsert=True,
+                )
+            else:
+                await employees_collection.insert_one(stored_data)
+
+            logger.info(
+                f"Prediction made for employeeId {data.get('employeeId')}: {prediction}, Attrition Risk: {attrition_risk}%"
+            )
+            return jsonify(employee_data)
+        except PoolSaturated:
+            raise
+        except Exception as e:
+            logger.error(f"Error in async /predict: {str(e)}")
+            return jsonify({"status": "error", "message": str(e)}), 400
+
+    def find_employees(listing, batch_size=None):
+        cursor = employees_collection.find(listing["filter"], listing["projection"])
+        if listing["sorted"]:
+            cursor = cursor.sort("employeeId", ASCENDING)
+        if listing["limit"]:
+            cursor = cursor.limit(listing["limit"])
+        if batch_size:
+            cursor = cursor.batch_size(batch_size)
+        return cursor
+
+    async def present_employees(batch, listing):
+        # Hashing and scoring run on the inference pool; the write-back is async
+        if listing["score"]:
+            stale, operations = await inference.run(api.risk_store.rescore, batch)
+            if operations:
+                await employees_collection.bulk_write(operations, ordered=False)
+                logger.info(f"Rescored {stale} stale employees")
+        return api.employee_views(batch, listing)
+
+    async def stream_employees(listing):
+        batch = []
+        try:
+            async for doc in find_employees(listing, api.EMPLOYEE_STREAM_BATCH_SIZE):
+                batch.append(doc)
+                if len(batch) >= api.EMPLOYEE_STREAM_BATCH_SIZE:
+                    rows = await present_employees(batch, listing)
+                    yield "".join(json.dumps(row) + "\n" for row in rows)
+                    batch = []
+            if batch:
+                rows = await present_employees(batch, listing)
+                yield "".join(json.dumps(row) + "\n" for row in rows)
+        except Exception as e:
+            logger.error(f"Error streaming async /api/employees: {str(e)}")
+            yield json.dumps({"status": "error", "message": str(e)}) + "\n"
+
+    @async_app.route("/api/employees", methods=["GET"])
+    @api.response_cache.cached("employees")
+    async def get_employees():
+        try:
+            try:
+                listing = api.parse_employee_listing(request.args)
+            except ValueError as e:
+                return jsonify({"status": "error", "message": str(e)}), 400
+
+            if request.args.get("format") == "ndjson" or (
+                "application/x-ndjson" in request.headers.get("Accept", "")
+            ):
+                return Response(stream_employees(listing), mimetype="application/x-ndjson")
+
+            employees = await find_employees(listing).to_list(length=None)
+            if listing["limit"]:
+                next_cursor = None
+                if len(employees) == listing["limit"]:
+                    next_cursor = employees[-1].get("employeeId")
+                page = await present_employees(employees, listing)
+                return jsonify({"employees": page, "nextCursor": next_cursor})
+            return jsonify(await present_employees(employees, listing))
+        except PoolSaturated:
+            raise
+        except Exception as e:
+            logger.error(f"Error in async /api/employees: {str(e)}")
+            return jsonify({"status": "error", "message": str(e)}), 500
+
+    @async_app.route("/api/employees/<int:employeeId>", methods=["DELETE"])
+    @api.response_cache.invalidates("employees")
+    async def delete_employee(employeeId):
+        try:
+            result = await employees_collection.delete_one({"employeeId": employeeId})
+            if result.deleted_count == 0:
+                return jsonify({"status": "error", "message": "Employee not found"}), 404
+            # Same as SentimentRollups.remove_employee; the rebuild runs on
+            # the Flask app's rollups, which share the database
+            removed = await rollup_employees.delete_one({"_id": employeeId})
+            if removed.deleted_count:
+                reason = f"employee {employeeId} deleted"
+                await rollup_meta.update_one({"_id": META_ID}, {"$set": {"dirty": reason}})
+                api.sentiment_rollups.rebuild_in_background()
+            return jsonify({"status": "success", "message": "Employee deleted successfully"})
+        except Exception as e:
+            logger.error(f"Error in async delete_employee: {str(e)}")
+            return jsonify({"status": "error", "message": str(e)}), 500
+
+    async def negative_employees(type_param, start_date, department):
+        plan = negative_employees_query(type_param, start_date, department)
+        if plan is None:
+            return []
+        query, slot = plan
+        cursor = rollup_employees.find(query).sort(f"{slot}.score", ASCENDING)
+        return [negative_employee(doc, slot) for doc in await cursor.to_list(length=None)]
+
+    @async_app.route("/sentiment", methods=["GET"])
+    @api.response_cache.cached("sentiment", "employees")
+    async def get_sentiment():
+        try:
+            type_param, start_date, department_filter = sentiment_filters(request.args)
+
+            rollups_ready = api.SENTIMENT_ROLLUPS_ENABLED and meta_ready(
+                await rollup_meta.find_one({"_id": META_ID})
+            )
+            if rollups_ready:
+                # The bucket scan and the negative-employee lookup are
+                # independent, so both queries are in flight at once
+                buckets, employees = await asyncio.gather(
+                    rollup_buckets.find(
+                        bucket_query(start_date, department_filter)
+                    ).to_list(length=None),
+                    negative_employees(type_param, start_date, department_filter),
+                )
+                summary = fold_buckets(buckets, type_param)
+                summary["employees"] = employees
+            else:
+                pipeline = sentiment_pipeline(
+                    type_param, start_date, department_filter, employees_collection.name
+                )
+                facets = await sentiment_collection.aggregate(
+                    pipeline, allowDiskUse=True
+                ).to_list(length=1)
+                summary = summary_from_facets(facets[0] if facets else {})
+
+            if summary["total"] == 0:
+                return jsonify(empty_response())
+            return jsonify(sentiment_response(summary))
+        except Exception as e:
+            logger.error(f"Error in async /sentiment: {str(e)}")
+            return jsonify({"status": "error", "message": str(e)}), 500
+
+    @async_app.route("/feedback/<int:employee_id>", methods=["GET"])
+    @api.response_cache.cached(tags_for=lambda employee_id: [f"feedback:{employee_id}"])
+    async def get_feedback(employee_id):
+        cursor = sentiment_collection.find({"employeeId": employee_id}).sort("date", -1)
+        feedbacks = await cursor.to_list(length=None)
+        if not feedbacks:
+            return jsonify({"status": "error", "message": "Feedback not found"}), 404
+        for feedback in feedbacks:
+            feedback["_id"] = str(feedback["_id"])
+            feedback["employee"] = str(feedback["employee"])
+            feedback["date"] = feedback["date"].strftime("%Y-%m-%d") if feedback["date"] else "N/A"
+        return jsonify({"feedbacks": feedbacks}), 200
+
+    return async_app
+
+
+def dispatch(native, fallback):
+    """ASGI app that serves ``native`` routes and hands everything else to ``fallback``.
+
+    Uploads, bulk writes and the admin routes keep their Flask
+    implementation, run on threads through the WSGI adapter.
+    """
+    adapter = native.url_map.bind("")
+
+    async def application(scope, receive, send):
+        if scope["type"] == "http":
+            try:
+                adapter.match(scope["path"], method=scope["method"])
+            except HTTPException:
+                return await fallback(scope, receive, send)
+        return await native(scope, receive, send)
+
+    return application
+
+
+async def serve(host, port, stand_in=False):
+    from asgiref.wsgi import WsgiToAsgi
+    from hypercorn.asyncio import serve as hypercorn_serve
+    from hypercorn.config import Config
+
+    config = Config()
+    config.bind = [f"{host}:{port}"]
+    async_app = create_app(stand_in_database() if stand_in else None)
+    await hypercorn_serve(dispatch(async_app, WsgiToAsgi(api.app)), config)
+
+
+if __name__ == "__main__":
+    # python async_app.py [--mongo-stand-in]  (run from models/api, like app.py)
+    parser = argparse.ArgumentParser(description="Serve the API on asyncio")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument(
+        "--mongo-stand-in", action="store_true",
+        help="serve both the async and the Flask routes from an in-memory MongoDB stand-in",
+    )
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port, args.mongo_stand_in))
@@ -0,0 +1,330 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from feature_encoding import (
+    FEATURE_COLUMNS,
+    FEATURE_RENAME_MAP,
+    FeatureEncoder,
+    encoder_paths,
+    reference_preprocess,
+)
+from forest_engine import CompiledForest
+
+logger = logging.getLogger(__name__)
+
+# Inclusive ranges of the numeric features in the IBM HR attrition data the
+# model was trained on
+NUMERIC_RANGES = {
+    "Age": (18, 60),
+    "DailyRate": (102, 1499),
+    "DistanceFromHome": (1, 29),
+    "Education": (1, 5),
+    "EnvironmentSatisfaction": (1, 4),
+    "HourlyRate": (30, 100),
+    "JobInvolvement": (1, 4),
+    "JobLevel": (1, 5),
+    "JobSatisfaction": (1, 4),
+    "MonthlyIncome": (1009, 19999),
+    "MonthlyRate": (2094, 26999),
+    "NumCompaniesWorked": (0, 9),
+    "PercentSalaryHike": (11, 25),
+    "PerformanceRating": (3, 4),
+    "RelationshipSatisfaction": (1, 4),
+    "StockOptionLevel": (0, 3),
+    "TotalWorkingYears": (0, 40),
+    "TrainingTimesLastYear": (0, 6),
+    "WorkLifeBalance": (1, 4),
+    "YearsAtCompany": (0, 40),
+    "YearsInCurrentRole": (0, 18),
+    "YearsSinceLastPromotion": (0, 15),
+    "YearsWithCurrManager": (0, 17),
+}
+
+FEEDBACK_PHRASES = [
+    "my manager supports my growth",
+    "the team is friendly and helpful",
+    "I feel valued and fairly paid",
+    "leadership communicates clearly",
+    "the workload is unmanageable",
+    "nobody listens to our concerns",
+    "promotions are slow and unclear",
+    "I am thinking about leaving",
+    "constant overtime is exhausting",
+    "meetings waste most of my day",
+    "the office is fine",
+    "nothing special to report this quarter",
+    "benefits are about what I expected",
+]
+
+ENCODING_SIZES = [1, 10, 100, 1000, 10000, 100000]
+PREDICT_SIZES = [1, 10, 100, 1000, 10000, 100000]
+SENTIMENT_WORDS = [8, 32, 128, 384]
+SENTIMENT_BATCH_SIZES = [1, 8, 32, 64]
+
+
+def synthetic_employees(n, encoders, seed=0, unknown_rate=0.0):
+    """``n`` employees as a PascalCase DataFrame in FEATURE_COLUMNS order.
+
+    Categorical values are drawn from each encoder's ``classes_``; with
+    ``unknown_rate`` a share of them is replaced by an unseen value.
+    """
+    rng = np.random.default_rng(seed)
+    data = {}
+    for col in FEATURE_COLUMNS:
+        if col in encoders:
+            values = rng.choice(np.asarray(encoders[col].classes_, dtype=object), size=n)
+            if unknown_rate:
+                values[rng.random(n) < unknown_rate] = "__unknown__"
+            data[col] = values
+        else:
+            low, high = NUMERIC_RANGES[col]
+            data[col] = rng.integers(low, high + 1, size=n)
+    return pd.DataFrame(data, columns=FEATURE_COLUMNS)
+
+
+def synthetic_records(n, encoders, seed=0):
+    # The camelCase payloads /predict and /api/employees receive
+    camel = {target: source for source, target in FEATURE_RENAME_MAP.items()}
+    df = synthetic_employees(n, encoders, seed).rename(columns=camel)
+    return [
+        {key: (value.item() if hasattr(value, "item") else value) for key, value in row.items()}
+        for row in df.to_dict("records")
+    ]
+
+
+def synthetic_feedback(n, words, seed=0):
+    """``n`` feedback texts of exactly ``words`` words built from survey-like phrases."""
+    rng = np.random.default_rng(seed)
+    texts = []
+    for _ in range(n):
+        out = []
+        while len(out) < words:
+            out.extend(FEEDBACK_PHRASES[rng.integers(len(FEEDBACK_PHRASES))].split())
+        texts.append(" ".join(out[:words]).capitalize() + ".")
+    return texts
+
+
+def measure(fn, rows, min_repeats=5, max_repeats=1000, min_seconds=1.0):
+    """Time ``fn()`` after one warm-up call; returns latency percentiles and throughput."""
+    fn()
+    latencies = []
+    started = time.perf_counter()
+    while len(latencies) < max_repeats and (
+        len(latencies) < min_repeats or time.perf_counter() - started < min_seconds
+    ):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    latencies = np.asarray(latencies) * 1000
+    mean_ms = float(latencies.mean())
+    return {
+        "repeats": len(latencies),
+        "meanMs": round(mean_ms, 4),
+        "p50Ms": round(float(np.percentile(latencies, 50)), 4),
+        "p90Ms": round(float(np.percentile(latencies, 90)), 4),
+        "p99Ms": round(float(np.percentile(latencies, 99)), 4),
+        "rowsPerSecond": round(rows / mean_ms * 1000, 1) if mean_ms else None,
+    }
+
+
+def bench_encoding(encoders, sizes, options):
+    feature_encoder = FeatureEncoder(encoders, FEATURE_COLUMNS)
+    results = []
+    for size in sizes:
+        df = synthetic_employees(size, encoders, seed=size, unknown_rate=0.01)
+        cases = [("transform", lambda: feature_encoder.transform(df))]
+        if size <= 10000:
+            records = synthetic_records(size, encoders, seed=size)
+            cases.append(("transform_records", lambda: feature_encoder.transform_records(records)))
+        if size <= 1000:
+            # The original per-cell path, for reference
+            cases.append(
+                ("reference_preprocess", lambda: reference_preprocess(df, encoders, FEATURE_COLUMNS))
+            )
+        for name, fn in cases:
+            results.append(
+                {"suite": "encoding", "name": name, "batchSize": size, **measure(fn, size, **options)}
+            )
+            logger.info(f"encoding/{name} x{size}: {results[-1]['p50Ms']} ms p50")
+    return results
+
+
+def bench_predict(model, encoders, sizes, options):
+    feature_encoder = FeatureEncoder(encoders, FEATURE_COLUMNS)
+    compiled = CompiledForest.from_sklearn(model)
+    results = []
+    for size in sizes:
+        features = feature_encoder.transform(synthetic_employees(size, encoders, seed=size))
+        frame = feature_encoder.to_frame(features)
+        cases = [
+            ("sklearn", lambda: model.predict_proba(frame)),
+            ("compiled", lambda: compiled.predict_proba(features)),
+        ]
+        for name, fn in cases:
+            results.append(
+                {"suite": "predict_proba", "name": name, "batchSize": size, **measure(fn, size, **options)}
+            )
+            logger.info(f"predict_proba/{name} x{size}: {results[-1]['p50Ms']} ms p50")
+    return results
+
+
+def bench_sentiment(checkpoint, word_counts, batch_sizes, options):
+    from sentiment_engine import SentimentScorer
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(checkpoint)
+    scorer = SentimentScorer(
+        tokenizer, AutoModelForSequenceClassification.from_pretrained(checkpoint)
+    )
+    results = []
+    for words in word_counts:
+        for size in batch_sizes:
+            texts = synthetic_feedback(size, words, seed=words * 1000 + size)
+            cases = [
+                ("tokenize", lambda: tokenizer(texts, truncation=True, max_length=scorer.max_length)),
+                ("predict_proba", lambda: scorer.predict_proba(texts)),
+            ]
+            for name, fn in cases:
+                results.append(
+                    {
+                        "suite": "sentiment",
+                        "name": name,
+                        "batchSize": size,
+                        "textWords": words,
+                        **measure(fn, size, **options),
+                    }
+                )
+                logger.info(
+                    f"sentiment/{name} {words} words x{size}: {results[-1]['p50Ms']} ms p50"
+                )
+    return results
+
+
+def environment():
+    versions = {"python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__}
+    for module in ("sklearn", "torch", "transformers"):
+        if module in sys.modules:
+            versions[module] = sys.modules[module].__version__
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "createdAt": datetime.utcnow().isoformat(),
+        "gitCommit": commit,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "versions": versions,
+    }
+
+
+def result_key(result):
+    return (result["suite"], result["name"], result["batchSize"], result.get("textWords"))
+
+
+def compare(baseline, current, threshold):
+    """Results whose p50 latency grew by more than ``threshold`` (a fraction) over the baseline."""
+    previous = {result_key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        before = previous.get(result_key(result))
+        if before is None or not before["p50Ms"]:
+            continue
+        change = result["p50Ms"] / before["p50Ms"] - 1
+        if change > threshold:
+            regressions.append(
+                {
+                    "suite": result["suite"],
+                    "name": result["name"],
+                    "batchSize": result["batchSize"],
+                    "textWords": result.get("textWords"),
+                    "baselineP50Ms": before["p50Ms"],
+                    "p50Ms": result["p50Ms"],
+                    "change": round(change, 4),
+                }
+            )
+    return regressions
+
+
+def parse_sizes(value):
+    return [int(size) for size in value.split(",") if size]
+
+
+if __name__ == "__main__":
+    # python benchmarks.py --output run.json [--baseline previous.json]
+    # (run from models/api, like app.py)
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the scoring hot paths")
+    parser.add_argument(
+        "--suites", default="encoding,predict_proba,sentiment",
+        help="comma-separated subset of encoding, predict_proba, sentiment",
+    )
+    parser.add_argument("--model", default="../rf_attrition_model.pkl")
+    parser.add_argument("--encoders", default="../Encoders/")
+    parser.add_argument("--checkpoint", default="../bert_model/")
+    parser.add_argument("--encoding-sizes", type=parse_sizes, default=ENCODING_SIZES)
+    parser.add_argument("--predict-sizes", type=parse_sizes, default=PREDICT_SIZES)
+    parser.add_argument("--sentiment-words", type=parse_sizes, default=SENTIMENT_WORDS)
+    parser.add_argument("--sentiment-batch-sizes", type=parse_sizes, default=SENTIMENT_BATCH_SIZES)
+    parser.add_argument("--min-seconds", type=float, default=1.0, help="minimum timed seconds per case")
+    parser.add_argument("--min-repeats", type=int, default=5)
+    parser.add_argument("--torch-threads", type=int, help="torch intra-op threads")
+    parser.add_argument("--output", help="write the results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument(
+        "--threshold", type=float, default=0.10,
+        help="flag a p50 slowdown larger than this fraction (default 0.10)",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    suites = [suite for suite in args.suites.split(",") if suite]
+    options = {"min_seconds": args.min_seconds, "min_repeats": args.min_repeats}
+    encoders = {
+        col: joblib.load(path) for col, path in encoder_paths(args.encoders).items()
+    }
+
+    results = []
+    if "encoding" in suites:
+        results += bench_encoding(encoders, args.encoding_sizes, options)
+    if "predict_proba" in suites:
+        results += bench_predict(joblib.load(args.model), encoders, args.predict_sizes, options)
+    if "sentiment" in suites:
+        if args.torch_threads:
+            import torch
+
+            torch.set_num_threads(args.torch_threads)
+        results += bench_sentiment(
+            args.checkpoint, args.sentiment_words, args.sentiment_batch_sizes, options
+        )
+
+    run = {"environment": environment(), "results": results}
+    if args.baseline:
+        with open(args.baseline) as f:
+            run["regressions"] = compare(json.load(f), run, args.threshold)
+
+    report = json.dumps(run, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    else:
+        print(report)
+
+    for regression in run.get("regressions", []):
+        logger.warning(
+            f"Regression in {regression['suite']}/{regression['name']} x{regression['batchSize']}: "
+            f"{regression['baselineP50Ms']} -> {regression['p50Ms']} ms p50"
+        )
+    sys.exit(1 if run.get("regressions") else 0)
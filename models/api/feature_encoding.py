@@ -0,0 +1,234 @@
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Employee documents use camelCase; the model was trained on PascalCase columns
+FEATURE_RENAME_MAP = {
+    "age": "Age",
+    "businessTravel": "BusinessTravel",
+    "dailyRate": "DailyRate",
+    "department": "Department",
+    "distanceFromHome": "DistanceFromHome",
+    "education": "Education",
+    "educationField": "EducationField",
+    "environmentSatisfaction": "EnvironmentSatisfaction",
+    "gender": "Gender",
+    "hourlyRate": "HourlyRate",
+    "jobInvolvement": "JobInvolvement",
+    "jobLevel": "JobLevel",
+    "jobRole": "JobRole",
+    "jobSatisfaction": "JobSatisfaction",
+    "maritalStatus": "MaritalStatus",
+    "monthlyIncome": "MonthlyIncome",
+    "monthlyRate": "MonthlyRate",
+    "numCompaniesWorked": "NumCompaniesWorked",
+    "overTime": "OverTime",
+    "percentSalaryHike": "PercentSalaryHike",
+    "performanceRating": "PerformanceRating",
+    "relationshipSatisfaction": "RelationshipSatisfaction",
+    "stockOptionLevel": "StockOptionLevel",
+    "totalWorkingYears": "TotalWorkingYears",
+    "trainingTimesLastYear": "TrainingTimesLastYear",
+    "workLifeBalance": "WorkLifeBalance",
+    "yearsAtCompany": "YearsAtCompany",
+    "yearsInCurrentRole": "YearsInCurrentRole",
+    "yearsSinceLastPromotion": "YearsSinceLastPromotion",
+    "yearsWithCurrManager": "YearsWithCurrManager",
+}
+
+# Column order the Random Forest was trained on
+FEATURE_COLUMNS = [
+    "Age",
+    "BusinessTravel",
+    "DailyRate",
+    "Department",
+    "DistanceFromHome",
+    "Education",
+    "EducationField",
+    "EnvironmentSatisfaction",
+    "Gender",
+    "HourlyRate",
+    "JobInvolvement",
+    "JobLevel",
+    "JobRole",
+    "JobSatisfaction",
+    "MaritalStatus",
+    "MonthlyIncome",
+    "MonthlyRate",
+    "NumCompaniesWorked",
+    "OverTime",
+    "PercentSalaryHike",
+    "PerformanceRating",
+    "RelationshipSatisfaction",
+    "StockOptionLevel",
+    "TotalWorkingYears",
+    "TrainingTimesLastYear",
+    "WorkLifeBalance",
+    "YearsAtCompany",
+    "YearsInCurrentRole",
+    "YearsSinceLastPromotion",
+    "YearsWithCurrManager",
+]
+
+# Categorical columns, each with a fitted LabelEncoder in the Encoders directory
+ENCODED_COLUMNS = [
+    "JobRole",
+    "Department",
+    "BusinessTravel",
+    "Gender",
+    "OverTime",
+    "MaritalStatus",
+    "EducationField",
+]
+
+
+def encoder_paths(encoders_path, columns=ENCODED_COLUMNS):
+    return {
+        col: os.path.join(encoders_path, f"label_encoder_{col.lower()}.pkl")
+        for col in columns
+    }
+
+
+def reference_preprocess(df, encoders, feature_columns, rename_map=FEATURE_RENAME_MAP):
+    """The original per-cell implementation, kept to verify FeatureEncoder against."""
+    df = df.copy()
+    df = df.rename(columns=rename_map)
+
+    for col in encoders:
+        if col in df.columns:
+            df[col] = df[col].apply(
+                lambda x: (
+                    x if x in encoders[col].classes_ else encoders[col].classes_[0]
+                )
+            )
+            df[col] = encoders[col].transform(df[col])
+
+    missing_cols = [col for col in feature_columns if col not in df.columns]
+    if missing_cols:
+        raise ValueError(f"Missing columns: {missing_cols}")
+
+    return df[feature_columns]
+
+
+def feature_source_keys(feature_columns, rename_map=FEATURE_RENAME_MAP):
+    # Reverse map so record input can be read under either spelling
+    source_keys = {col: [col] for col in feature_columns}
+    for source, target in rename_map.items():
+        if target in source_keys:
+            source_keys[target].append(source)
+    return source_keys
+
+
+class FeatureEncoder:
+    """Precompiled replacement for the per-cell LabelEncoder preprocessing.
+
+    Each categorical column gets a value -> code lookup table built once from
+    ``classes_`` (codes are positions in ``classes_``, exactly what
+    ``LabelEncoder.transform`` returns); unknown values map to code 0, i.e.
+    ``classes_[0]``. Whole columns are encoded with a single hash lookup and
+    written straight into a C-contiguous float64 matrix in feature order.
+    """
+
+    def __init__(self, encoders, feature_columns, rename_map=FEATURE_RENAME_MAP):
+        self.encoders = encoders
+        self.feature_columns = list(feature_columns)
+        self.rename_map = dict(rename_map)
+        self.lookups = {
+            col: {value: code for code, value in enumerate(encoder.classes_)}
+            for col, encoder in encoders.items()
+        }
+        self.source_keys = feature_source_keys(self.feature_columns, self.rename_map)
+
+    def _column_names(self, columns):
+        renamed = [self.rename_map.get(col, col) for col in columns]
+        duplicated = sorted({col for col in renamed if renamed.count(col) > 1})
+        if duplicated:
+            raise ValueError(f"Duplicate columns after renaming: {duplicated}")
+        missing_cols = [col for col in self.feature_columns if col not in renamed]
+        if missing_cols:
+            raise ValueError(f"Missing columns: {missing_cols}")
+        return dict(zip(renamed, columns))
+
+    def encode_value(self, col, value):
+        try:
+            return self.lookups[col].get(value, 0)
+        except TypeError:  # unhashable values are never valid classes
+            return 0
+
+    def transform(self, df):
+        """Encode a DataFrame into an (n, n_features) float64 matrix."""
+        sources = self._column_names(df.columns)
+        out = np.empty((len(df), len(self.feature_columns)), dtype=np.float64)
+        for j, col in enumerate(self.feature_columns):
+            series = df[sources[col]]
+            if col in self.lookups:
+                out[:, j] = series.map(self.lookups[col]).fillna(0).to_numpy(
+                    dtype=np.float64
+                )
+            else:
+                out[:, j] = series.to_numpy(dtype=np.float64)
+        return out
+
+    def check_record(self, record):
+        """Raise the error ``transform_records([record])`` would for a missing feature.
+
+        Lets a caller reject one record before it is combined with others,
+        where the feature would otherwise only be NaN in that row.
+        """
+        self._column_names(record)
+
+    def transform_records(self, records):
+        """Encode a list of dicts without building a DataFrame.
+
+        Matches ``transform(pd.DataFrame(records))``: a feature absent from
+        every record is an error, absent from only some records it is NaN.
+        """
+        present = set()
+        for record in records:
+            present.update(record)
+        self._column_names(present)
+
+        keys = []
+        for col in self.feature_columns:
+            keys.append(next(key for key in self.source_keys[col] if key in present))
+
+        out = np.empty((len(records), len(self.feature_columns)), dtype=np.float64)
+        for i, record in enumerate(records):
+            for j, col in enumerate(self.feature_columns):
+                value = record.get(keys[j])
+                if col in self.lookups:
+                    out[i, j] = self.encode_value(col, value)
+                else:
+                    out[i, j] = np.nan if value is None else float(value)
+        return out
+
+    def to_frame(self, matrix):
+        # A single float block, so this wraps the matrix without copying it
+        return pd.DataFrame(matrix, columns=self.feature_columns, copy=False)
+
+    def verify(self, df):
+        """Return True if transform(df) is bit-identical to the reference path."""
+        expected = np.ascontiguousarray(
+            reference_preprocess(df, self.encoders, self.feature_columns),
+            dtype=np.float64,
+        )
+        actual = self.transform(df)
+        return expected.shape == actual.shape and np.array_equal(
+            expected.view(np.uint64), actual.view(np.uint64)
+        )
+
+    def sample_frame(self):
+        """A small frame covering every known class plus one unknown value per column."""
+        width = max(len(lookup) for lookup in self.lookups.values()) + 1
+        data = {}
+        for j, col in enumerate(self.feature_columns):
+            if col in self.lookups:
+                classes = list(self.lookups[col]) + ["__unknown__"]
+                data[col] = [classes[i % len(classes)] for i in range(width)]
+            else:
+                data[col] = [float(i * (j + 1)) for i in range(width)]
+        return pd.DataFrame(data)
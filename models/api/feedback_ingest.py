@@ -0,0 +1,289 @@
+import logging
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+SATISFACTION_COL = "How satisfied are you with your current job overall?"
+
+# /analyze-sentiment CSV layout
+GENERAL_REQUIRED_COLUMNS = ["Employee ID", "Email", "GeneralFeedback"]
+
+# /upload-feedback (survey export) CSV layout
+SURVEY_FEEDBACK_COL = "How do you feel about your current working environment?"
+SURVEY_COMMENTS_COL = (
+    "Is there anything specific (e.g., workload, management, growth opportunities) "
+    "you would like to mention?"
+)
+SURVEY_REQUIRED_COLUMNS = ["Employee ID", SURVEY_FEEDBACK_COL]
+
+
+def missing_columns(df, required_columns):
+    return [col for col in required_columns if col not in df.columns]
+
+
+def _native(value):
+    # CSV cells can surface as NumPy scalars, which BSON cannot encode
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class FeedbackIngestor:
+    """Stores scored feedback CSVs with a fixed number of Mongo round trips.
+
+    Every row's employee is resolved with one ``$in`` query up front, all
+    feedback documents go out in one ``insert_many`` and the latest
+    ``sentimentScore`` per employee is applied with one ``bulk_write``.
+    Scoring is delegated to ``score_general`` / ``score_survey``, which take
+    a list of texts and return softmax probabilities in the same order.
+    When ``rollups`` is given, stored feedback is also folded into the
+    dashboard's materialized sentiment rollups.
+    """
+
+    def __init__(
+        self,
+        employees_collection,
+        sentiment_collection,
+        score_general,
+        score_survey,
+        rollups=None,
+    ):
+        self.employees_collection = employees_collection
+        self.sentiment_collection = sentiment_collection
+        self.score_general = score_general
+        self.score_survey = score_survey
+        self.rollups = rollups
+
+    def resolve_employees(self, employee_ids=(), emails=()):
+        """Map employeeId and email to employee documents with a single query."""
+        clauses = []
+        if employee_ids:
+            clauses.append({"employeeId": {"$in": list(employee_ids)}})
+        if emails:
+            clauses.append({"email": {"$in": list(emails)}})
+        if not clauses:
+            return {}, {}
+
+        query = clauses[0] if len(clauses) == 1 else {"$or": clauses}
+        by_id, by_email = {}, {}
+        # setdefault keeps the first match, as find_one did
+        for employee in self.employees_collection.find(query):
+            if "employeeId" in employee:
+                by_id.setdefault(employee["employeeId"], employee)
+            if employee.get("email"):
+                by_email.setdefault(employee["email"], employee)
+        return by_id, by_email
+
+    def store(self, feedback_docs, employees, latest_scores):
+        """Insert feedback documents and set each employee's latest sentimentScore.
+
+        ``employees`` holds the employee document of each feedback document.
+        """
+        if feedback_docs:
+            self.sentiment_collection.insert_many(feedback_docs)
+            if self.rollups is not None:
+                try:
+                    self.rollups.apply(list(zip(feedback_docs, employees)))
+                except Exception as e:
+                    # Feedback is stored; the dashboard reads it raw until a rebuild
+                    logger.error(f"Error updating sentiment rollups: {e}")
+                    try:
+                        self.rollups.mark_dirty(f"apply failed: {e}")
+                    except Exception as e:
+                        logger.error(f"Error marking sentiment rollups dirty: {e}")
+        if latest_scores:
+            operations = [
+                UpdateOne({"employeeId": employee_id}, {"$set": {"sentimentScore": score}})
+                for employee_id, score in latest_scores.items()
+            ]
+            result = self.employees_collection.bulk_write(operations, ordered=False)
+            logger.info(
+                f"Stored {len(feedback_docs)} feedback entries, "
+                f"{result.modified_count} employee sentiment scores changed"
+            )
+
+    def ingest_in_chunks(self, ingest, df, chunk_size, progress=None):
+        """Run ``ingest`` (ingest_general or ingest_survey) over ``df`` in row chunks.
+
+        Chunks are stored in order, so later rows still win. A failing chunk
+        is reported to ``progress(rows_done, error)`` and skipped; the items
+        of all other chunks are returned together.
+        """
+        items = []
+        for start in range(0, len(df), chunk_size):
+            chunk = df.iloc[start:start + chunk_size]
+            error = None
+            try:
+                items.extend(ingest(chunk))
+            except Exception as e:
+                logger.error(f"Feedback rows {start}-{start + len(chunk) - 1} failed: {e}")
+                error = {"rows": [start, start + len(chunk) - 1], "message": str(e)}
+            if progress is not None:
+                progress(start + len(chunk), error)
+        return items
+
+    def ingest_general(self, df):
+        """Score and store an /analyze-sentiment CSV; returns the response results."""
+        has_specific = "SpecificFeedback" in df.columns
+        has_satisfaction = SATISFACTION_COL in df.columns
+
+        parsed = []
+        for index, row in zip(df.index, df.to_dict("records")):
+            employee_id = _native(row["Employee ID"]) if pd.notna(row["Employee ID"]) else None
+            email = _native(row["Email"]) if pd.notna(row["Email"]) else None
+            if employee_id is None and email is None:
+                logger.warning(f"No valid Employee ID or Email for row {index}")
+                continue
+            parsed.append((index, employee_id, email, row))
+
+        by_id, by_email = self.resolve_employees(
+            {employee_id for _, employee_id, _, _ in parsed if employee_id is not None},
+            {email for _, employee_id, email, _ in parsed if employee_id is None},
+        )
+
+        # Resolve rows to employees first so BERT only sees rows we will store
+        rows = []
+        for index, employee_id, email, row in parsed:
+            if employee_id is not None:
+                employee = by_id.get(employee_id)
+            else:
+                employee = by_email.get(email)
+            if not employee:
+                logger.warning(f"Employee not found for ID/Email: {employee_id or email}")
+                continue
+
+            general_feedback = (
+                str(row["GeneralFeedback"]) if pd.notna(row["GeneralFeedback"]) else ""
+            )
+            specific_feedback = (
+                str(row["SpecificFeedback"])
+                if has_specific and pd.notna(row["SpecificFeedback"])
+                else None
+            )
+            satisfaction = (
+                int(row[SATISFACTION_COL])
+                if has_satisfaction and pd.notna(row[SATISFACTION_COL])
+                else None
+            )
+            rows.append((employee, general_feedback, specific_feedback, satisfaction))
+
+        probabilities = self.score_general([row[1] for row in rows]) if rows else []
+
+        results = []
+        feedback_docs = []
+        feedback_employees = []
+        latest_scores = {}
+        for (employee, general_feedback, specific_feedback, satisfaction), score in zip(
+            rows, probabilities
+        ):
+            sentiment_score = float(score[1]) - float(score[0])  # Scale -1 to 1
+            feedback_docs.append(
+                {
+                    "employee": str(employee["_id"]),  # Store ObjectId as string
+                    "generalFeedback": general_feedback,
+                    "specificFeedback": specific_feedback,
+                    "sentimentScore": sentiment_score,
+                    "satisfactionRating": satisfaction,
+                    "date": pd.Timestamp.now().isoformat(),
+                }
+            )
+            feedback_employees.append(employee)
+            # Later rows win, as with the former per-row update_one
+            latest_scores[employee["employeeId"]] = sentiment_score
+            results.append(
+                {"employeeId": employee["employeeId"], "sentimentScore": sentiment_score}
+            )
+
+        self.store(feedback_docs, feedback_employees, latest_scores)
+        return results
+
+    def ingest_survey(self, df):
+        """Score and store an /upload-feedback survey CSV; returns the response feedbacks."""
+        has_satisfaction = SATISFACTION_COL in df.columns
+        has_comments = SURVEY_COMMENTS_COL in df.columns
+        has_timestamp = "Timestamp" in df.columns
+
+        parsed = []
+        for index, row in zip(df.index, df.to_dict("records")):
+            employee_id = int(row["Employee ID"]) if pd.notna(row["Employee ID"]) else None
+            if not employee_id:
+                logger.warning(f"No valid Employee ID at row {index}, skipping")
+                continue
+            parsed.append((employee_id, row))
+
+        by_id, _ = self.resolve_employees({employee_id for employee_id, _ in parsed})
+
+        rows = []
+        for employee_id, row in parsed:
+            employee = by_id.get(employee_id)
+            if not employee:
+                logger.warning(f"Employee ID {employee_id} not found, skipping")
+                continue
+
+            feedback = (
+                str(row[SURVEY_FEEDBACK_COL]) if pd.notna(row[SURVEY_FEEDBACK_COL]) else ""
+            )
+            satisfaction = (
+                int(row[SATISFACTION_COL])
+                if has_satisfaction and pd.notna(row[SATISFACTION_COL])
+                else None
+            )
+            comments = (
+                str(row[SURVEY_COMMENTS_COL])
+                if has_comments and pd.notna(row[SURVEY_COMMENTS_COL])
+                else ""
+            )
+            date = (
+                datetime.strptime(row["Timestamp"], "%m/%d/%Y %H:%M:%S")
+                if has_timestamp and pd.notna(row["Timestamp"])
+                else datetime.now()
+            )
+            rows.append((employee, employee_id, feedback, satisfaction, comments, date))
+
+        # Only non-empty feedback goes through the model; the rest scores 0.0
+        scored = [i for i, row in enumerate(rows) if row[2] and row[2].lower() != "nan"]
+        probabilities = {}
+        if scored:
+            batch_scores = self.score_survey([rows[i][2] for i in scored])
+            probabilities = dict(zip(scored, batch_scores))
+
+        feedbacks = []
+        feedback_docs = []
+        feedback_employees = []
+        latest_scores = {}
+        for i, (employee, employee_id, feedback, satisfaction, comments, date) in enumerate(rows):
+            sentiment_score = 0.0
+            if i in probabilities:
+                scores = probabilities[i]
+                logger.debug(
+                    f"Employee {employee_id} raw scores: negative={scores[0]}, positive={scores[1]}"
+                )
+                sentiment_score = float(scores[1] - scores[0])  # Scale -1 to 1
+
+            feedback_docs.append(
+                {
+                    "employee": employee["_id"],  # Use ObjectId directly
+                    "employeeId": employee_id,  # Optional: for easier querying
+                    "sentimentScore": sentiment_score,
+                    "date": date,
+                    "feedbackText": feedback,
+                    "satisfactionScore": satisfaction,
+                    "additionalComments": comments,
+                }
+            )
+            feedback_employees.append(employee)
+            latest_scores[employee_id] = sentiment_score
+            feedbacks.append(
+                {
+                    "employeeId": employee_id,
+                    "sentimentScore": sentiment_score,
+                    "feedbackText": feedback,
+                    "satisfactionScore": satisfaction,
+                    "additionalComments": comments,
+                }
+            )
+
+        self.store(feedback_docs, feedback_employees, latest_scores)
+        return feedbacks
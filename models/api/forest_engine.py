@@ -0,0 +1,165 @@
+import logging
+import warnings
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_TREE_LEAF = -1
+
+
+class CompiledForest:
+    """Array-backed evaluator for a fitted sklearn RandomForestClassifier.
+
+    All trees are flattened into one node table (feature, threshold, left,
+    right, leaf probabilities) and walked level by level for every tree and
+    row at once, so a prediction is ``max_depth`` vectorized NumPy steps
+    instead of a Python-level call per tree. Leaves point at themselves, which
+    lets the walk run a fixed number of steps without masking.
+
+    Probabilities reproduce ``RandomForestClassifier.predict_proba`` exactly:
+    input is cast to float32 like sklearn does, each leaf holds the tree's
+    normalized class distribution, and trees are accumulated in estimator
+    order before dividing by the number of trees.
+
+    Batches larger than ``max_rows`` are handed to sklearn, whose per-tree
+    loop is the better fit once the (trees x rows) walk stops being small.
+    """
+
+    def __init__(self, model, max_rows=256):
+        self.model = model
+        self.max_rows = max_rows
+        self.classes_ = model.classes_
+        self.n_features = model.n_features_in_
+        n_classes = len(self.classes_)
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        max_depth = 0
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(n_nodes)
+            is_leaf = tree.children_left == _TREE_LEAF
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+
+            # Same normalization DecisionTreeClassifier.predict_proba applies
+            proba = np.array(tree.value[:, 0, :n_classes], dtype=np.float64)
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            proba /= normalizer
+            values.append(proba)
+
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n_nodes
+
+        self.feature = np.concatenate(features).astype(np.intp)
+        self.threshold = np.concatenate(thresholds).astype(np.float64)
+        self.left = np.concatenate(lefts).astype(np.intp)
+        self.right = np.concatenate(rights).astype(np.intp)
+        self.value = np.concatenate(values)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.max_depth = max_depth
+        logger.info(
+            f"Compiled forest: {len(self.roots)} trees, {offset} nodes, depth {max_depth}"
+        )
+
+    @classmethod
+    def from_sklearn(cls, model, max_rows=256):
+        return cls(model, max_rows=max_rows)
+
+    def apply(self, X):
+        """Leaf index (into the flat node table) per tree and row, shape (n_trees, n_rows)."""
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X.shape[0])[np.newaxis, :]
+        nodes = np.repeat(self.roots[:, np.newaxis], X.shape[0], axis=1)
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def predict_proba(self, X):
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(
+                f"X has {X.shape[-1]} features, but the model expects {self.n_features}"
+            )
+        # Large batches go to sklearn, as does NaN input, whose routing
+        # depends on the sklearn version
+        if X.shape[0] > self.max_rows or np.isnan(X).any():
+            return self._sklearn_predict_proba(X)
+
+        leaf_values = self.value[self.apply(X)]
+        proba = np.zeros((X.shape[0], len(self.classes_)), dtype=np.float64)
+        for tree_values in leaf_values:
+            proba += tree_values
+        proba /= len(self.roots)
+        return proba
+
+    def contributions(self, X, class_index=1, chunk_rows=1024):
+        """Split ``predict_proba(X)[:, class_index]`` into per-feature contributions.
+
+        Every step of a decision path moves the tree's estimate from the
+        parent node's value to the child's; that change is credited to the
+        feature the parent split on. Averaged over trees, the bias (the
+        training-set rate at the roots) plus a row's contributions equals
+        its predicted probability. Paths are walked for all trees and rows
+        of a chunk at once, crediting each level with one ``bincount``.
+        Returns ``(bias, contributions)`` with shapes (n_rows,) and
+        (n_rows, n_features).
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(
+                f"X has {X.shape[-1]} features, but the model expects {self.n_features}"
+            )
+        if np.isnan(X).any():
+            raise ValueError("Contributions need rows without missing features")
+
+        value = self.value[:, class_index]
+        n_trees = len(self.roots)
+        out = np.empty((X.shape[0], self.n_features), dtype=np.float64)
+        for start in range(0, X.shape[0], chunk_rows):
+            chunk = X[start:start + chunk_rows]
+            n_rows = chunk.shape[0]
+            rows = np.arange(n_rows)[np.newaxis, :]
+            offsets = rows * self.n_features
+            totals = np.zeros(n_rows * self.n_features, dtype=np.float64)
+            nodes = np.repeat(self.roots[:, np.newaxis], n_rows, axis=1)
+            for _ in range(self.max_depth):
+                split = self.feature[nodes]
+                go_left = chunk[rows, split] <= self.threshold[nodes]
+                children = np.where(go_left, self.left[nodes], self.right[nodes])
+                # Leaves point at themselves, so finished paths add zero
+                totals += np.bincount(
+                    (offsets + split).ravel(),
+                    weights=(value[children] - value[nodes]).ravel(),
+                    minlength=totals.size,
+                )
+                nodes = children
+            out[start:start + n_rows] = totals.reshape(n_rows, self.n_features) / n_trees
+        bias = np.full(X.shape[0], value[self.roots].mean())
+        return bias, out
+
+    def _sklearn_predict_proba(self, X):
+        with warnings.catch_warnings():
+            # The forest was fitted on a DataFrame; plain arrays are expected here
+            warnings.filterwarnings("ignore", message="X does not have valid feature names")
+            return self.model.predict_proba(X)
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+    def matches(self, X):
+        """True if predict_proba is bit-identical to the wrapped sklearn model on X."""
+        X = np.asarray(X, dtype=np.float64)[: self.max_rows]
+        expected = self._sklearn_predict_proba(X)
+        actual = self.predict_proba(X)
+        return expected.shape == actual.shape and np.array_equal(
+            expected.view(np.uint64), actual.view(np.uint64)
+        )
@@ -0,0 +1,61 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class PoolSaturated(Exception):
+    """Raised instead of queueing when the inference backlog is full."""
+
+
+class InferencePool:
+    """Bounded thread pool for CPU-bound model calls made from an event loop.
+
+    ``run`` awaits ``fn(*args)`` on one of ``max_workers`` threads, so
+    inference never blocks the loop serving other requests. At most
+    ``max_pending`` calls may be running or queued; beyond that ``run``
+    raises ``PoolSaturated`` at once, which the API turns into a 503 with
+    ``Retry-After`` rather than letting latency grow without bound.
+    Counters are only touched from the event loop thread.
+    """
+
+    def __init__(self, max_workers=2, max_pending=64):
+        if max_workers < 1 or max_pending < 1:
+            raise ValueError("max_workers and max_pending must be at least 1")
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="inference"
+        )
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+
+    async def run(self, fn, *args, **kwargs):
+        if self._pending >= self.max_pending:
+            self._rejected += 1
+            raise PoolSaturated(
+                f"Inference backlog is full ({self.max_pending} calls pending)"
+            )
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, functools.partial(fn, *args, **kwargs)
+            )
+        finally:
+            self._pending -= 1
+            self._completed += 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    def stats(self):
+        return {
+            "maxWorkers": self.max_workers,
+            "maxPending": self.max_pending,
+            "pending": self._pending,
+            "completed": self._completed,
+            "rejected": self._rejected,
+        }
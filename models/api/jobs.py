@@ -0,0 +1,311 @@
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+ACTIVE = [QUEUED, RUNNING]
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # alive, owned by another user
+        return True
+    return True
+
+
+class JobManager:
+    """Runs long uploads on a local thread pool and tracks their progress.
+
+    ``submit`` returns a job id at once; the work function runs on the pool
+    and receives a ``progress(done, error=None)`` callback it calls after
+    each unit of work. Job documents live in ``collection`` when one is
+    given, so any worker process can answer a status poll, otherwise in
+    this process only. Finished jobs are kept for ``retention_hours``.
+
+    Stored jobs record their ``owner`` (host and pid) and, while queued or
+    running, get a ``heartbeatAt`` refreshed every ``heartbeat_seconds``.
+    ``fail_orphans`` marks as failed the jobs whose owner has exited or
+    whose heartbeat is older than ``stale_after_seconds``. It runs at
+    startup and with every heartbeat, so a restart or a killed worker does
+    not leave a job "running" for good.
+
+    With ``results_collection``, list fields of a job's result are stored
+    there in documents of ``result_chunk_size`` items and reassembled by
+    ``get``, so a large upload never pushes the job document past the
+    16 MB BSON limit.
+    """
+
+    def __init__(
+        self,
+        collection=None,
+        max_workers=2,
+        retention_hours=24,
+        results_collection=None,
+        result_chunk_size=500,
+        heartbeat_seconds=30,
+        stale_after_seconds=300,
+    ):
+        self.collection = collection
+        self.heartbeat_seconds = heartbeat_seconds
+        self.stale_after = timedelta(seconds=stale_after_seconds)
+        self.results_collection = results_collection if collection is not None else None
+        self.result_chunk_size = result_chunk_size
+        self.retention = timedelta(hours=retention_hours)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="job"
+        )
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._active = set()
+        self._heartbeat = None
+
+    def ensure_indexes(self):
+        if self.collection is not None:
+            self.collection.create_index(
+                "finishedAt", expireAfterSeconds=int(self.retention.total_seconds())
+            )
+        if self.results_collection is not None:
+            self.results_collection.create_index(
+                "finishedAt", expireAfterSeconds=int(self.retention.total_seconds())
+            )
+            self.results_collection.create_index([("jobId", 1), ("field", 1), ("seq", 1)])
+
+    @staticmethod
+    def owner():
+        return {"host": socket.gethostname(), "pid": os.getpid()}
+
+    def _ensure_heartbeat(self):
+        # Checked per submit: a forked worker does not inherit the parent's thread
+        with self._lock:
+            if self._heartbeat is not None and self._heartbeat[0] == os.getpid():
+                return
+            thread = threading.Thread(target=self._beat, name="job-heartbeat", daemon=True)
+            self._heartbeat = (os.getpid(), thread)
+        thread.start()
+
+    def _beat(self):
+        while True:
+            time.sleep(self.heartbeat_seconds)
+            with self._lock:
+                active = list(self._active)
+            try:
+                if active:
+                    self.collection.update_many(
+                        {"_id": {"$in": active}, "status": {"$in": ACTIVE}},
+                        {"$set": {"heartbeatAt": datetime.utcnow()}},
+                    )
+                self.fail_orphans(check_owners=False)
+            except Exception as e:
+                logger.error(f"Job heartbeat failed: {str(e)}")
+
+    def fail_orphans(self, check_owners=True):
+        """Fail queued or running jobs nobody is working on; returns how many.
+
+        A job is orphaned when its heartbeat is stale, or, with
+        ``check_owners``, when its owner ran on this host and has exited.
+        """
+        if self.collection is None:
+            return 0
+        now = datetime.utcnow()
+        host = socket.gethostname()
+        orphaned = 0
+        for job in self.collection.find(
+            {"status": {"$in": ACTIVE}}, {"owner": 1, "heartbeatAt": 1, "updatedAt": 1}
+        ):
+            owner = job.get("owner") or {}
+            beat = job.get("heartbeatAt") or job.get("updatedAt")
+            if beat is not None and beat < now - self.stale_after:
+                reason = f"no heartbeat since {beat.isoformat()}"
+            elif (
+                check_owners
+                and owner.get("host") == host
+                and owner.get("pid") != os.getpid()
+                and not _process_alive(owner.get("pid", -1))
+            ):
+                reason = f"worker {owner['pid']} on {host} exited"
+            else:
+                continue
+            result = self.collection.update_one(
+                {"_id": job["_id"], "status": {"$in": ACTIVE}},
+                {
+                    "$set": {
+                        "status": FAILED,
+                        "message": f"Job interrupted: {reason}",
+                        "finishedAt": now,
+                        "updatedAt": now,
+                    }
+                },
+            )
+            if result.modified_count:
+                orphaned += 1
+                logger.warning(f"Job {job['_id']} marked failed: {reason}")
+        return orphaned
+
+    def _save(self, job_id, fields, push_error=None):
+        fields = {**fields, "updatedAt": datetime.utcnow()}
+        if self.collection is not None:
+            update = {"$set": fields}
+            if push_error is not None:
+                update["$push"] = {"errors": push_error}
+            self.collection.update_one({"_id": job_id}, update)
+            return
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(fields)
+            if push_error is not None:
+                job["errors"].append(push_error)
+
+    def _prune(self):
+        cutoff = datetime.utcnow() - self.retention
+        with self._lock:
+            for job_id in [
+                job_id
+                for job_id, job in self._jobs.items()
+                if job.get("finishedAt") and job["finishedAt"] < cutoff
+            ]:
+                del self._jobs[job_id]
+
+    def submit(self, kind, fn, total):
+        """Queue ``fn(progress)`` and return the new job id; ``total`` is the unit count."""
+        job_id = uuid.uuid4().hex
+        now = datetime.utcnow()
+        job = {
+            "_id": job_id,
+            "kind": kind,
+            "status": QUEUED,
+            "total": total,
+            "done": 0,
+            "errors": [],
+            "result": None,
+            "submittedAt": now,
+            "startedAt": None,
+            "finishedAt": None,
+            "updatedAt": now,
+        }
+        if self.collection is not None:
+            job.update(owner=self.owner(), heartbeatAt=now)
+            with self._lock:
+                self._active.add(job_id)
+            self.collection.insert_one(job)
+            self._ensure_heartbeat()
+        else:
+            self._prune()
+            with self._lock:
+                self._jobs[job_id] = job
+        self._executor.submit(self._run, job_id, fn)
+        logger.info(f"Queued {kind} job {job_id} ({total} rows)")
+        return job_id
+
+    def _run(self, job_id, fn):
+        try:
+            self._execute(job_id, fn)
+        finally:
+            with self._lock:
+                self._active.discard(job_id)
+
+    def _execute(self, job_id, fn):
+        started = time.perf_counter()
+        self._save(job_id, {"status": RUNNING, "startedAt": datetime.utcnow()})
+
+        def progress(done, error=None):
+            elapsed = time.perf_counter() - started
+            self._save(
+                job_id,
+                {"done": done, "rowsPerSecond": done / elapsed if elapsed else 0.0},
+                push_error=error,
+            )
+
+        try:
+            result = fn(progress)
+            finished_at = datetime.utcnow()
+            fields = {"status": SUCCEEDED, **self._store_result(job_id, result, finished_at)}
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            finished_at = datetime.utcnow()
+            fields = {"status": FAILED, "message": str(e)}
+        fields["finishedAt"] = finished_at
+        fields["seconds"] = time.perf_counter() - started
+        try:
+            self._save(job_id, fields)
+        except Exception as e:
+            # e.g. a result too large for one document; pollers must still
+            # see the job finish
+            logger.error(f"Could not store the outcome of job {job_id}: {str(e)}")
+            self._save(
+                job_id,
+                {
+                    "status": FAILED,
+                    "message": f"Could not store job result: {str(e)}",
+                    "finishedAt": finished_at,
+                    "seconds": fields["seconds"],
+                },
+            )
+            fields["status"] = FAILED
+        logger.info(f"Job {job_id} {fields['status']} in {fields['seconds']:.1f}s")
+
+    def _store_result(self, job_id, result, finished_at):
+        """Job fields for ``result``; its list fields go to ``results_collection`` in chunks."""
+        if self.results_collection is None or not isinstance(result, dict):
+            return {"result": result}
+        summary, chunks = {}, {}
+        for field, value in result.items():
+            if not isinstance(value, list):
+                summary[field] = value
+                continue
+            size = self.result_chunk_size
+            docs = [
+                {
+                    "jobId": job_id,
+                    "field": field,
+                    "seq": seq,
+                    "items": value[start:start + size],
+                    "finishedAt": finished_at,
+                }
+                for seq, start in enumerate(range(0, len(value), size))
+            ]
+            if docs:
+                self.results_collection.insert_many(docs, ordered=False)
+            chunks[field] = len(docs)
+        return {"result": summary, "resultChunks": chunks}
+
+    def _load_result(self, job):
+        result = dict(job["result"] or {})
+        for field in job.get("resultChunks", {}):
+            query = {"jobId": job["_id"], "field": field}
+            docs = self.results_collection.find(query).sort("seq", 1)
+            result[field] = [item for doc in docs for item in doc["items"]]
+        return result
+
+    def get(self, job_id):
+        """Public view of a job, or None if unknown or expired."""
+        if self.collection is not None:
+            job = self.collection.find_one({"_id": job_id})
+        else:
+            with self._lock:
+                job = self._jobs.get(job_id)
+                job = dict(job, errors=list(job["errors"])) if job else None
+        if job is None:
+            return None
+        if job.get("resultChunks") is not None and self.results_collection is not None:
+            job["result"] = self._load_result(job)
+        view = {
+            key: value for key, value in job.items() if key not in ("_id", "resultChunks")
+        }
+        view["jobId"] = job["_id"]
+        return view
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,200 @@
+import atexit
+import logging
+import os
+import queue
+import reprlib
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+# Bounded reprs for log arguments: however large a payload is, formatting it
+# touches at most a few dozen items and a few hundred characters
+_compact = reprlib.Repr()
+_compact.maxlevel = 3
+_compact.maxdict = 20
+_compact.maxlist = 20
+_compact.maxtuple = 20
+_compact.maxset = 20
+_compact.maxstring = 200
+_compact.maxother = 200
+
+_PRIMITIVES = (str, int, float, bool, type(None))
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(threadName)s] %(message)s"
+
+
+def compact(value):
+    """Size-bounded repr of ``value`` for log messages."""
+    return _compact.repr(value)
+
+
+def parse_levels(spec):
+    # "/predict=WARNING,/api/employees=DEBUG" -> {"/predict": 30, ...}
+    levels = {}
+    for item in spec.split(","):
+        route, _, level = item.strip().partition("=")
+        if route and level:
+            levels[route] = logging.getLevelName(level.strip().upper())
+    return levels
+
+
+class RouteLevelFilter(logging.Filter):
+    """Drops records below the level configured for the current Flask route."""
+
+    def __init__(self, default_level, route_levels):
+        super().__init__()
+        self.default_level = default_level
+        self.route_levels = route_levels
+
+    def filter(self, record):
+        if not self.route_levels:
+            return record.levelno >= self.default_level
+        # Imported here: metrics resolves the route without requiring Flask
+        from metrics import current_route
+
+        level = self.route_levels.get(current_route(), self.default_level)
+        return record.levelno >= level
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps one of every ``sample_every`` records per call site.
+
+    Callers opt in per message with ``extra={"sample_every": 100}``; other
+    records always pass.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        every = getattr(record, "sample_every", None)
+        if not every or every <= 1:
+            return True
+        site = (record.pathname, record.lineno)
+        with self._lock:
+            seen = self._seen.get(site, 0)
+            self._seen[site] = seen + 1
+        return seen % every == 0
+
+
+class BoundedQueueHandler(QueueHandler):
+    """Hands records to a background writer thread without ever blocking.
+
+    The message is rendered in the calling thread, so later mutation of a
+    logged object cannot change it, but container arguments are rendered
+    through ``compact`` and the result is cut to ``max_chars``. When the
+    queue is full the record is dropped and counted instead of waiting.
+    """
+
+    def __init__(self, log_queue, max_chars=2000):
+        super().__init__(log_queue)
+        self.max_chars = max_chars
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        if isinstance(record.args, tuple):
+            record.args = tuple(
+                arg if isinstance(arg, _PRIMITIVES) else compact(arg) for arg in record.args
+            )
+        elif isinstance(record.args, dict) and "%(" not in str(record.msg):
+            # A lone dict argument, which logging unpacks as a mapping
+            record.args = (compact(record.args),)
+        elif isinstance(record.args, dict):
+            record.args = {
+                key: arg if isinstance(arg, _PRIMITIVES) else compact(arg)
+                for key, arg in record.args.items()
+            }
+        record = super().prepare(record)
+        if len(record.msg) > self.max_chars:
+            omitted = len(record.msg) - self.max_chars
+            record.msg = f"{record.msg[:self.max_chars]}... [{omitted} chars truncated]"
+            record.message = record.msg
+        return record
+
+
+_state = {}
+
+
+def _start_listener(log_queue, handlers):
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def _restart_after_fork():
+    # The writer thread does not survive fork; give the child its own queue
+    # (the parent's may have been locked mid-operation) and writer
+    state = _state.get("config")
+    if state is None:
+        return
+    state["queue"] = queue.Queue(maxsize=state["queue_size"])
+    state["handler"].queue = state["queue"]
+    state["listener"] = _start_listener(state["queue"], state["handlers"])
+
+
+def configure_logging(level=None, route_levels=None, queue_size=None, max_chars=None):
+    """Route all logging through a bounded queue to a background writer.
+
+    Defaults come from LOG_LEVEL, LOG_ROUTE_LEVELS ("/route=LEVEL,..."),
+    LOG_QUEUE_SIZE and LOG_MAX_MESSAGE_CHARS. Safe to call more than once.
+    """
+    level = logging.getLevelName((level or os.environ.get("LOG_LEVEL", "INFO")).upper())
+    if route_levels is None:
+        route_levels = parse_levels(os.environ.get("LOG_ROUTE_LEVELS", ""))
+    queue_size = queue_size or int(os.environ.get("LOG_QUEUE_SIZE", 10000))
+    max_chars = max_chars or int(os.environ.get("LOG_MAX_MESSAGE_CHARS", 2000))
+
+    if "config" in _state:
+        _state["config"]["listener"].stop()
+        logging.getLogger().removeHandler(_state["config"]["handler"])
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    handler = BoundedQueueHandler(log_queue, max_chars=max_chars)
+    handler.addFilter(RouteLevelFilter(level, route_levels))
+    handler.addFilter(SamplingFilter())
+
+    stream = logging.StreamHandler()
+    stream.setFormatter(logging.Formatter(LOG_FORMAT))
+    handlers = [stream]
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    # Loggers must let through the lowest level any route asks for; the
+    # filter applies the per-route threshold
+    root.setLevel(min([level] + list(route_levels.values())))
+
+    if not _state.get("registered"):
+        atexit.register(lambda: _state.get("config") and _state["config"]["listener"].stop())
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=_restart_after_fork)
+        _state["registered"] = True
+
+    _state["config"] = {
+        "queue": log_queue,
+        "queue_size": queue_size,
+        "handler": handler,
+        "handlers": handlers,
+        "listener": _start_listener(log_queue, handlers),
+    }
+    return handler
+
+
+def stats():
+    state = _state.get("config")
+    if state is None:
+        return {"configured": False}
+    return {
+        "configured": True,
+        "queued": state["queue"].qsize(),
+        "queueSize": state["queue_size"],
+        "dropped": state["handler"].dropped,
+    }
@@ -0,0 +1,254 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+from pymongo import monitoring
+
+# Latency buckets in seconds, from sub-millisecond encoder calls to
+# multi-second uploads
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30,
+)
+# Rows per request, chunk or model call
+SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 50000, 100000)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(value) for value in labels)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram; one bisect and a lock per observation."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        with self._lock:
+            values = {key: (list(s[0]), s[1], s[2]) for key, s in self._values.items()}
+        lines = self.header()
+        for key, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = _labels(self.labelnames, key, [("le", _number(bound))])
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """In-process metrics rendered in the Prometheus text format.
+
+    Metrics are created once at import and updated from request threads.
+    ``collector`` functions are called at scrape time for values other
+    components already count (cache statistics, queue depths), so those are
+    never double-counted on the hot path.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._add(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._add(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def collector(self, fn):
+        """Register ``fn()`` returning [(name, kind, help, [(labels dict, value)])]."""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for fn in self._collectors:
+            for name, kind, help_text, samples in fn():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(
+                        f"{name}{_labels(labels.keys(), labels.values())} {_number(value)}"
+                    )
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+request_latency = registry.histogram(
+    "prescient_http_request_duration_seconds",
+    "Request latency by route",
+    ("route", "method", "status"),
+)
+requests_in_flight = registry.gauge(
+    "prescient_http_requests_in_flight", "Requests being handled", ("route",)
+)
+stage_latency = registry.histogram(
+    "prescient_stage_duration_seconds",
+    "Time spent in each stage of a request",
+    ("route", "stage"),
+)
+batch_rows = registry.histogram(
+    "prescient_batch_rows",
+    "Rows per request, chunk or model call",
+    ("operation",),
+    buckets=SIZE_BUCKETS,
+)
+model_latency = registry.histogram(
+    "prescient_model_inference_seconds", "Inference time per model call", ("model",)
+)
+mongo_latency = registry.histogram(
+    "prescient_mongo_command_duration_seconds",
+    "MongoDB command latency",
+    ("command", "outcome"),
+)
+
+
+def current_route():
+    # Flask is imported lazily so the scoring modules stay usable without it
+    try:
+        from flask import has_request_context, request
+    except ImportError:
+        return "none"
+    if has_request_context() and request.url_rule is not None:
+        return request.url_rule.rule
+    return "background"
+
+
+@contextmanager
+def stage(name):
+    """Time a block as a stage of the current route."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_latency.observe(time.perf_counter() - start, current_route(), name)
+
+
+def observe_model(model, seconds, rows):
+    model_latency.observe(seconds, model)
+    batch_rows.observe(rows, f"model:{model}")
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """pymongo listener feeding every command's duration into ``mongo_latency``."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        mongo_latency.observe(event.duration_micros / 1e6, event.command_name, "ok")
+
+    def failed(self, event):
+        mongo_latency.observe(event.duration_micros / 1e6, event.command_name, "error")
+
+
+def instrument_flask(app):
+    """Record latency, status and in-flight requests for every Flask route."""
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_route = request.url_rule.rule if request.url_rule else "unmatched"
+        g.metrics_start = time.perf_counter()
+        requests_in_flight.inc(g.metrics_route)
+
+    @app.after_request
+    def _record(response):
+        start = g.pop("metrics_start", None)
+        if start is not None:
+            request_latency.observe(
+                time.perf_counter() - start,
+                g.metrics_route,
+                request.method,
+                response.status_code,
+            )
+        return response
+
+    @app.teardown_request
+    def _finish(exc):
+        route = g.pop("metrics_route", None)
+        if route is not None:
+            requests_in_flight.dec(route)
@@ -0,0 +1,148 @@
+import cProfile
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-item calls into one vectorized call.
+
+    ``submit`` queues an item and blocks its caller until the result is
+    ready. A background thread takes the first waiting item, keeps
+    collecting until ``max_batch_size`` items are queued or ``max_wait_ms``
+    has passed, and hands the batch to ``score_batch``, which must return
+    one result per item in order. If the batched call raises, the items are
+    retried one by one so a single bad request only fails itself.
+
+    The added latency per request is bounded by the window plus one batch
+    of scoring. The thread is started on first use, so it is created in
+    the serving process rather than before a fork.
+
+    Scoring happens on the batcher thread, out of sight of a profiler on
+    the caller's thread. A caller that passes a ``trace`` dict gets the
+    queue wait, batch size and batch scoring time written into it before
+    ``submit`` returns. With ``trace["profile"]`` set, the batch is also
+    scored under cProfile and the profile is left in ``trace["profiler"]``.
+    """
+
+    def __init__(self, score_batch, max_batch_size=32, max_wait_ms=2.0):
+        self.score_batch = score_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._fallbacks = 0
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="micro-batcher", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, item, trace=None):
+        self._ensure_started()
+        future = Future()
+        self._queue.put((item, future, time.perf_counter(), trace))
+        return future.result()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            waits = [started - queued_at for _, _, queued_at, _ in batch]
+            with self._stats_lock:
+                self._batch_sizes[len(batch)] += 1
+                self._queue_wait_total += sum(waits)
+                self._queue_wait_max = max(self._queue_wait_max, max(waits))
+
+            profiled = any(trace and trace.get("profile") for _, _, _, trace in batch)
+            profiler = cProfile.Profile() if profiled else None
+            if profiler is not None:
+                profiler.enable()
+            try:
+                outcomes = self._score([item for item, _, _, _ in batch])
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+            seconds = time.perf_counter() - started
+
+            for (_, future, _, trace), wait, (ok, value) in zip(batch, waits, outcomes):
+                if trace is not None:
+                    trace.update(queueWaitSeconds=wait, batchSeconds=seconds, batchSize=len(batch))
+                    if trace.get("profile"):
+                        trace["profiler"] = profiler
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+    def _score(self, items):
+        """(ok, result or exception) per item, falling back to items one by one."""
+        try:
+            results = list(self.score_batch(items))
+            if len(results) != len(items):
+                raise ValueError(
+                    f"score_batch returned {len(results)} results for {len(items)} items"
+                )
+            return [(True, result) for result in results]
+        except Exception as e:
+            if len(items) == 1:
+                return [(False, e)]
+            logger.warning(
+                f"Batch of {len(items)} failed ({str(e)}), scoring items individually"
+            )
+            with self._stats_lock:
+                self._fallbacks += 1
+            outcomes = []
+            for item in items:
+                try:
+                    outcomes.append((True, self.score_batch([item])[0]))
+                except Exception as item_error:
+                    outcomes.append((False, item_error))
+            return outcomes
+
+    def stats(self):
+        with self._stats_lock:
+            batches = sum(self._batch_sizes.values())
+            items = sum(size * count for size, count in self._batch_sizes.items())
+            return {
+                "maxBatchSize": self.max_batch_size,
+                "windowMs": self.max_wait * 1000,
+                "batches": batches,
+                "items": items,
+                "meanBatchSize": items / batches if batches else 0.0,
+                "batchSizes": {
+                    str(size): count for size, count in sorted(self._batch_sizes.items())
+                },
+                "fallbacks": self._fallbacks,
+                "meanQueueWaitMs": self._queue_wait_total / items * 1000 if items else 0.0,
+                "maxQueueWaitMs": self._queue_wait_max * 1000,
+                "queued": self._queue.qsize(),
+            }
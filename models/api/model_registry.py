@@ -0,0 +1,151 @@
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+def _current_rss_bytes():
+    # /proc gives the live resident set; fall back to the peak where it is
+    # unavailable (macOS reports ru_maxrss in bytes, Linux in kilobytes).
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        if resource is None:
+            return 0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _tensor_bytes(obj):
+    module = getattr(obj, "model", obj)
+    if not hasattr(module, "parameters"):
+        return None
+    total = 0
+    for tensor in list(module.parameters()) + list(module.buffers()):
+        total += tensor.numel() * tensor.element_size()
+    return total
+
+
+class ModelRegistry:
+    """Process-wide, load-once store for the models served by the API.
+
+    Loaders are registered by name and only run on the first ``get`` (or an
+    explicit ``warm_up``); every later caller receives the same instance.
+    Each name has its own lock, so different models can load concurrently
+    while concurrent requests for the same model wait for a single load.
+    ``load_in_background`` starts those loads on a thread pool at boot, and
+    ``state`` reports each model as pending, loading, ready or failed.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._instances = {}
+        self._stats = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._background = []
+
+    def register(self, name, loader):
+        with self._lock:
+            if name in self._loaders:
+                raise ValueError(f"Model '{name}' is already registered")
+            self._loaders[name] = loader
+            self._locks[name] = threading.Lock()
+            self._stats[name] = {"loaded": False, "state": "pending"}
+
+    def names(self):
+        return list(self._loaders)
+
+    def is_loaded(self, name):
+        return name in self._instances
+
+    def state(self, name):
+        if name not in self._stats:
+            raise KeyError(f"Unknown model '{name}'")
+        return self._stats[name]["state"]
+
+    def get(self, name):
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        if name not in self._loaders:
+            raise KeyError(f"Unknown model '{name}'")
+
+        with self._locks[name]:
+            instance = self._instances.get(name)
+            if instance is not None:
+                return instance
+
+            logger.info(f"Loading model '{name}'")
+            self._stats[name] = {"loaded": False, "state": "loading", "startedAt": time.time()}
+            rss_before = _current_rss_bytes()
+            start = time.perf_counter()
+            try:
+                instance = self._loaders[name]()
+            except Exception as e:
+                self._stats[name] = {"loaded": False, "state": "failed", "error": str(e)}
+                logger.error(f"Error loading model '{name}': {e}")
+                raise
+            load_seconds = time.perf_counter() - start
+
+            self._stats[name] = {
+                "loaded": True,
+                "state": "ready",
+                "loadSeconds": round(load_seconds, 3),
+                "parameterBytes": _tensor_bytes(instance),
+                "rssDeltaBytes": _current_rss_bytes() - rss_before,
+                "loadedAt": time.time(),
+            }
+            self._instances[name] = instance
+            logger.info(f"Model '{name}' loaded in {load_seconds:.2f}s")
+            return instance
+
+    def warm_up(self, names=None):
+        """Load the given models (all registered ones by default) and return their stats."""
+        for name in names or self.names():
+            self.get(name)
+        return self.stats()
+
+    def load_in_background(self, names=None, max_workers=None):
+        """Start loading the given models (all by default) in parallel and return at once.
+
+        Failures are only recorded in ``stats``; a later ``get`` retries them.
+        """
+        names = self.names() if names is None else list(names)
+        if not names:
+            return []
+        executor = ThreadPoolExecutor(
+            max_workers=max_workers or len(names), thread_name_prefix="model-load"
+        )
+        futures = [executor.submit(self._load_quietly, name) for name in names]
+        # Pool threads exit once the queued loads are done
+        executor.shutdown(wait=False)
+        self._background.extend(futures)
+        return futures
+
+    def _load_quietly(self, name):
+        try:
+            self.get(name)
+        except Exception:
+            pass
+
+    def wait_for_background(self, timeout=None):
+        """Block until the loads started by ``load_in_background`` have finished."""
+        _, not_done = wait(self._background, timeout=timeout)
+        return not not_done
+
+    def stats(self):
+        return {name: dict(self._stats[name]) for name in self.names()}
+
+
+registry = ModelRegistry()
@@ -0,0 +1,74 @@
+import os
+import threading
+
+from pymongo import MongoClient
+
+
+class ForkSafeMongo:
+    """Owns the process's MongoClient and replaces it in forked children.
+
+    pymongo clients are not fork-safe: a child must not reuse the sockets,
+    locks and monitor threads of a client created by its parent. Code holds
+    ``collection(name)`` proxies instead of pymongo collections; each one
+    resolves to the current client on use, and a fork hook discards the
+    inherited client so a worker opens its own on first access.
+    """
+
+    def __init__(self, uri, database, **client_options):
+        self.uri = uri
+        self.database = database
+        self.client_options = client_options
+        self._client = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._discard_after_fork)
+
+    def _discard_after_fork(self):
+        # Not closed: closing would talk to the server over the parent's sockets
+        self._client = None
+        self._generation += 1
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        client = self._client
+        if client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = MongoClient(self.uri, **self.client_options)
+                client = self._client
+        return client
+
+    def use_client(self, client):
+        """Serve every proxy from ``client`` from now on (e.g. an in-memory stand-in)."""
+        with self._lock:
+            self._client = client
+            self._generation += 1
+
+    def collection(self, name):
+        return CollectionProxy(self, name)
+
+
+class CollectionProxy:
+    """Forwards to ``owner.client[database][name]`` for the current process."""
+
+    def __init__(self, owner, name):
+        self._owner = owner
+        self._name = name
+        self._generation = None
+        self._collection = None
+
+    def _target(self):
+        owner = self._owner
+        if self._collection is None or self._generation != owner._generation:
+            generation = owner._generation
+            self._collection = owner.client[owner.database][self._name]
+            self._generation = generation
+        return self._collection
+
+    def __getattr__(self, attr):
+        return getattr(self._target(), attr)
+
+    def __repr__(self):
+        return f"CollectionProxy({self._owner.database}.{self._name})"
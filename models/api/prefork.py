@@ -0,0 +1,247 @@
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import socketserver
+import sys
+import time
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+logger = logging.getLogger(__name__)
+
+# Set in the parent before forking; workers use it to find their siblings
+PARENT_PID_ENV = "PREFORK_PARENT_PID"
+
+SMAPS_FIELDS = {
+    "Rss": "rssBytes",
+    "Pss": "pssBytes",
+    "Shared_Clean": "sharedCleanBytes",
+    "Shared_Dirty": "sharedDirtyBytes",
+    "Private_Clean": "privateCleanBytes",
+    "Private_Dirty": "privateDirtyBytes",
+}
+
+
+def process_memory(pid):
+    """RSS split into shared and private pages for one process (Linux only).
+
+    Pss charges each shared page to every process mapping it in equal parts,
+    so summing it over the workers gives the real footprint of the pool.
+    """
+    memory = {key: 0 for key in SMAPS_FIELDS.values()}
+    # smaps_rollup is one pre-summed record; older kernels only have smaps
+    for name in ("smaps_rollup", "smaps"):
+        try:
+            with open(f"/proc/{pid}/{name}") as f:
+                for line in f:
+                    field, _, rest = line.partition(":")
+                    if field in SMAPS_FIELDS:
+                        memory[SMAPS_FIELDS[field]] += int(rest.split()[0]) * 1024
+            break
+        except OSError:
+            continue
+    else:
+        return None
+    memory["sharedBytes"] = memory["sharedCleanBytes"] + memory["sharedDirtyBytes"]
+    memory["privateBytes"] = memory["privateCleanBytes"] + memory["privateDirtyBytes"]
+    return memory
+
+
+def child_pids(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except (OSError, ValueError):
+        return []
+
+
+def memory_report(pids=None):
+    """Per-process memory for the pool this process belongs to.
+
+    Inside a prefork worker this covers the parent and every worker;
+    otherwise only the current process.
+    """
+    parent = os.environ.get(PARENT_PID_ENV)
+    if pids is None:
+        pids = [int(parent)] + child_pids(int(parent)) if parent else [os.getpid()]
+    processes = {str(pid): process_memory(pid) for pid in pids}
+    workers = [
+        memory for pid, memory in processes.items()
+        if memory is not None and pid != parent
+    ]
+    return {
+        "pid": os.getpid(),
+        "parentPid": int(parent) if parent else None,
+        "processes": processes,
+        "workers": len(workers),
+        "totalRssBytes": sum(memory["rssBytes"] for memory in workers),
+        "totalPssBytes": sum(memory["pssBytes"] for memory in workers),
+    }
+
+
+def partition_threads(workers, cpus=None):
+    """Intra-op threads per worker so the pool uses each core once."""
+    if cpus is None:
+        if hasattr(os, "sched_getaffinity"):
+            cpus = len(os.sched_getaffinity(0))
+        else:
+            cpus = os.cpu_count() or 1
+    return max(1, cpus // workers)
+
+
+def set_torch_threads(threads):
+    torch = sys.modules.get("torch")
+    if torch is None:
+        return
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Only allowed before the first inter-op parallel call
+        pass
+
+
+class LoggingRequestHandler(WSGIRequestHandler):
+    """Access lines go through ``logging`` (and its bounded queue), not stderr."""
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+
+class SharedSocketWSGIServer(socketserver.ThreadingMixIn, WSGIServer):
+    """WSGI server that accepts on a socket bound by the parent process."""
+
+    daemon_threads = True
+
+    def __init__(self, sock, app):
+        super().__init__(
+            sock.getsockname(), LoggingRequestHandler, bind_and_activate=False
+        )
+        self.socket.close()
+        self.socket = sock
+        host, port = sock.getsockname()[:2]
+        self.server_name = socket.getfqdn(host)
+        self.server_port = port
+        self.setup_environ()
+        self.set_app(app)
+
+
+def run_worker(sock, app, threads):
+    # Children inherit the parent's handlers; restore the defaults
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    set_torch_threads(threads)
+    logger.info(f"Worker {os.getpid()} serving with {threads} torch thread(s)")
+    SharedSocketWSGIServer(sock, app).serve_forever()
+
+
+class PreforkServer:
+    """Loads the API once, then forks workers that share its memory.
+
+    Everything app.py loads at boot (the Random Forest, encoders and the
+    warmed-up sentiment models) is built in the parent before the fork, so
+    the workers map the same physical pages copy-on-write. ``gc.freeze``
+    moves those objects out of the collector's reach, otherwise the first
+    collection in each worker would write to their headers and copy the
+    pages. Workers that exit are replaced from the parent, still without
+    reloading anything.
+    """
+
+    def __init__(self, host, port, workers, threads=None):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.threads = threads or partition_threads(workers)
+        self.pids = set()
+        self._stopping = False
+
+    def load(self, warm_up=True):
+        os.environ[PARENT_PID_ENV] = str(os.getpid())
+        import app as api
+
+        if api.JOB_STORE == "memory":
+            logger.warning("JOB_STORE=memory: a job is only visible to the worker that ran it")
+        # Boot loads run on threads, which must finish before the fork
+        api.wait_until_loaded()
+        if warm_up:
+            api.model_registry.warm_up(api.SERVING_SENTIMENT_MODELS)
+        self.app = api.app
+        gc.collect()
+        gc.freeze()
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(self.sock, self.app, self.threads)
+            finally:
+                os._exit(1)
+        self.pids.add(pid)
+
+    def stop(self, signum, frame):
+        self._stopping = True
+        for pid in self.pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def serve(self, report_seconds=0):
+        self.sock = socket.create_server((self.host, self.port), backlog=128)
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.workers):
+            self.spawn()
+        logger.info(
+            f"Serving on {self.host}:{self.port} with {self.workers} workers "
+            f"x {self.threads} torch thread(s)"
+        )
+
+        next_report = time.monotonic() + report_seconds
+        while self.pids:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid:
+                self.pids.discard(pid)
+                if not self._stopping:
+                    logger.warning(f"Worker {pid} exited ({status}), replacing it")
+                    self.spawn()
+                continue
+            if report_seconds and time.monotonic() >= next_report:
+                logger.info(f"Worker memory: {memory_report()}")
+                next_report = time.monotonic() + report_seconds
+            time.sleep(0.5)
+        self.sock.close()
+
+
+if __name__ == "__main__":
+    # python prefork.py --workers 4  (run from models/api, like app.py)
+    parser = argparse.ArgumentParser(
+        description="Serve the API from several processes sharing one copy of the models"
+    )
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("PREFORK_WORKERS", 2)))
+    parser.add_argument(
+        "--threads", type=int, default=None,
+        help="torch intra-op threads per worker (default: usable cores / workers)",
+    )
+    parser.add_argument(
+        "--no-warm-up", action="store_true",
+        help="do not load the sentiment models before forking",
+    )
+    parser.add_argument(
+        "--report-seconds", type=float, default=300,
+        help="log the pool's memory report this often (0 disables)",
+    )
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    server = PreforkServer(args.host, args.port, args.workers, args.threads)
+    server.load(warm_up=not args.no_warm_up)
+    server.serve(report_seconds=args.report_seconds)
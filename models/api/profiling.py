@@ -0,0 +1,265 @@
+import cProfile
+import hmac
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from datetime import datetime
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+_CAPTURE_NAME = re.compile(r"^[\w.-]+\.pstats$")
+
+# Set while a request on this thread is being profiled; the Mongo listener
+# only pays for a thread-local lookup otherwise
+_active = threading.local()
+
+
+class MongoCommandTally(monitoring.CommandListener):
+    """Adds each command's server round-trip to the capture on the calling thread."""
+
+    def started(self, event):
+        pass
+
+    def _add(self, event):
+        capture = getattr(_active, "capture", None)
+        if capture is not None:
+            capture["mongoCommands"] += 1
+            capture["mongoSeconds"] += event.duration_micros / 1e6
+
+    succeeded = _add
+    failed = _add
+
+
+def offthread_trace():
+    """A trace dict for work handed to another thread, or None when not profiling.
+
+    Pass it to ``MicroBatcher.submit`` and then to ``record_offthread``.
+    """
+    if getattr(_active, "capture", None) is None:
+        return None
+    return {"profile": True}
+
+
+def record_offthread(name, trace):
+    """Adds ``trace`` (filled in by the other thread) to this thread's capture."""
+    capture = getattr(_active, "capture", None)
+    if capture is None or not trace:
+        return
+    profiler = trace.pop("profiler", None)
+    if profiler is not None:
+        capture["offThreadProfilers"].append(profiler)
+    trace.pop("profile", None)
+    timings = {
+        key: round(value, 6) if isinstance(value, float) else value
+        for key, value in trace.items()
+    }
+    capture["offThread"].setdefault(name, []).append(timings)
+
+
+def _slug(route):
+    return re.sub(r"[^\w]+", "_", route).strip("_") or "root"
+
+
+def summarize(stats, limit=25):
+    """Top functions by cumulative time, plus time spent inside torch."""
+    entries = []
+    torch_seconds = 0.0
+    for (filename, line, name), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        if "torch" in filename or "torch" in name:
+            torch_seconds += tottime
+        entries.append(
+            {
+                "function": f"{filename}:{line}({name})",
+                "calls": calls,
+                "tottimeMs": round(tottime * 1000, 3),
+                "cumtimeMs": round(cumtime * 1000, 3),
+            }
+        )
+    entries.sort(key=lambda entry: entry["cumtimeMs"], reverse=True)
+    return entries[:limit], round(torch_seconds, 6)
+
+
+class RequestProfiler:
+    """Opt-in cProfile capture of single Flask requests.
+
+    A request is profiled when it carries the admin token in the
+    ``X-Profile`` header or ``?profile=`` parameter, or when it is picked by
+    ``sample_rate``. With no token and a zero rate no hooks are installed at
+    all. One request is profiled at a time per process; others that ask
+    while a capture runs are served unprofiled. Each capture is written to
+    ``directory`` as a ``.pstats`` file (readable by pstats, snakeviz or
+    flameprof for a flame graph) with a ``.json`` summary beside it, and only
+    the newest ``max_captures`` are kept.
+
+    Work the request hands to another thread is recorded through
+    ``offthread_trace`` / ``record_offthread``: its timings go under
+    ``offThread`` in the summary and its profile is merged into the
+    ``.pstats`` file. A micro-batch profile covers every item in the
+    batch, not only the profiled request's.
+    """
+
+    def __init__(self, directory, token=None, sample_rate=0.0, max_captures=50):
+        self.directory = directory
+        self.token = token or None
+        self.sample_rate = sample_rate
+        self.max_captures = max_captures
+        self._lock = threading.Lock()
+        self._seq = 0
+
+    @property
+    def enabled(self):
+        return self.token is not None or self.sample_rate > 0
+
+    def is_admin(self, supplied):
+        return self.token is not None and bool(supplied) and hmac.compare_digest(
+            supplied.encode(), self.token.encode()
+        )
+
+    def can_browse(self, supplied):
+        """Whether captures may be listed and downloaded.
+
+        With a token configured the token is required. With sampling alone
+        there is no token to present, so browsing is open like the capture
+        itself, and closed when profiling is off.
+        """
+        if self.token is not None:
+            return self.is_admin(supplied)
+        return self.enabled
+
+    def wanted(self, request):
+        supplied = request.headers.get("X-Profile") or request.args.get("profile")
+        if supplied:
+            return "admin" if self.is_admin(supplied) else None
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    def start(self, route, method, trigger):
+        if not self._lock.acquire(blocking=False):
+            logger.debug("Profiler busy, serving %s %s unprofiled", method, route)
+            return None
+        self._seq += 1
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        profiler = cProfile.Profile()
+        capture = {
+            "id": f"{stamp}-{_slug(route)}-{os.getpid()}-{self._seq:06d}",
+            "route": route,
+            "method": method,
+            "trigger": trigger,
+            "startedAt": datetime.utcnow().isoformat(),
+            "mongoCommands": 0,
+            "mongoSeconds": 0.0,
+            "offThread": {},
+            "offThreadProfilers": [],
+            "profiler": profiler,
+            "started": time.perf_counter(),
+        }
+        _active.capture = capture
+        profiler.enable()
+        return capture
+
+    def finish(self, capture, status):
+        try:
+            capture["profiler"].disable()
+            duration = time.perf_counter() - capture.pop("started")
+            _active.capture = None
+            self._write(capture, status, duration)
+        except Exception as e:
+            logger.error(f"Error writing profile capture: {e}")
+        finally:
+            _active.capture = None
+            self._lock.release()
+
+    def _write(self, capture, status, duration):
+        profiler = capture.pop("profiler")
+        offthread = capture.pop("offThreadProfilers")
+        os.makedirs(self.directory, exist_ok=True)
+        name = capture["id"]
+        stats = pstats.Stats(profiler, stream=io.StringIO())
+        if offthread:
+            stats.add(*offthread)
+        stats.dump_stats(os.path.join(self.directory, f"{name}.pstats"))
+        top, torch_seconds = summarize(stats)
+        summary = {
+            **capture,
+            "status": status,
+            "durationMs": round(duration * 1000, 3),
+            "mongoSeconds": round(capture["mongoSeconds"], 6),
+            "torchSeconds": torch_seconds,
+            "topFunctions": top,
+        }
+        with open(os.path.join(self.directory, f"{name}.json"), "w") as f:
+            json.dump(summary, f)
+        logger.info(f"Profiled {capture['method']} {capture['route']} as {name}")
+        self._prune()
+
+    def _prune(self):
+        captures = sorted(self._capture_files())
+        for filename in captures[: max(len(captures) - self.max_captures, 0)]:
+            for path in (filename, filename[: -len(".pstats")] + ".json"):
+                try:
+                    os.remove(os.path.join(self.directory, path))
+                except FileNotFoundError:
+                    pass
+
+    def _capture_files(self):
+        try:
+            return [f for f in os.listdir(self.directory) if _CAPTURE_NAME.match(f)]
+        except FileNotFoundError:
+            return []
+
+    def list_captures(self, limit=50):
+        """Newest first; summaries without the per-function table."""
+        captures = []
+        for filename in sorted(self._capture_files(), reverse=True)[:limit]:
+            try:
+                with open(os.path.join(self.directory, filename[: -len(".pstats")] + ".json")) as f:
+                    summary = json.load(f)
+            except (OSError, ValueError):
+                continue
+            summary.pop("topFunctions", None)
+            captures.append(summary)
+        return captures
+
+    def capture_path(self, capture_id, suffix):
+        filename = f"{capture_id}.pstats"
+        if not _CAPTURE_NAME.match(filename):
+            return None
+        path = os.path.join(self.directory, f"{capture_id}{suffix}")
+        return path if os.path.exists(path) else None
+
+
+def instrument_flask(app, profiler):
+    """Profile the requests ``profiler`` selects; adds no hooks when it is disabled."""
+    if not profiler.enabled:
+        return
+    from flask import g, request
+
+    @app.before_request
+    def _start_profile():
+        trigger = profiler.wanted(request)
+        if trigger is not None:
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            g.profile_capture = profiler.start(route, request.method, trigger)
+
+    @app.after_request
+    def _tag_response(response):
+        capture = g.get("profile_capture")
+        if capture is not None:
+            g.profile_status = response.status_code
+            response.headers["X-Profile-Id"] = capture["id"]
+        return response
+
+    @app.teardown_request
+    def _finish_profile(exc):
+        capture = g.pop("profile_capture", None)
+        if capture is not None:
+            profiler.finish(capture, g.pop("profile_status", 500))
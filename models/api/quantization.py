@@ -0,0 +1,190 @@
+import argparse
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import torch
+from transformers import (
+    AutoConfig,
+    AutoModelForSequenceClassification,
+    AutoTokenizer,
+)
+
+from sentiment_engine import SentimentScorer, checkpoint_revision
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = "quantized_state_dict.pt"
+META_FILE = "quantization.json"
+
+SAMPLE_TEXTS = [
+    "I enjoy working with my team and my manager supports my growth.",
+    "The workload is unmanageable and nobody listens to our concerns.",
+    "It's fine, nothing special to report.",
+    "Great benefits, but promotions are slow and unclear.",
+    "I am thinking about leaving because of the constant overtime.",
+    "Leadership communicates clearly and the culture is welcoming.",
+    "Meetings waste most of my day.",
+    "I feel valued and fairly paid.",
+]
+
+
+def quantized_engine():
+    engines = torch.backends.quantized.supported_engines
+    # fbgemm/x86 on Intel and AMD hosts, qnnpack on ARM
+    for engine in ("x86", "fbgemm", "qnnpack"):
+        if engine in engines:
+            return engine
+    return torch.backends.quantized.engine
+
+
+def quantize_model(model):
+    """Dynamic int8 quantization of every nn.Linear (weights int8, activations fp32)."""
+    torch.backends.quantized.engine = quantized_engine()
+    model.eval()
+    return torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+
+
+def save_quantized(model, path, source_revision):
+    os.makedirs(path, exist_ok=True)
+    model.config.save_pretrained(path)
+    torch.save(model.state_dict(), os.path.join(path, STATE_FILE))
+    with open(os.path.join(path, META_FILE), "w") as f:
+        json.dump(
+            {
+                "sourceRevision": source_revision,
+                "engine": torch.backends.quantized.engine,
+                "torchVersion": torch.__version__,
+                "createdAt": datetime.utcnow().isoformat(),
+            },
+            f,
+            indent=2,
+        )
+    logger.info(f"Saved int8 model to {path}")
+
+
+def load_quantized(path, source_revision):
+    """Rebuild a saved int8 model, or None if missing or made from other weights."""
+    try:
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (
+        meta.get("sourceRevision") != source_revision
+        or meta.get("engine") != quantized_engine()
+        or meta.get("torchVersion") != torch.__version__
+    ):
+        logger.info(f"Int8 artifact in {path} is out of date, requantizing")
+        return None
+
+    # The architecture comes from the config; the fp32 weights are never read
+    config = AutoConfig.from_pretrained(path)
+    model = quantize_model(AutoModelForSequenceClassification.from_config(config))
+    state = torch.load(os.path.join(path, STATE_FILE), weights_only=False)
+    model.load_state_dict(state)
+    model.eval()
+    return model
+
+
+def quantized_checkpoint(checkpoint_path, artifact_path, source_revision):
+    """Int8 version of ``checkpoint_path``, reusing the saved artifact when current."""
+    model = load_quantized(artifact_path, source_revision)
+    if model is not None:
+        logger.info(f"Loaded int8 model from {artifact_path}")
+        return model
+
+    model = quantize_model(
+        AutoModelForSequenceClassification.from_pretrained(checkpoint_path)
+    )
+    try:
+        save_quantized(model, artifact_path, source_revision)
+    except OSError as e:
+        logger.error(f"Could not save int8 model to {artifact_path}: {e}")
+    return model
+
+
+def agreement_report(reference, candidate, texts):
+    """Compare two SentimentScorers on ``texts``: score drift, label flips and speed.
+
+    Scores use the API's scale, P(positive) - P(negative).
+    """
+    start = time.perf_counter()
+    reference_proba = reference.predict_proba(texts)
+    reference_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    candidate_proba = candidate.predict_proba(texts)
+    candidate_seconds = time.perf_counter() - start
+
+    drift = np.abs(
+        (candidate_proba[:, 1] - candidate_proba[:, 0])
+        - (reference_proba[:, 1] - reference_proba[:, 0])
+    )
+    flips = int(
+        np.count_nonzero(reference_proba.argmax(axis=1) != candidate_proba.argmax(axis=1))
+    )
+    return {
+        "referenceModel": reference.model_id,
+        "candidateModel": candidate.model_id,
+        "samples": len(texts),
+        "meanAbsScoreDrift": float(drift.mean()) if len(texts) else 0.0,
+        "p95AbsScoreDrift": float(np.percentile(drift, 95)) if len(texts) else 0.0,
+        "maxAbsScoreDrift": float(drift.max()) if len(texts) else 0.0,
+        "labelFlips": flips,
+        "labelFlipRate": flips / len(texts) if len(texts) else 0.0,
+        "referenceSeconds": reference_seconds,
+        "candidateSeconds": candidate_seconds,
+        "speedup": reference_seconds / candidate_seconds if candidate_seconds else None,
+    }
+
+
+if __name__ == "__main__":
+    # python quantization.py --texts sample.txt  (one text per line)
+    parser = argparse.ArgumentParser(
+        description="Build the int8 sentiment model and report its agreement with fp32"
+    )
+    parser.add_argument("--checkpoint", default="../bert_model/")
+    parser.add_argument("--output", default="../bert_model_int8/")
+    parser.add_argument("--texts", help="file with one sample text per line")
+    parser.add_argument(
+        "--mongo-sample", type=int, default=0,
+        help="sample this many stored /analyze-sentiment texts instead",
+    )
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017/")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    texts = SAMPLE_TEXTS
+    if args.texts:
+        with open(args.texts) as f:
+            texts = [line.strip() for line in f if line.strip()]
+    elif args.mongo_sample:
+        from pymongo import MongoClient
+
+        feedback = MongoClient(args.mongo_uri)["prescient"]["sentimentfeedbacks"]
+        texts = [
+            doc["generalFeedback"]
+            for doc in feedback.aggregate([
+                {"$match": {"generalFeedback": {"$type": "string", "$ne": ""}}},
+                {"$sample": {"size": args.mongo_sample}},
+            ])
+        ]
+
+    revision = checkpoint_revision(args.checkpoint)
+    tokenizer = AutoTokenizer.from_pretrained(args.checkpoint)
+    fp32 = SentimentScorer(
+        tokenizer,
+        AutoModelForSequenceClassification.from_pretrained(args.checkpoint),
+        model_id="fp32",
+    )
+    int8 = SentimentScorer(
+        tokenizer,
+        quantized_checkpoint(args.checkpoint, args.output, revision),
+        model_id="int8",
+    )
+    print(json.dumps(agreement_report(fp32, int8, texts), indent=2))
@@ -0,0 +1,218 @@
+import functools
+import hashlib
+import inspect
+import multiprocessing
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from flask import current_app, request
+
+
+class ResponseCache:
+    """In-process cache of rendered GET responses with tag-based invalidation.
+
+    Entries are keyed by path, sorted query parameters and the Accept header,
+    and remember the generation of every tag they depend on. Write routes
+    bump tag generations through ``invalidate`` (or the ``invalidates``
+    decorator), which makes every dependent entry stale at once without
+    scanning the cache. Every cacheable response carries an ETag, so clients
+    polling with If-None-Match get a 304 while the data is unchanged.
+
+    Generations live in a shared-memory array of ``generation_slots``
+    counters, with each tag hashed to one slot. Prefork workers inherit the
+    array from the parent that built the cache, so a write in one worker
+    stales the entries of all of them. Tags that share a slot only cost
+    extra misses. Entries also expire after ``ttl_seconds``, which bounds
+    staleness from writers outside the process tree (the Node.js backend).
+    """
+
+    def __init__(self, max_entries=256, ttl_seconds=30, generation_slots=4096):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._generations = multiprocessing.Array("Q", generation_slots)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.not_modified = 0
+
+    @staticmethod
+    def request_key(req=request):
+        args = sorted(req.args.items(multi=True))
+        return (req.path, tuple(args), req.headers.get("Accept", ""))
+
+    def _slot(self, tag):
+        return zlib.crc32(tag.encode("utf-8")) % len(self._generations)
+
+    def generation(self, tag):
+        return self._generations[self._slot(tag)]
+
+    def invalidate(self, *tags):
+        with self._lock:
+            with self._generations.get_lock():
+                for tag in tags:
+                    self._generations.get_obj()[self._slot(tag)] += 1
+            self.invalidations += len(tags)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            fresh = entry["expires"] > time.monotonic() and all(
+                self.generation(tag) == generation
+                for tag, generation in entry["tags"].items()
+            )
+            if not fresh:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def _snapshot(self, tags):
+        with self._lock:
+            return {tag: self.generation(tag) for tag in tags}
+
+    def _store(self, key, tags, generations, body, response):
+        with self._lock:
+            # A write that landed while the view ran makes this response stale
+            if any(self.generation(tag) != generations[tag] for tag in tags):
+                return
+            self._entries[key] = {
+                "body": body,
+                "status": response.status_code,
+                "mimetype": response.mimetype,
+                "etag": response.get_etag()[0],
+                "tags": generations,
+                "expires": time.monotonic() + self.ttl_seconds,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _count_conditional(self, response):
+        if response.status_code == 304:
+            with self._lock:
+                self.not_modified += 1
+        return response
+
+    def cached(self, *tags, tags_for=None):
+        """Cache a GET view; ``tags_for(**view_args)`` adds per-request tags.
+
+        Works on Flask views and on the async front end's Quart views, which
+        share the entries and generations of the same cache.
+        """
+
+        def decorator(view):
+            if inspect.iscoroutinefunction(view):
+                return self._cached_async(view, tags, tags_for)
+
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                entry_tags = list(tags) + list(tags_for(**kwargs) if tags_for else ())
+                key = self.request_key()
+                entry = self._lookup(key)
+                if entry is not None:
+                    response = current_app.response_class(
+                        entry["body"], status=entry["status"], mimetype=entry["mimetype"]
+                    )
+                    response.set_etag(entry["etag"])
+                    return self._count_conditional(response.make_conditional(request))
+
+                generations = self._snapshot(entry_tags)
+                response = current_app.make_response(view(*args, **kwargs))
+                # Only complete, successful bodies are cached (not NDJSON streams)
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                body = response.get_data()
+                response.set_etag(hashlib.sha1(body).hexdigest())
+                self._store(key, entry_tags, generations, body, response)
+                return self._count_conditional(response.make_conditional(request))
+
+            return wrapper
+
+        return decorator
+
+    def _cached_async(self, view, tags, tags_for):
+        from quart import current_app as quart_app
+        from quart import request as quart_request
+
+        @functools.wraps(view)
+        async def wrapper(*args, **kwargs):
+            entry_tags = list(tags) + list(tags_for(**kwargs) if tags_for else ())
+            key = self.request_key(quart_request)
+            entry = self._lookup(key)
+            if entry is not None:
+                response = quart_app.response_class(
+                    entry["body"], status=entry["status"], mimetype=entry["mimetype"]
+                )
+                response.set_etag(entry["etag"])
+                return self._count_conditional(await response.make_conditional(quart_request))
+
+            generations = self._snapshot(entry_tags)
+            response = await quart_app.make_response(await view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            body = await response.get_data()
+            response.set_etag(hashlib.sha1(body).hexdigest())
+            self._store(key, entry_tags, generations, body, response)
+            return self._count_conditional(await response.make_conditional(quart_request))
+
+        return wrapper
+
+    def invalidates(self, *tags):
+        """Invalidate ``tags`` after a write view runs, whatever its outcome.
+
+        Works on Flask views and on the async front end's coroutine views.
+        """
+
+        def decorator(view):
+            if inspect.iscoroutinefunction(view):
+
+                @functools.wraps(view)
+                async def async_wrapper(*args, **kwargs):
+                    try:
+                        return await view(*args, **kwargs)
+                    finally:
+                        self.invalidate(*tags)
+
+                return async_wrapper
+
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                try:
+                    return view(*args, **kwargs)
+                finally:
+                    self.invalidate(*tags)
+
+            return wrapper
+
+        return decorator
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "ttlSeconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": self.hits / lookups if lookups else 0.0,
+                "notModified": self.not_modified,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "generationSlots": len(self._generations),
+            }
@@ -0,0 +1,228 @@
+import hashlib
+import json
+import logging
+
+import numpy as np
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+RISK_FIELD = "attritionRisk"
+MODEL_VERSION_FIELD = "riskModelVersion"
+FEATURE_HASH_FIELD = "riskFeatureHash"
+DRIVERS_FIELD = "riskDrivers"
+DRIVERS_STAMP_FIELD = "riskDriversStamp"
+INTERNAL_FIELDS = (MODEL_VERSION_FIELD, FEATURE_HASH_FIELD, DRIVERS_FIELD, DRIVERS_STAMP_FIELD)
+
+
+def file_fingerprint(paths):
+    """Content hash of the model artifacts, used as the stored model version."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+class RiskScoreStore:
+    """Keeps persisted ``attritionRisk`` values in step with the model.
+
+    Every stored score is stamped with the model version and a hash of the
+    feature fields it was computed from. ``refresh`` recomputes the hash of
+    each document as read, rescores only documents whose stamp no longer
+    matches (features edited by any writer, or a new model), and writes the
+    new scores back in one unordered bulk write.
+    """
+
+    def __init__(self, collection, score_fn, model_version, feature_keys):
+        self.collection = collection
+        self.score_fn = score_fn
+        self.model_version = model_version
+        self.feature_keys = sorted(set(feature_keys))
+
+    def feature_hash(self, doc):
+        values = [[key, doc[key]] for key in self.feature_keys if key in doc]
+        payload = json.dumps(values, sort_keys=True, default=str, separators=(",", ":"))
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def stamp(self, doc):
+        # Fields stored next to a freshly computed attritionRisk
+        return {
+            MODEL_VERSION_FIELD: self.model_version,
+            FEATURE_HASH_FIELD: self.feature_hash(doc),
+        }
+
+    def is_fresh(self, doc):
+        return (
+            doc.get(RISK_FIELD) is not None
+            and doc.get(MODEL_VERSION_FIELD) == self.model_version
+            and doc.get(FEATURE_HASH_FIELD) == self.feature_hash(doc)
+        )
+
+    def refresh(self, docs):
+        """Bring attritionRisk on ``docs`` up to date in place; returns the number rescored.
+
+        Documents must include ``_id`` so rescored values can be written back.
+        """
+        stale, operations = self.rescore(docs)
+        if operations:
+            result = self.collection.bulk_write(operations, ordered=False)
+            logger.info(
+                f"Rescored {stale} stale employees, {result.modified_count} updated"
+            )
+        return stale
+
+    def rescore(self, docs):
+        """Score the stale ``docs`` in place without writing.
+
+        Returns the number rescored and the write-back operations, for
+        callers that issue the bulk write through another driver.
+        """
+        stale = [doc for doc in docs if not self.is_fresh(doc)]
+        if not stale:
+            return 0, []
+
+        risks = self.score_fn(stale)
+        operations = []
+        for doc, risk in zip(stale, risks):
+            update = {RISK_FIELD: risk, **self.stamp(doc)}
+            doc.update(update)
+            if "_id" in doc:
+                operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": update}))
+        return len(stale), operations
+
+    def ensure_indexes(self):
+        # Top-K reads: equality on the model version (and filters), then the
+        # stored score in descending order, so a query walks only K entries
+        try:
+            for filters in ([], ["department"], ["jobRole"], ["department", "jobRole"]):
+                self.collection.create_index(
+                    [(MODEL_VERSION_FIELD, ASCENDING)]
+                    + [(field, ASCENDING) for field in filters]
+                    + [(RISK_FIELD, DESCENDING)]
+                )
+        except PyMongoError as e:
+            logger.warning(f"Could not create attrition risk indexes: {e}")
+
+    def backfill(self, filters=None, batch_size=1000):
+        """Rescore every stale document matching ``filters``; returns the number rescored.
+
+        Edited features only show in the feature hash, which a query cannot
+        compare, so this pages through all matching documents in ``_id``
+        order and lets ``refresh`` pick the stale ones. It is meant for a
+        background thread: once at startup, and after bulk writes for the
+        documents they touched.
+        """
+        query = dict(filters or {})
+        projection = self.projection(["_id"])
+        total = 0
+        last_id = None
+        while True:
+            page = query if last_id is None else {**query, "_id": {"$gt": last_id}}
+            docs = list(
+                self.collection.find(page, projection).sort("_id", ASCENDING).limit(batch_size)
+            )
+            if not docs:
+                return total
+            last_id = docs[-1]["_id"]
+            total += self.refresh(docs)
+
+    def top(self, filters, k, min_risk=None, fields=None, max_passes=3):
+        """The ``k`` highest stored scores among documents matching ``filters``.
+
+        Reads go through the (version, filters..., attritionRisk) index, so
+        only ``k`` documents are fetched. Any of them whose features changed
+        since scoring are rescored and the read repeated, since a lower new
+        score can let another employee into the top ``k``. Documents scored
+        by another model are not seen until ``backfill`` has rescored them.
+        """
+        query = {**filters, MODEL_VERSION_FIELD: self.model_version}
+        if min_risk is not None:
+            query[RISK_FIELD] = {"$gte": min_risk}
+        projection = self.projection(fields)
+        for _ in range(max_passes):
+            cursor = self.collection.find(query, projection).sort(RISK_FIELD, DESCENDING)
+            docs = list(cursor.limit(k))
+            if not self.refresh(docs):
+                break
+        docs = [doc for doc in docs if min_risk is None or doc[RISK_FIELD] >= min_risk]
+        return sorted(docs, key=lambda doc: doc[RISK_FIELD], reverse=True)
+
+    def projection(self, fields=None):
+        # None reads whole documents; otherwise ``fields`` plus what scoring needs
+        if fields is None:
+            return None
+        needed = set(fields) | set(self.feature_keys) | {"employeeId", RISK_FIELD}
+        return {field: 1 for field in needed | {MODEL_VERSION_FIELD, FEATURE_HASH_FIELD}}
+
+    @staticmethod
+    def public_view(doc):
+        # Drops Mongo and bookkeeping fields before a document leaves the API
+        return {
+            key: value
+            for key, value in doc.items()
+            if key != "_id" and key not in INTERNAL_FIELDS
+        }
+
+
+def top_drivers(contributions, feature_names, k):
+    """Per row, the ``k`` features with the largest absolute contribution.
+
+    ``contributions`` are probabilities; drivers are reported in percentage
+    points of attritionRisk, largest first.
+    """
+    k = min(k, contributions.shape[1])
+    magnitude = np.abs(contributions)
+    top = np.argpartition(-magnitude, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(magnitude, top, axis=1), axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    points = np.round(np.take_along_axis(contributions, top, axis=1) * 100, 2)
+    return [
+        [
+            {"feature": feature_names[j], "contribution": float(c)}
+            for j, c in zip(row_features, row_points)
+        ]
+        for row_features, row_points in zip(top, points)
+    ]
+
+
+class RiskDriverStore:
+    """Persists per-employee risk drivers next to the stored ``attritionRisk``.
+
+    Drivers are stamped with the same model version and feature hash as the
+    score (see ``RiskScoreStore``), so they are recomputed only when the
+    score itself would be. ``explain_fn(docs)`` returns one driver list per
+    document, or None where the features are incomplete.
+    """
+
+    def __init__(self, collection, explain_fn, risk_store):
+        self.collection = collection
+        self.explain_fn = explain_fn
+        self.risk_store = risk_store
+
+    def stamp(self, doc):
+        return f"{self.risk_store.model_version}:{self.risk_store.feature_hash(doc)}"
+
+    def is_fresh(self, doc):
+        return DRIVERS_FIELD in doc and doc.get(DRIVERS_STAMP_FIELD) == self.stamp(doc)
+
+    def refresh(self, docs):
+        """Fill ``riskDrivers`` on ``docs`` in place; returns the number recomputed."""
+        stale = [doc for doc in docs if not self.is_fresh(doc)]
+        if not stale:
+            return 0
+
+        operations = []
+        for doc, drivers in zip(stale, self.explain_fn(stale)):
+            update = {DRIVERS_FIELD: drivers, DRIVERS_STAMP_FIELD: self.stamp(doc)}
+            doc.update(update)
+            if "_id" in doc and drivers is not None:
+                operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": update}))
+        if operations:
+            result = self.collection.bulk_write(operations, ordered=False)
+            logger.info(
+                f"Computed risk drivers for {len(stale)} employees, {result.modified_count} updated"
+            )
+        return len(stale)
@@ -0,0 +1,149 @@
+import itertools
+import math
+
+import numpy as np
+
+
+def _range(spec):
+    start, stop, step = (float(spec[key]) for key in ("start", "stop", "step"))
+    if not all(math.isfinite(x) for x in (start, stop, step)):
+        raise ValueError("Range bounds and step must be finite")
+    if step <= 0 or stop < start:
+        raise ValueError("Ranges need step > 0 and stop >= start")
+    return start, step, math.floor((stop - start) / step + 1e-9) + 1
+
+
+def value_count(spec):
+    """How many values ``spec`` expands to, without materializing a range."""
+    if isinstance(spec, list):
+        count = len(spec)
+    elif isinstance(spec, dict) and "values" in spec:
+        count = len(spec["values"])
+    elif isinstance(spec, dict) and {"start", "stop", "step"} <= spec.keys():
+        count = _range(spec)[2]
+    else:
+        raise ValueError(
+            'Each parameter takes a list of values or {"start", "stop", "step"}'
+        )
+    if not count:
+        raise ValueError("Each parameter needs at least one value")
+    return count
+
+
+def parse_values(spec):
+    """The values one parameter takes: a list, or {"start", "stop", "step"} (inclusive).
+
+    Call ``value_count`` first to bound the size; ranges are built here.
+    """
+    value_count(spec)
+    if isinstance(spec, list):
+        return spec
+    if "values" in spec:
+        return spec["values"]
+    start, step, count = _range(spec)
+    return (start + step * np.arange(count)).tolist()
+
+
+def _is_class(lookup, value):
+    try:
+        return value in lookup
+    except TypeError:  # unhashable values are never valid classes
+        return False
+
+
+class ScenarioBuilder:
+    """Expands what-if parameters around one employee into a single feature matrix.
+
+    ``sweeps`` vary one parameter at a time with every other feature at the
+    employee's own value; ``grid`` takes the cartesian product of its
+    parameters. The base row is encoded once and every variant is a copy of
+    it with the varied columns overwritten, so the matrix is built with a
+    handful of numpy operations whatever the number of variants.
+    """
+
+    def __init__(self, feature_encoder, max_variants=20000):
+        self.feature_encoder = feature_encoder
+        self.max_variants = max_variants
+
+    def column(self, name):
+        col = self.feature_encoder.rename_map.get(name, name)
+        if col not in self.feature_encoder.feature_columns:
+            raise ValueError(f"Unknown feature: {name}")
+        return self.feature_encoder.feature_columns.index(col), col
+
+    def encode(self, name, values):
+        index, col = self.column(name)
+        lookup = self.feature_encoder.lookups.get(col)
+        if lookup is None:
+            try:
+                return index, np.asarray(values, dtype=np.float64)
+            except (TypeError, ValueError):
+                raise ValueError(f"{name} takes numeric values")
+        # Unknown classes would silently score as classes_[0]; reject them instead
+        unknown = [value for value in values if not _is_class(lookup, value)]
+        if unknown:
+            raise ValueError(f"Unknown {name} values {unknown}; expected one of {list(lookup)}")
+        return index, np.asarray([lookup[value] for value in values], dtype=np.float64)
+
+    def build(self, base, sweeps=None, grid=None):
+        """(matrix, layout): row 0 is ``base``, then each sweep, then the grid."""
+        sweeps = sweeps or {}
+        grid = grid or {}
+        if not sweeps and not grid:
+            raise ValueError("Provide sweeps and/or grid")
+        if not isinstance(sweeps, dict) or not isinstance(grid, dict):
+            raise ValueError("sweeps and grid map feature names to values")
+
+        # Sized with Python ints before anything is allocated, so an
+        # oversized range or grid is rejected without building it
+        grid_size = math.prod(value_count(spec) for spec in grid.values()) if grid else 0
+        total = 1 + sum(value_count(spec) for spec in sweeps.values()) + grid_size
+        if total > self.max_variants:
+            raise ValueError(f"{total} variants requested; the limit is {self.max_variants}")
+
+        sweep_values = {name: parse_values(spec) for name, spec in sweeps.items()}
+        grid_values = {name: parse_values(spec) for name, spec in grid.items()}
+
+        base_row = self.feature_encoder.transform_records([base])[0]
+        matrix = np.repeat(base_row[np.newaxis, :], total, axis=0)
+        layout = {"sweeps": [], "grid": None}
+        row = 1
+        for name, values in sweep_values.items():
+            index, codes = self.encode(name, values)
+            matrix[row:row + len(values), index] = codes
+            layout["sweeps"].append((name, values, slice(row, row + len(values))))
+            row += len(values)
+        if grid_values:
+            names = list(grid_values)
+            encoded = [self.encode(name, grid_values[name]) for name in names]
+            # Row-major product: the last parameter varies fastest
+            mesh = np.meshgrid(*[codes for _, codes in encoded], indexing="ij")
+            for (index, _), codes in zip(encoded, mesh):
+                matrix[row:, index] = codes.ravel()
+            layout["grid"] = (names, [grid_values[name] for name in names], slice(row, total))
+        return matrix, layout
+
+    @staticmethod
+    def sensitivity_table(layout, risks):
+        """Columnar sweep and grid results; ``delta`` is the change from the base risk."""
+        risks = np.round(np.asarray(risks, dtype=np.float64), 2)
+        base_risk = float(risks[0])
+        table = {"baseRisk": base_risk, "variants": len(risks) - 1}
+        table["sweeps"] = [
+            {
+                "feature": name,
+                "values": values,
+                "risk": risks[rows].tolist(),
+                "delta": np.round(risks[rows] - base_risk, 2).tolist(),
+            }
+            for name, values, rows in layout["sweeps"]
+        ]
+        if layout["grid"] is not None:
+            names, values, rows = layout["grid"]
+            table["grid"] = {
+                "features": names,
+                "rows": [list(combo) for combo in itertools.product(*values)],
+                "risk": risks[rows].tolist(),
+                "delta": np.round(risks[rows] - base_risk, 2).tolist(),
+            }
+        return table
@@ -0,0 +1,184 @@
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+from pymongo.errors import BulkWriteError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text, lowercase=False):
+    # BERT tokenizers split on whitespace, so collapsing it (and lowercasing
+    # for uncased vocabularies) never changes the tokens the model sees.
+    text = _WHITESPACE.sub(" ", str(text)).strip()
+    return text.lower() if lowercase else text
+
+
+def cache_key(model_id, normalized_text):
+    digest = hashlib.sha256()
+    digest.update(model_id.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(normalized_text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class SentimentCache:
+    """Two-tier cache of sentiment probabilities keyed by text and model.
+
+    The first tier is an in-process LRU bounded by ``max_entries``; the second
+    is a MongoDB collection (optional) that survives restarts and is bounded by
+    a TTL index on ``createdAt``. Scores are stored as the raw float32 softmax
+    vector, so callers derive exactly the same sentiment score on a hit as on
+    a fresh inference.
+    """
+
+    def __init__(self, collection=None, max_entries=50000, ttl_days=90):
+        self.collection = collection
+        self.max_entries = max_entries
+        self.ttl_days = ttl_days
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            "memoryHits": 0,
+            "persistentHits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "persistentErrors": 0,
+        }
+
+    def ensure_indexes(self):
+        if self.collection is None or not self.ttl_days:
+            return
+        try:
+            self.collection.create_index(
+                "createdAt", expireAfterSeconds=int(self.ttl_days * 86400)
+            )
+        except PyMongoError as e:
+            logger.warning(f"Could not create sentiment cache TTL index: {e}")
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._counters[name] += n
+
+    def _memory_get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def _memory_put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def _persistent_get(self, model_id, keys):
+        if self.collection is None or not keys:
+            return {}
+        try:
+            docs = self.collection.find(
+                {"_id": {"$in": keys}, "model": model_id},
+                {"probabilities": 1},
+            )
+            return {
+                doc["_id"]: np.asarray(doc["probabilities"], dtype=np.float32)
+                for doc in docs
+            }
+        except PyMongoError as e:
+            self._count("persistentErrors")
+            logger.warning(f"Sentiment cache lookup failed: {e}")
+            return {}
+
+    def _persistent_put(self, model_id, values):
+        if self.collection is None or not values:
+            return
+        now = datetime.utcnow()
+        docs = [
+            {
+                "_id": key,
+                "model": model_id,
+                "probabilities": [float(p) for p in value],
+                "createdAt": now,
+            }
+            for key, value in values.items()
+        ]
+        try:
+            self.collection.insert_many(docs, ordered=False)
+        except BulkWriteError:
+            # Another worker stored the same text first; its value is identical
+            pass
+        except PyMongoError as e:
+            self._count("persistentErrors")
+            logger.warning(f"Sentiment cache write failed: {e}")
+
+    def predict_proba(self, scorer, texts):
+        """Drop-in for ``scorer.predict_proba`` that only runs inference on unseen texts."""
+        texts = [str(text) for text in texts]
+        probabilities = np.zeros((len(texts), scorer.num_labels), dtype=np.float32)
+        if not texts:
+            return probabilities
+
+        model_id = scorer.model_id
+        lowercase = scorer.lowercases_input
+        keys = [cache_key(model_id, normalize_text(t, lowercase)) for t in texts]
+
+        # Duplicates inside one upload are resolved once
+        first_text = {}
+        for key, text in zip(keys, texts):
+            first_text.setdefault(key, text)
+
+        found = {}
+        for key in first_text:
+            value = self._memory_get(key)
+            if value is not None:
+                found[key] = value
+        self._count("memoryHits", len(found))
+
+        pending = [key for key in first_text if key not in found]
+        persisted = self._persistent_get(model_id, pending)
+        for key, value in persisted.items():
+            self._memory_put(key, value)
+        found.update(persisted)
+        self._count("persistentHits", len(persisted))
+
+        missing = [key for key in pending if key not in persisted]
+        if missing:
+            self._count("misses", len(missing))
+            scored = scorer.predict_proba([first_text[key] for key in missing])
+            fresh = dict(zip(missing, scored))
+            for key, value in fresh.items():
+                self._memory_put(key, value)
+            self._persistent_put(model_id, fresh)
+            found.update(fresh)
+
+        for i, key in enumerate(keys):
+            probabilities[i] = found[key]
+        logger.debug(
+            f"Sentiment cache: {len(texts)} texts, {len(first_text)} unique, "
+            f"{len(missing)} scored"
+        )
+        return probabilities
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._entries)
+        stats["maxEntries"] = self.max_entries
+        lookups = stats["memoryHits"] + stats["persistentHits"] + stats["misses"]
+        stats["hitRate"] = (
+            (stats["memoryHits"] + stats["persistentHits"]) / lookups if lookups else 0.0
+        )
+        return stats
@@ -0,0 +1,210 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+POSITIVE_THRESHOLD = 0.5
+
+DATE_RANGE_DAYS = {
+    'Last 7 Days': 7,
+    'Last 30 Days': 30,
+    'Last Year': 365,
+}
+DEFAULT_RANGE_DAYS = 180  # Last 6 Months
+
+
+def sentiment_filters(args, now=None):
+    """Normalize the /sentiment query string into (type, start_date, department)."""
+    type_param = args.get('type', 'all').lower()  # Sentiment type: all, positive, negative, neutral
+    date_range = args.get('dateRange', 'Last 6 Months')  # Date range filter
+    department = args.get('department', 'All Departments')  # Department filter
+
+    start_date = None
+    if date_range != 'All':
+        today = now or datetime.now()
+        start_date = today - timedelta(days=DATE_RANGE_DAYS.get(date_range, DEFAULT_RANGE_DAYS))
+    return type_param, start_date, department
+
+
+def score_condition(type_param, field='sentimentScore'):
+    if type_param == 'positive':
+        return {field: {'$gt': POSITIVE_THRESHOLD}}
+    if type_param == 'negative':
+        return {field: {'$lt': 0}}
+    if type_param == 'neutral':
+        return {field: {'$gte': 0, '$lte': POSITIVE_THRESHOLD}}
+    return {}
+
+
+def sentiment_pipeline(type_param, start_date, department, employees_collection='employees'):
+    """One aggregation that filters, joins and summarizes feedback for the dashboard."""
+    pipeline = []
+    if start_date is not None:
+        pipeline.append({'$match': {'date': {'$gte': start_date}}})
+
+    # Feedback references employees either by ObjectId or by its string form
+    pipeline += [
+        {'$lookup': {
+            'from': employees_collection,
+            'let': {'employeeRef': {'$convert': {
+                'input': '$employee', 'to': 'objectId', 'onError': None, 'onNull': None,
+            }}},
+            'pipeline': [
+                {'$match': {'$expr': {'$eq': ['$_id', '$$employeeRef']}}},
+                {'$project': {'employeeId': 1, 'email': 1, 'name': 1, 'department': 1}},
+            ],
+            'as': 'emp',
+        }},
+        {'$unwind': '$emp'},
+        {'$match': {'emp.employeeId': {'$exists': True}}},
+        {'$project': {
+            '_id': 0,
+            'employeeId': '$emp.employeeId',
+            'email': {'$ifNull': ['$emp.email', '']},
+            'name': {'$ifNull': ['$emp.name', 'N/A']},
+            'department': {'$ifNull': ['$emp.department', 'Unknown']},
+            'sentimentScore': 1,
+            'date': 1,
+            'parsedDate': {'$convert': {
+                'input': '$date', 'to': 'date', 'onError': None, 'onNull': None,
+            }},
+        }},
+    ]
+
+    if department != 'All Departments':
+        pipeline.append({'$match': {'department': department}})
+    condition = score_condition(type_param)
+    if condition:
+        pipeline.append({'$match': condition})
+
+    # Month bucket: real dates are formatted, ISO strings keep their YYYY-MM prefix
+    month_key = {'$ifNull': [
+        {'$dateToString': {'format': '%Y-%m', 'date': '$parsedDate'}},
+        {'$substrCP': [{'$ifNull': [{'$toString': '$date'}, '']}, 0, 7]},
+    ]}
+    pipeline.append({'$facet': {
+        'totals': [{'$group': {
+            '_id': None,
+            'total': {'$sum': 1},
+            'positive': {'$sum': {'$cond': [{'$gt': ['$sentimentScore', POSITIVE_THRESHOLD]}, 1, 0]}},
+            'negative': {'$sum': {'$cond': [{'$lt': ['$sentimentScore', 0]}, 1, 0]}},
+            'scoreSum': {'$sum': '$sentimentScore'},
+        }}],
+        'months': [
+            {'$group': {'_id': month_key, 'sum': {'$sum': '$sentimentScore'}, 'count': {'$sum': 1}}},
+        ],
+        'departments': [
+            {'$group': {
+                '_id': '$department',
+                'sum': {'$sum': '$sentimentScore'},
+                'count': {'$sum': 1},
+                'latest': {'$max': '$date'},
+            }},
+            # Most recently active department first, as the old Python loop produced
+            {'$sort': {'latest': -1}},
+        ],
+        'employees': [
+            {'$sort': {'parsedDate': -1, 'date': -1}},
+            {'$group': {
+                '_id': '$employeeId',
+                'email': {'$first': '$email'},
+                'name': {'$first': '$name'},
+                'department': {'$first': '$department'},
+                'sentimentScore': {'$first': '$sentimentScore'},
+                'date': {'$first': '$date'},
+            }},
+            {'$match': {'sentimentScore': {'$lt': 0}}},
+            {'$sort': {'sentimentScore': 1}},
+        ],
+    }})
+    return pipeline
+
+
+def summary_from_facets(result):
+    """Flatten the $facet document into the summary consumed by sentiment_response."""
+    totals = result['totals'][0] if result.get('totals') else {}
+    return {
+        'total': totals.get('total', 0),
+        'positive': totals.get('positive', 0),
+        'negative': totals.get('negative', 0),
+        'scoreSum': totals.get('scoreSum', 0),
+        'months': [
+            {'month': m['_id'], 'sum': m['sum'], 'count': m['count']}
+            for m in result.get('months', []) if m['_id']
+        ],
+        'departments': [
+            {'department': d['_id'], 'sum': d['sum'], 'count': d['count']}
+            for d in result.get('departments', [])
+        ],
+        'employees': [
+            {
+                'employeeId': e['_id'],
+                'email': e['email'],
+                'name': e['name'],
+                'department': e['department'],
+                'sentimentScore': e['sentimentScore'],
+                'date': e.get('date', ''),
+            }
+            for e in result.get('employees', [])
+        ],
+    }
+
+
+def empty_response():
+    return {
+        'totalFeedback': 0,
+        'positiveSentiment': 0,
+        'negativeSentiment': 0,
+        'overallScore': 0,
+        'trendData': [],
+        'departmentData': [],
+        'distributionData': [
+            {'name': 'Positive', 'value': 0, 'color': '#36B37E'},
+            {'name': 'Neutral', 'value': 0, 'color': '#6554C0'},
+            {'name': 'Negative', 'value': 0, 'color': '#FF5630'}
+        ],
+        'employeesData': []
+    }
+
+
+def sentiment_response(summary):
+    """Build the JSON contract of the Sentiment page from a summary."""
+    total_feedback = summary['total']
+    if total_feedback == 0:
+        return empty_response()
+
+    positive_sentiment = summary['positive'] / total_feedback * 100
+    negative_sentiment = summary['negative'] / total_feedback * 100
+    neutral_sentiment = 100 - positive_sentiment - negative_sentiment
+    overall_score = summary['scoreSum'] / total_feedback
+
+    # Months arrive as YYYY-MM, which sorts chronologically
+    trend_data = [
+        {
+            'month': datetime.strptime(m['month'], '%Y-%m').strftime('%b %Y'),
+            'score': m['sum'] / m['count'],
+        }
+        for m in sorted(summary['months'], key=lambda m: m['month'])
+    ]
+    department_data = [
+        {'department': d['department'], 'score': d['sum'] / d['count']}
+        for d in summary['departments']
+    ]
+    distribution_data = [
+        {'name': 'Positive', 'value': round(positive_sentiment), 'color': '#36B37E'},
+        {'name': 'Neutral', 'value': round(neutral_sentiment), 'color': '#6554C0'},
+        {'name': 'Negative', 'value': round(negative_sentiment), 'color': '#FF5630'}
+    ]
+
+    return {
+        'totalFeedback': total_feedback,
+        'positiveSentiment': round(positive_sentiment),
+        'negativeSentiment': round(negative_sentiment),
+        'overallScore': overall_score,
+        'trendData': trend_data,
+        'departmentData': department_data,
+        'distributionData': distribution_data,
+        'employeesData': [  # Format dates for frontend
+            {**e, 'date': pd.to_datetime(e['date']).strftime('%Y-%m-%d') if e['date'] else 'N/A'}
+            for e in summary['employees']
+        ]
+    }
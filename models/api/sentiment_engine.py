@@ -0,0 +1,130 @@
+import logging
+import os
+import time
+
+import numpy as np
+import torch
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 32
+DEFAULT_MAX_TOKENS_PER_BATCH = 16384
+MAX_LENGTH = 512
+
+
+def checkpoint_revision(path):
+    # Changes whenever the checkpoint files are replaced, so cached scores
+    # from older weights are never reused
+    mtimes = [
+        os.path.getmtime(os.path.join(path, name))
+        for name in os.listdir(path)
+    ]
+    return str(int(max(mtimes))) if mtimes else "0"
+
+
+class SentimentScorer:
+    """Batched sequence-classification scorer.
+
+    Texts are tokenized once, sorted by token length and grouped into
+    mini-batches that are padded only to the longest member of the batch, so
+    short survey answers are never padded out to 512 tokens. Results are
+    returned in the original input order.
+    """
+
+    def __init__(
+        self,
+        tokenizer,
+        model,
+        batch_size=DEFAULT_BATCH_SIZE,
+        max_tokens_per_batch=DEFAULT_MAX_TOKENS_PER_BATCH,
+        max_length=MAX_LENGTH,
+        model_id=None,
+    ):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        if max_tokens_per_batch < max_length:
+            raise ValueError("max_tokens_per_batch must be at least max_length")
+        self.tokenizer = tokenizer
+        self.model = model
+        self.batch_size = batch_size
+        self.max_tokens_per_batch = max_tokens_per_batch
+        self.max_length = max_length
+        # Identifies the weights behind the scores, e.g. for cache keys
+        self.model_id = model_id or getattr(
+            model.config, "_name_or_path", type(model).__name__
+        )
+        self.model.eval()
+
+    @property
+    def num_labels(self):
+        return self.model.config.num_labels
+
+    @property
+    def lowercases_input(self):
+        return bool(getattr(self.tokenizer, "do_lower_case", False))
+
+    def _batches(self, lengths):
+        # Ascending length order keeps padding inside each batch minimal; the
+        # last member of a batch is always its longest, so the token budget is
+        # simply batch_len * current_length.
+        order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+        batch = []
+        for idx in order:
+            if batch and (
+                len(batch) >= self.batch_size
+                or (len(batch) + 1) * lengths[idx] > self.max_tokens_per_batch
+            ):
+                yield batch
+                batch = []
+            batch.append(idx)
+        if batch:
+            yield batch
+
+    def _collate(self, encodings, batch):
+        width = max(len(encodings["input_ids"][i]) for i in batch)
+        pad_id = self.tokenizer.pad_token_id or 0
+        input_ids = np.full((len(batch), width), pad_id, dtype=np.int64)
+        attention_mask = np.zeros((len(batch), width), dtype=np.int64)
+        token_type_ids = None
+        if "token_type_ids" in encodings:
+            token_type_ids = np.zeros((len(batch), width), dtype=np.int64)
+        for row, i in enumerate(batch):
+            ids = encodings["input_ids"][i]
+            input_ids[row, : len(ids)] = ids
+            attention_mask[row, : len(ids)] = 1
+            if token_type_ids is not None:
+                token_type_ids[row, : len(ids)] = encodings["token_type_ids"][i]
+
+        inputs = {
+            "input_ids": torch.from_numpy(input_ids),
+            "attention_mask": torch.from_numpy(attention_mask),
+        }
+        if token_type_ids is not None:
+            inputs["token_type_ids"] = torch.from_numpy(token_type_ids)
+        return inputs
+
+    def predict_proba(self, texts):
+        """Return an (n, num_labels) float32 array of softmax scores in input order."""
+        texts = [str(text) for text in texts]
+        probabilities = np.zeros((len(texts), self.num_labels), dtype=np.float32)
+        if not texts:
+            return probabilities
+
+        encodings = self.tokenizer(
+            texts, truncation=True, max_length=self.max_length, padding=False
+        )
+        lengths = [len(ids) for ids in encodings["input_ids"]]
+
+        n_batches = 0
+        with torch.inference_mode():
+            for batch in self._batches(lengths):
+                start = time.perf_counter()
+                outputs = self.model(**self._collate(encodings, batch))
+                probabilities[batch] = torch.softmax(outputs.logits, dim=1).numpy()
+                metrics.observe_model(self.model_id, time.perf_counter() - start, len(batch))
+                n_batches += 1
+
+        logger.debug("Scored %d texts in %d batches", len(texts), n_batches)
+        return probabilities
@@ -0,0 +1,498 @@
+import logging
+import sys
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+import pandas as pd
+from pymongo import ASCENDING, MongoClient, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from sentiment_dashboard import POSITIVE_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+CLASSES = ("positive", "neutral", "negative")
+META_ID = "rollups"
+REBUILDING = "rebuilding"
+# A rebuild claim not refreshed for this long belongs to a dead process
+REBUILD_STALE_AFTER = timedelta(minutes=10)
+_EPOCH = datetime(1970, 1, 1)
+
+
+def classify(score):
+    if score > POSITIVE_THRESHOLD:
+        return "positive"
+    if score < 0:
+        return "negative"
+    return "neutral"
+
+
+def _sort_date(value):
+    """Return (comparable datetime, dated) for a stored feedback date.
+
+    Only real BSON dates take part in the dashboard's date-range filters;
+    ISO strings written by /analyze-sentiment only count for "All", exactly
+    as a ``{'date': {'$gte': ...}}`` query treats them.
+    """
+    if isinstance(value, datetime):
+        return value, True
+    if not value:
+        return None, False
+    parsed = pd.to_datetime(value, errors="coerce")
+    if pd.isna(parsed):
+        return None, False
+    return parsed.to_pydatetime().replace(tzinfo=None), False
+
+
+def _employee_department(employee):
+    department = employee.get("department", "Unknown")
+    return "Unknown" if department is None else department
+
+
+class SentimentRollups:
+    """Materialized per-(day, department) and per-employee sentiment summaries.
+
+    ``apply`` folds newly inserted feedback into the rollups with ``$inc`` on
+    the day buckets and a conditional pipeline update on the employee
+    documents, so concurrent uploads never lose counts. The dashboard then
+    reads O(days x departments) bucket documents instead of every feedback
+    row. Departments, names and emails are captured when feedback arrives;
+    ``rebuild`` recomputes everything from the raw collections.
+
+    Changes the rollups cannot follow incrementally ``mark_dirty`` the meta
+    document, which sends the dashboard back to the raw pipeline until a
+    rebuild. Given the raw ``feedback_source`` and ``employee_source``
+    collections, that rebuild is started on a background thread.
+    """
+
+    def __init__(
+        self,
+        bucket_collection,
+        employee_collection,
+        meta_collection,
+        feedback_source=None,
+        employee_source=None,
+    ):
+        self.bucket_collection = bucket_collection
+        self.employee_collection = employee_collection
+        self.meta_collection = meta_collection
+        self.feedback_source = feedback_source
+        self.employee_source = employee_source
+        self._rebuild_thread = None
+        self._rebuild_lock = threading.Lock()
+
+    def ensure_indexes(self):
+        self.bucket_collection.create_index([("dated", ASCENDING), ("day", ASCENDING)])
+        self.employee_collection.create_index("department")
+
+    def ready(self):
+        # Read on every call so a flag set by any worker is seen by all
+        return meta_ready(self.meta_collection.find_one({"_id": META_ID}))
+
+    def mark_dirty(self, reason):
+        """Serve the dashboard from raw feedback until the next rebuild."""
+        self.meta_collection.update_one({"_id": META_ID}, {"$set": {"dirty": reason}})
+        logger.warning(f"Sentiment rollups marked dirty: {reason}")
+        self.rebuild_in_background()
+
+    def rebuild_in_background(self):
+        if self.feedback_source is None or self.employee_source is None:
+            return
+        with self._rebuild_lock:
+            if self._rebuild_thread is not None and self._rebuild_thread.is_alive():
+                return
+            self._rebuild_thread = threading.Thread(
+                target=self._rebuild_logged, name="sentiment-rollups", daemon=True
+            )
+            self._rebuild_thread.start()
+
+    def _rebuild_logged(self):
+        try:
+            self.rebuild(self.feedback_source, self.employee_source)
+        except Exception as e:
+            logger.error(f"Error rebuilding sentiment rollups: {e}")
+
+    def apply(self, entries):
+        """Fold (feedback document, employee document) pairs into the rollups.
+
+        Nothing is folded while the rollups are out of use (never rebuilt,
+        dirty or being rebuilt); the next rebuild counts these entries from
+        the raw collection. A rebuild that starts while the fold is in flight
+        may count them as well, which the meta ``epoch`` reveals afterwards.
+        """
+        meta = self.meta_collection.find_one({"_id": META_ID})
+        if meta is None:
+            return
+        if meta.get("dirty") == REBUILDING:
+            # The rebuild's cursor may already be past these entries
+            self.mark_dirty("feedback arrived during a rebuild")
+            return
+        if not meta_ready(meta):
+            self.rebuild_in_background()
+            return
+        self._fold(entries)
+        after = self.meta_collection.find_one({"_id": META_ID}, {"epoch": 1})
+        if after is None or after.get("epoch") != meta.get("epoch"):
+            self.mark_dirty("feedback folded while a rebuild started")
+
+    def _fold(self, entries):
+        buckets = {}
+        employees = {}
+        for feedback, employee in entries:
+            score = feedback.get("sentimentScore")
+            sort_date, dated = _sort_date(feedback.get("date"))
+            if score is None or sort_date is None or "employeeId" not in employee:
+                continue
+            cls = classify(score)
+            department = _employee_department(employee)
+
+            day = sort_date.strftime("%Y-%m-%d")
+            key = f"{day}|{int(dated)}|{department}"
+            bucket = buckets.setdefault(
+                key,
+                {"day": day, "dated": dated, "department": department, "inc": {}, "max": {}},
+            )
+            inc = bucket["inc"]
+            inc["count"] = inc.get("count", 0) + 1
+            inc["sum"] = inc.get("sum", 0) + score
+            inc[f"{cls}Count"] = inc.get(f"{cls}Count", 0) + 1
+            inc[f"{cls}Sum"] = inc.get(f"{cls}Sum", 0) + score
+            # The raw pipeline orders departments by $max of the stored date,
+            # so ISO strings are kept as text and compare as text
+            latest = f"{cls}Latest" if dated else f"{cls}LatestText"
+            raw = feedback["date"] if dated else str(feedback["date"])
+            if latest not in bucket["max"] or raw > bucket["max"][latest]:
+                bucket["max"][latest] = raw
+
+            state = employees.setdefault(
+                employee["employeeId"],
+                {"employee": employee, "count": 0, "sum": 0, "slots": {}},
+            )
+            state["employee"] = employee
+            state["count"] += 1
+            state["sum"] += score
+            candidate = {"score": score, "date": feedback.get("date"), "sortDate": sort_date}
+            slots = ["latest"]
+            if dated:
+                slots.append("latestDated")
+            if cls == "negative":
+                slots.append("latestNegative")
+                if dated:
+                    slots.append("latestNegativeDated")
+            for slot in slots:
+                current = state["slots"].get(slot)
+                if current is None or sort_date > current["sortDate"]:
+                    state["slots"][slot] = candidate
+
+        operations = [
+            UpdateOne(
+                {"_id": key},
+                {
+                    "$inc": bucket["inc"],
+                    "$max": bucket["max"],
+                    "$setOnInsert": {
+                        "day": bucket["day"],
+                        "dated": bucket["dated"],
+                        "department": bucket["department"],
+                    },
+                },
+                upsert=True,
+            )
+            for key, bucket in buckets.items()
+        ]
+        if operations:
+            self.bucket_collection.bulk_write(operations, ordered=False)
+
+        operations = [
+            UpdateOne(
+                {"_id": employee_id},
+                self._employee_update(state),
+                upsert=True,
+            )
+            for employee_id, state in employees.items()
+        ]
+        if operations:
+            self.employee_collection.bulk_write(operations, ordered=False)
+
+    @staticmethod
+    def _employee_update(state):
+        employee = state["employee"]
+        fields = {
+            "employeeId": {"$literal": employee["employeeId"]},
+            "email": {"$literal": employee.get("email", "")},
+            "name": {"$literal": employee.get("name", "N/A")},
+            "department": {"$literal": _employee_department(employee)},
+            "count": {"$add": [{"$ifNull": ["$count", 0]}, state["count"]]},
+            "sum": {"$add": [{"$ifNull": ["$sum", 0]}, state["sum"]]},
+        }
+        # Keep whichever of the stored and incoming feedback is newer
+        for slot, candidate in state["slots"].items():
+            fields[slot] = {
+                "$cond": [
+                    {"$gt": [
+                        {"$literal": candidate["sortDate"]},
+                        {"$ifNull": [f"${slot}.sortDate", _EPOCH]},
+                    ]},
+                    {"$literal": candidate},
+                    f"${slot}",
+                ]
+            }
+        return [{"$set": fields}]
+
+    def remove_employee(self, employee_id):
+        # The raw pipeline drops a deleted employee's feedback; the day
+        # buckets still count it, under whichever department each entry
+        # arrived with, so they are rebuilt
+        if self.employee_collection.delete_one({"_id": employee_id}).deleted_count:
+            self.mark_dirty(f"employee {employee_id} deleted")
+
+    def rebuild(self, sentiment_collection, employees_collection, batch_size=5000, attempts=3):
+        """Recompute every rollup from raw feedback (for backfill or repair).
+
+        The meta document is claimed first, so one rebuild runs at a time
+        across processes; returns None when another process holds the claim.
+        If the rollups are marked dirty while it runs, the recount starts
+        over, up to ``attempts`` times. Otherwise it returns the number of
+        feedback entries counted.
+        """
+        token = self._claim_rebuild()
+        if token is None:
+            logger.info("Sentiment rollups are already being rebuilt")
+            return None
+        try:
+            for _ in range(attempts):
+                # Bumping the epoch tells an apply already in flight that its
+                # entries may be counted twice
+                self.meta_collection.update_one(
+                    {"_id": META_ID, "rebuilding": token},
+                    {
+                        "$set": {"dirty": REBUILDING, "rebuildingSince": datetime.utcnow()},
+                        "$inc": {"epoch": 1},
+                    },
+                )
+                processed = self._recount(
+                    sentiment_collection, employees_collection, batch_size, token
+                )
+                finished = self.meta_collection.update_one(
+                    {"_id": META_ID, "rebuilding": token, "dirty": REBUILDING},
+                    {
+                        "$set": {"rebuiltAt": datetime.utcnow(), "feedbackCount": processed},
+                        "$unset": {"dirty": ""},
+                    },
+                )
+                if finished.modified_count:
+                    logger.info(f"Rebuilt sentiment rollups from {processed} feedback entries")
+                    return processed
+                logger.info("Sentiment rollups changed during the rebuild, recounting")
+            logger.warning(f"Sentiment rollups still dirty after {attempts} rebuild attempts")
+            return None
+        finally:
+            self.meta_collection.update_one(
+                {"_id": META_ID, "rebuilding": token},
+                {"$unset": {"rebuilding": "", "rebuildingSince": ""}},
+            )
+
+    def _claim_rebuild(self):
+        token = uuid.uuid4().hex
+        now = datetime.utcnow()
+        try:
+            # No match on an existing document makes the upsert collide on _id
+            self.meta_collection.update_one(
+                {
+                    "_id": META_ID,
+                    "$or": [
+                        {"rebuilding": {"$exists": False}},
+                        {"rebuildingSince": {"$lt": now - REBUILD_STALE_AFTER}},
+                    ],
+                },
+                {"$set": {"rebuilding": token, "rebuildingSince": now}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return None
+        return token
+
+    def _recount(self, sentiment_collection, employees_collection, batch_size, token):
+        employees = {
+            str(employee["_id"]): employee
+            for employee in employees_collection.find(
+                {"employeeId": {"$exists": True}},
+                {"employeeId": 1, "email": 1, "name": 1, "department": 1},
+            )
+        }
+        self.bucket_collection.delete_many({})
+        self.employee_collection.delete_many({})
+
+        entries = []
+        processed = 0
+        cursor = sentiment_collection.find(
+            {}, {"employee": 1, "sentimentScore": 1, "date": 1}
+        ).batch_size(batch_size)
+        for feedback in cursor:
+            employee = employees.get(str(feedback.get("employee")))
+            if employee is None:
+                continue
+            entries.append((feedback, employee))
+            if len(entries) >= batch_size:
+                self._fold(entries)
+                processed += len(entries)
+                entries = []
+                # Keeps the claim from looking abandoned
+                self.meta_collection.update_one(
+                    {"_id": META_ID, "rebuilding": token},
+                    {"$set": {"rebuildingSince": datetime.utcnow()}},
+                )
+        if entries:
+            self._fold(entries)
+            processed += len(entries)
+        return processed
+
+    def summary(self, type_param, start_date, department):
+        """Dashboard summary (see sentiment_dashboard.sentiment_response) from the rollups."""
+        buckets = self.bucket_collection.find(bucket_query(start_date, department))
+        summary = fold_buckets(buckets, type_param)
+        summary["employees"] = self._negative_employees(type_param, start_date, department)
+        return summary
+
+    def _negative_employees(self, type_param, start_date, department):
+        plan = negative_employees_query(type_param, start_date, department)
+        if plan is None:
+            return []
+        query, slot = plan
+        return [
+            negative_employee(doc, slot)
+            for doc in self.employee_collection.find(query).sort(f"{slot}.score", ASCENDING)
+        ]
+
+
+# Query building and folding are shared with the async API, which issues the
+# same reads through its own driver
+
+
+def meta_ready(meta):
+    # Rollups are trusted once a rebuild has backfilled history, until marked dirty
+    return meta is not None and not meta.get("dirty")
+
+
+def bucket_query(start_date, department):
+    query = {}
+    if start_date is not None:
+        query["dated"] = True
+        query["day"] = {"$gte": start_date.strftime("%Y-%m-%d")}
+    if department != "All Departments":
+        query["department"] = department
+    return query
+
+
+def bucket_latest(bucket, classes):
+    """Sort key of the newest stored date among ``classes`` in a bucket.
+
+    Mirrors MongoDB's ordering of the raw ``date`` field: any BSON date
+    sorts after any ISO string, and strings compare as text.
+    """
+    dated = [bucket[f"{cls}Latest"] for cls in classes if bucket.get(f"{cls}Latest")]
+    if dated:
+        return 1, max(dated)
+    text = [bucket[f"{cls}LatestText"] for cls in classes if bucket.get(f"{cls}LatestText")]
+    return 0, max(text, default="")
+
+
+def fold_buckets(buckets, type_param):
+    """Summary totals, months and departments from day buckets (no employees yet)."""
+    classes = [type_param] if type_param in CLASSES else list(CLASSES)
+
+    total = positive = negative = 0
+    score_sum = 0.0
+    months = {}
+    departments = {}
+    for bucket in buckets:
+        count = sum(bucket.get(f"{cls}Count", 0) for cls in classes)
+        if count == 0:
+            continue
+        bucket_sum = sum(bucket.get(f"{cls}Sum", 0) for cls in classes)
+        total += count
+        score_sum += bucket_sum
+        if "positive" in classes:
+            positive += bucket.get("positiveCount", 0)
+        if "negative" in classes:
+            negative += bucket.get("negativeCount", 0)
+
+        month = months.setdefault(bucket["day"][:7], {"sum": 0, "count": 0})
+        month["sum"] += bucket_sum
+        month["count"] += count
+        dept = departments.setdefault(
+            bucket["department"], {"sum": 0, "count": 0, "latest": None}
+        )
+        dept["sum"] += bucket_sum
+        dept["count"] += count
+        latest = bucket_latest(bucket, classes)
+        if dept["latest"] is None or latest > dept["latest"]:
+            dept["latest"] = latest
+
+    return {
+        "total": total,
+        "positive": positive,
+        "negative": negative,
+        "scoreSum": score_sum,
+        "months": [
+            {"month": month, "sum": m["sum"], "count": m["count"]}
+            for month, m in months.items()
+        ],
+        "departments": [
+            {"department": name, "sum": d["sum"], "count": d["count"]}
+            for name, d in sorted(
+                departments.items(), key=lambda item: item[1]["latest"], reverse=True
+            )
+        ],
+    }
+
+
+def negative_employees_query(type_param, start_date, department):
+    """(query, slot) for the latest feedback per employee when negative, or None."""
+    if type_param in ("positive", "neutral"):
+        return None
+    slot = "latestNegative" if type_param == "negative" else "latest"
+    if start_date is not None:
+        slot += "Dated"
+
+    query = {f"{slot}.score": {"$lt": 0}}
+    if start_date is not None:
+        query[f"{slot}.sortDate"] = {"$gte": start_date}
+    if department != "All Departments":
+        query["department"] = department
+    return query, slot
+
+
+def negative_employee(doc, slot):
+    return {
+        "employeeId": doc["employeeId"],
+        "email": doc.get("email", ""),
+        "name": doc.get("name", "N/A"),
+        "department": doc.get("department", "Unknown"),
+        "sentimentScore": doc[slot]["score"],
+        "date": doc[slot].get("date", ""),
+    }
+
+
+def rollups_for(db):
+    return SentimentRollups(
+        db["sentimentrollups"],
+        db["sentimentemployeerollups"],
+        db["sentimentrollupmeta"],
+        feedback_source=db["sentimentfeedbacks"],
+        employee_source=db["employees"],
+    )
+
+
+if __name__ == "__main__":
+    # python sentiment_rollups.py rebuild [mongodb-uri]
+    if len(sys.argv) < 2 or sys.argv[1] != "rebuild":
+        print("usage: python sentiment_rollups.py rebuild [mongodb-uri]")
+        sys.exit(1)
+    logging.basicConfig(level=logging.INFO)
+    uri = sys.argv[2] if len(sys.argv) > 2 else "mongodb://localhost:27017/"
+    db = MongoClient(uri)["prescient"]
+    rollups = rollups_for(db)
+    rollups.ensure_indexes()
+    rollups.rebuild(db["sentimentfeedbacks"], db["employees"])
@@ -0,0 +1,42 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# The API modules are imported as top-level modules and load their artifacts
+# through paths relative to models/api, as when app.py is run from there
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_DIR)
+os.chdir(API_DIR)
+
+# Nothing is loaded at import; tests load only the models they use
+os.environ.setdefault("BOOT_MODELS", "")
+
+
+@pytest.fixture
+def mongo_db(monkeypatch):
+    """An in-memory mongomock database with bulk writes applied one by one.
+
+    mongomock's own bulk_write does not accept the operations of recent
+    pymongo releases.
+    """
+    mongomock = pytest.importorskip("mongomock")
+    from pymongo import UpdateOne
+
+    def bulk_write(collection, operations, ordered=True, **kwargs):
+        matched = modified = upserted = 0
+        for operation in operations:
+            assert isinstance(operation, UpdateOne), operation
+            result = collection.update_one(
+                operation._filter, operation._doc, upsert=operation._upsert
+            )
+            matched += result.matched_count
+            modified += result.modified_count
+            upserted += result.upserted_id is not None
+        return SimpleNamespace(
+            matched_count=matched, modified_count=modified, upserted_count=upserted
+        )
+
+    monkeypatch.setattr(mongomock.collection.Collection, "bulk_write", bulk_write)
+    return mongomock.MongoClient()["prescient"]
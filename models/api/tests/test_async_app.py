@@ -0,0 +1,150 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("quart")
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+import app as api  # noqa: E402
+from async_app import create_app, stand_in_database  # noqa: E402
+from inference_pool import InferencePool  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def empty_response_cache():
+    # The async routes share the Flask app's response cache
+    api.response_cache.clear()
+    yield
+    api.response_cache.clear()
+
+
+@pytest.fixture
+def invalidated(monkeypatch):
+    tags = []
+    monkeypatch.setattr(api.response_cache, "invalidate", lambda *t: tags.extend(t))
+    return tags
+
+
+def run(scenario):
+    """Run ``scenario(client, db)`` against a fresh in-memory database."""
+
+    async def main():
+        db = mongomock_motor.AsyncMongoMockClient()["prescient"]
+        inference = InferencePool(max_workers=1, max_pending=4)
+        try:
+            return await scenario(create_app(db, inference).test_client(), db)
+        finally:
+            inference.shutdown()
+
+    return asyncio.run(main())
+
+
+def test_predict_upserts_and_invalidates_cached_reads(monkeypatch, invalidated):
+    monkeypatch.setattr(api, "predict_one", lambda data: (1, 42.5))
+
+    async def scenario(client, db):
+        response = await client.post("/predict", json={"employeeId": 7, "age": 30})
+        stored = await db["employees"].find_one({"employeeId": 7})
+        return response.status_code, await response.get_json(), stored
+
+    status, body, stored = run(scenario)
+    assert status == 200
+    assert body["attritionRisk"] == 42.5
+    assert stored["attritionRisk"] == 42.5
+    assert stored["riskModelVersion"] == api.RF_MODEL_VERSION
+    assert "employees" in invalidated
+
+
+def test_predict_rejects_invalid_employee_id(invalidated):
+    async def scenario(client, db):
+        response = await client.post("/predict", json={"employeeId": "seven"})
+        return response.status_code, await db["employees"].count_documents({})
+
+    status, count = run(scenario)
+    assert status == 400
+    assert count == 0
+
+
+def test_delete_employee_removes_rollup_and_invalidates(monkeypatch, invalidated):
+    rebuilds = []
+    monkeypatch.setattr(
+        api.sentiment_rollups, "rebuild_in_background", lambda: rebuilds.append(1)
+    )
+
+    async def scenario(client, db):
+        await db["employees"].insert_one({"employeeId": 3, "department": "Sales"})
+        await db["sentimentemployeerollups"].insert_one({"_id": 3})
+        await db["sentimentrollupmeta"].insert_one({"_id": "rollups"})
+        deleted = await client.delete("/api/employees/3")
+        missing = await client.delete("/api/employees/3")
+        return (
+            deleted.status_code,
+            missing.status_code,
+            await db["employees"].count_documents({}),
+            await db["sentimentemployeerollups"].count_documents({}),
+            await db["sentimentrollupmeta"].find_one({"_id": "rollups"}),
+        )
+
+    deleted, missing, employees, rollups, meta = run(scenario)
+    assert (deleted, missing) == (200, 404)
+    assert (employees, rollups) == (0, 0)
+    assert meta["dirty"] == "employee 3 deleted"
+    assert rebuilds == [1]
+    assert "employees" in invalidated
+
+
+def test_employee_page_without_scoring():
+    async def scenario(client, db):
+        await db["employees"].insert_many(
+            [{"employeeId": i, "department": "Sales" if i % 2 else "HR"} for i in range(1, 6)]
+        )
+        response = await client.get(
+            "/api/employees?limit=2&department=Sales&fields=employeeId,department"
+        )
+        return await response.get_json()
+
+    body = run(scenario)
+    assert body["employees"] == [
+        {"employeeId": 1, "department": "Sales"},
+        {"employeeId": 3, "department": "Sales"},
+    ]
+    assert body["nextCursor"] == 3
+
+
+def test_feedback_not_found():
+    async def scenario(client, db):
+        response = await client.get("/feedback/99")
+        return response.status_code
+
+    assert run(scenario) == 404
+
+
+def test_cached_reads_follow_async_writes():
+    async def scenario(client, db):
+        await db["employees"].insert_one({"employeeId": 1, "department": "Sales"})
+        first = await client.get("/api/employees?fields=employeeId")
+        await db["employees"].insert_one({"employeeId": 2, "department": "HR"})
+        # Written behind the API's back: the cached page is still served
+        cached = await client.get("/api/employees?fields=employeeId")
+        await client.delete("/api/employees/2")
+        await db["employees"].insert_one({"employeeId": 3, "department": "HR"})
+        fresh = await client.get("/api/employees?fields=employeeId")
+        return [await r.get_json() for r in (first, cached, fresh)], cached.headers["ETag"]
+
+    (first, cached, fresh), etag = run(scenario)
+    assert first == cached == [{"employeeId": 1}]
+    assert fresh == [{"employeeId": 1}, {"employeeId": 3}]
+    assert etag
+
+
+def test_stand_in_is_shared_with_the_flask_routes(monkeypatch):
+    # stand_in_database switches the Flask app's client; restored afterwards
+    monkeypatch.setattr(api.mongo, "_client", api.mongo._client)
+    monkeypatch.setattr(api.mongo, "_generation", api.mongo._generation)
+
+    async def main():
+        db = stand_in_database()
+        await db["employees"].insert_one({"employeeId": 5, "department": "Sales"})
+        return api.employees_collection.find_one({"employeeId": 5}, {"_id": 0})
+
+    assert asyncio.run(main()) == {"employeeId": 5, "department": "Sales"}
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+joblib = pytest.importorskip("joblib")
+
+from feature_encoding import (  # noqa: E402
+    ENCODED_COLUMNS,
+    FEATURE_COLUMNS,
+    FEATURE_RENAME_MAP,
+    FeatureEncoder,
+    encoder_paths,
+    reference_preprocess,
+)
+
+CAMEL = {target: source for source, target in FEATURE_RENAME_MAP.items()}
+UNSEEN = ["__unknown__", "", "sales", 3]
+
+
+@pytest.fixture(scope="module")
+def encoders():
+    return {col: joblib.load(path) for col, path in encoder_paths("../Encoders/").items()}
+
+
+@pytest.fixture(scope="module")
+def feature_encoder(encoders):
+    return FeatureEncoder(encoders, FEATURE_COLUMNS)
+
+
+def random_frame(encoders, n, seed, camel_share=0.5, missing_rate=0.0):
+    """Known and unseen categories, None cells and a random mix of key spellings."""
+    rng = np.random.default_rng(seed)
+    data = {}
+    for col in FEATURE_COLUMNS:
+        if col in encoders:
+            choices = list(encoders[col].classes_) + UNSEEN + [None]
+            values = [choices[i] for i in rng.integers(len(choices), size=n)]
+        else:
+            values = rng.integers(0, 20000, size=n).astype(object)
+            values[rng.random(n) < 0.3] = rng.random() * 100
+            if missing_rate:
+                values[rng.random(n) < missing_rate] = None
+        key = CAMEL[col] if rng.random() < camel_share else col
+        data[key] = list(values)
+    return pd.DataFrame(data)
+
+
+def reference_matrix(df, encoders):
+    return np.ascontiguousarray(
+        reference_preprocess(df, encoders, FEATURE_COLUMNS), dtype=np.float64
+    )
+
+
+def bit_identical(expected, actual):
+    return expected.shape == actual.shape and np.array_equal(
+        expected.view(np.uint64), actual.view(np.uint64)
+    )
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("n", [1, 17, 500])
+def test_transform_matches_reference(encoders, feature_encoder, seed, n):
+    df = random_frame(encoders, n, seed)
+    assert bit_identical(reference_matrix(df, encoders), feature_encoder.transform(df))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_transform_records_matches_reference(encoders, feature_encoder, seed):
+    df = random_frame(encoders, 200, seed)
+    records = df.to_dict("records")
+    assert bit_identical(
+        reference_matrix(pd.DataFrame(records), encoders),
+        feature_encoder.transform_records(records),
+    )
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_missing_numeric_values_match_reference(encoders, feature_encoder, seed):
+    df = random_frame(encoders, 200, seed, missing_rate=0.1)
+    expected = reference_matrix(df, encoders)
+    assert np.isnan(expected).any()
+    assert np.array_equal(expected, feature_encoder.transform(df), equal_nan=True)
+    assert np.array_equal(
+        expected,
+        feature_encoder.transform_records(df.to_dict("records")),
+        equal_nan=True,
+    )
+
+
+def test_unseen_and_none_categories_encode_as_first_class(encoders, feature_encoder):
+    df = random_frame(encoders, 50, seed=0, camel_share=0.0)
+    for col in ENCODED_COLUMNS:
+        df[col] = UNSEEN[:2] + [None] * 48
+    matrix = feature_encoder.transform(df)
+    for col in ENCODED_COLUMNS:
+        assert (matrix[:, FEATURE_COLUMNS.index(col)] == 0).all()
+
+
+def test_missing_column_raises_like_reference(encoders, feature_encoder):
+    df = random_frame(encoders, 5, seed=1, camel_share=0.0).drop(columns=["MonthlyIncome"])
+    with pytest.raises(ValueError, match="Missing columns"):
+        reference_preprocess(df, encoders, FEATURE_COLUMNS)
+    with pytest.raises(ValueError, match="Missing columns"):
+        feature_encoder.transform(df)
+    record = df.to_dict("records")[0]
+    with pytest.raises(ValueError, match="Missing columns"):
+        feature_encoder.check_record(record)
+
+
+def test_sample_frame_self_check(feature_encoder):
+    assert feature_encoder.verify(feature_encoder.sample_frame())
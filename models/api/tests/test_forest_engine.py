@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+ensemble = pytest.importorskip("sklearn.ensemble")
+
+from forest_engine import CompiledForest  # noqa: E402
+from risk_scoring import top_drivers  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def forest():
+    rng = np.random.default_rng(5)
+    X = rng.integers(0, 10, size=(400, 6)).astype(np.float64)
+    y = (X[:, 0] + 2 * X[:, 3] + rng.normal(0, 3, size=400) > 14).astype(int)
+    model = ensemble.RandomForestClassifier(n_estimators=15, max_depth=6, random_state=0)
+    return CompiledForest(model.fit(X, y)), X
+
+
+def test_matches_sklearn(forest):
+    compiled, X = forest
+    np.testing.assert_array_equal(compiled.predict_proba(X[:100]), compiled.model.predict_proba(X[:100]))
+
+
+@pytest.mark.parametrize("chunk_rows", [7, 1024])
+def test_contributions_sum_to_the_prediction(forest, chunk_rows):
+    compiled, X = forest
+    bias, contributions = compiled.contributions(X, chunk_rows=chunk_rows)
+    assert contributions.shape == X.shape
+    np.testing.assert_allclose(
+        bias + contributions.sum(axis=1), compiled.model.predict_proba(X)[:, 1], atol=1e-9
+    )
+
+
+def test_contributions_reject_missing_features(forest):
+    compiled, X = forest
+    with pytest.raises(ValueError, match="missing"):
+        compiled.contributions(np.where(X[:2] == 0, np.nan, X[:2]))
+
+
+def test_top_drivers_are_ordered_by_magnitude():
+    contributions = np.array([[0.01, -0.2, 0.05, 0.1], [0.0, 0.0, -0.003, 0.3]])
+    drivers = top_drivers(contributions, ["a", "b", "c", "d"], 3)
+    assert drivers[0] == [
+        {"feature": "b", "contribution": -20.0},
+        {"feature": "d", "contribution": 10.0},
+        {"feature": "c", "contribution": 5.0},
+    ]
+    assert [d["feature"] for d in drivers[1]][:2] == ["d", "c"]
+    assert len(top_drivers(contributions, ["a", "b", "c", "d"], 10)[0]) == 4
@@ -0,0 +1,141 @@
+import subprocess
+import sys
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from jobs import FAILED, RUNNING, SUCCEEDED, JobManager
+
+
+@pytest.fixture
+def stored(mongo_db):
+    manager = JobManager(
+        mongo_db["jobs"],
+        max_workers=1,
+        results_collection=mongo_db["jobresults"],
+        result_chunk_size=3,
+    )
+    yield manager, mongo_db
+    manager.shutdown()
+
+
+def run_to_end(manager, fn, total=1):
+    job_id = manager.submit("test", fn, total=total)
+    manager.shutdown(wait=True)
+    return job_id, manager.get(job_id)
+
+
+def test_progress_and_result_in_memory():
+    manager = JobManager(max_workers=1)
+
+    def work(progress):
+        progress(1)
+        progress(2, error={"rows": [1, 1], "message": "bad row"})
+        return {"rows": 2}
+
+    _, job = run_to_end(manager, work, total=2)
+    assert job["status"] == SUCCEEDED
+    assert job["done"] == 2
+    assert job["errors"] == [{"rows": [1, 1], "message": "bad row"}]
+    assert job["result"] == {"rows": 2}
+
+
+def test_failing_job_reports_its_error():
+    manager = JobManager(max_workers=1)
+
+    def work(progress):
+        raise ValueError("no rows")
+
+    _, job = run_to_end(manager, work)
+    assert job["status"] == FAILED
+    assert job["message"] == "no rows"
+
+
+def test_list_results_are_chunked_and_reassembled(stored):
+    manager, db = stored
+    items = [{"row": i} for i in range(10)]
+    job_id, job = run_to_end(manager, lambda progress: {"items": items, "count": 10, "empty": []})
+
+    assert job["status"] == SUCCEEDED
+    assert job["result"] == {"items": items, "count": 10, "empty": []}
+    stored_job = db["jobs"].find_one({"_id": job_id})
+    assert stored_job["resultChunks"] == {"items": 4, "empty": 0}
+    assert stored_job["result"] == {"count": 10}
+    chunks = list(db["jobresults"].find({"jobId": job_id}).sort("seq", 1))
+    assert [len(chunk["items"]) for chunk in chunks] == [3, 3, 3, 1]
+
+
+def test_stored_jobs_record_their_owner(stored):
+    manager, db = stored
+    job_id, _ = run_to_end(manager, lambda progress: None)
+    assert db["jobs"].find_one({"_id": job_id})["owner"] == JobManager.owner()
+
+
+def exited_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_fail_orphans_marks_dead_and_silent_jobs(stored):
+    manager, db = stored
+    now = datetime.utcnow()
+    host = JobManager.owner()["host"]
+    db["jobs"].insert_many(
+        [
+            {
+                "_id": "dead-owner",
+                "status": RUNNING,
+                "owner": {"host": host, "pid": exited_pid()},
+                "heartbeatAt": now,
+            },
+            {
+                "_id": "silent",
+                "status": RUNNING,
+                "owner": {"host": "elsewhere", "pid": 1},
+                "heartbeatAt": now - timedelta(hours=1),
+            },
+            {
+                "_id": "alive",
+                "status": RUNNING,
+                "owner": {"host": "elsewhere", "pid": 1},
+                "heartbeatAt": now,
+            },
+            {
+                "_id": "finished",
+                "status": SUCCEEDED,
+                "owner": {"host": host, "pid": exited_pid()},
+                "heartbeatAt": now - timedelta(hours=1),
+            },
+        ]
+    )
+
+    assert manager.fail_orphans() == 2
+    status = {job["_id"]: job["status"] for job in db["jobs"].find()}
+    assert status == {
+        "dead-owner": FAILED,
+        "silent": FAILED,
+        "alive": RUNNING,
+        "finished": SUCCEEDED,
+    }
+    assert "exited" in db["jobs"].find_one({"_id": "dead-owner"})["message"]
+    assert manager.fail_orphans() == 0
+
+
+def test_heartbeat_keeps_a_running_job_fresh(mongo_db):
+    manager = JobManager(mongo_db["jobs"], max_workers=1, heartbeat_seconds=0.02)
+    release = threading.Event()
+    job_id = manager.submit("test", lambda progress: release.wait(5), total=1)
+    submitted = mongo_db["jobs"].find_one({"_id": job_id})["heartbeatAt"]
+    try:
+        for _ in range(200):
+            job = mongo_db["jobs"].find_one({"_id": job_id})
+            if job["heartbeatAt"] > submitted:
+                break
+            threading.Event().wait(0.01)
+        assert job["heartbeatAt"] > submitted
+    finally:
+        release.set()
+        manager.shutdown()
+    assert manager.get(job_id)["status"] == SUCCEEDED
@@ -0,0 +1,85 @@
+import pstats
+import threading
+
+import pytest
+
+from micro_batcher import MicroBatcher
+
+
+def submit_concurrently(batcher, items):
+    """Submit every item from its own thread; returns results or exceptions in order."""
+    outcomes = [None] * len(items)
+    start = threading.Barrier(len(items))
+
+    def call(index, item):
+        start.wait()
+        try:
+            outcomes[index] = batcher.submit(item)
+        except Exception as e:
+            outcomes[index] = e
+
+    threads = [threading.Thread(target=call, args=pair) for pair in enumerate(items)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    return outcomes
+
+
+def test_concurrent_calls_share_a_batch():
+    batches = []
+
+    def score(items):
+        batches.append(len(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(score, max_batch_size=8, max_wait_ms=200)
+    assert submit_concurrently(batcher, list(range(8))) == [i * 2 for i in range(8)]
+    assert sum(batches) == 8
+    assert max(batches) > 1
+    assert batcher.stats()["items"] == 8
+
+
+def test_a_bad_item_fails_only_its_own_caller():
+    def score(items):
+        if "bad" in items:
+            raise ValueError("cannot score bad")
+        return [len(item) for item in items]
+
+    batcher = MicroBatcher(score, max_batch_size=4, max_wait_ms=200)
+    outcomes = submit_concurrently(batcher, ["a", "bb", "bad", "dddd"])
+    assert outcomes[0] == 1
+    assert outcomes[1] == 2
+    assert isinstance(outcomes[2], ValueError)
+    assert outcomes[3] == 4
+
+
+def test_a_single_failing_item_raises_its_error():
+    def score(items):
+        raise KeyError("missing feature")
+
+    batcher = MicroBatcher(score, max_wait_ms=1)
+    with pytest.raises(KeyError, match="missing feature"):
+        batcher.submit({"age": 30})
+    assert batcher.stats()["fallbacks"] == 0
+
+
+def test_wrong_result_count_falls_back_to_single_items():
+    def score(items):
+        return [sum(items)] if len(items) > 1 else list(items)
+
+    batcher = MicroBatcher(score, max_batch_size=3, max_wait_ms=200)
+    assert submit_concurrently(batcher, [1, 2, 3]) == [1, 2, 3]
+
+
+def test_trace_receives_timings_and_batch_profile():
+    def add_one(items):
+        return [item + 1 for item in items]
+
+    batcher = MicroBatcher(add_one, max_wait_ms=1)
+    trace = {"profile": True}
+    assert batcher.submit(41, trace=trace) == 42
+    assert trace["batchSize"] == 1
+    assert trace["batchSeconds"] >= 0 and trace["queueWaitSeconds"] >= 0
+    functions = {name for _, _, name in pstats.Stats(trace["profiler"]).stats}
+    assert "add_one" in functions
@@ -0,0 +1,52 @@
+import json
+import os
+import pstats
+import threading
+
+from micro_batcher import MicroBatcher
+from profiling import RequestProfiler, offthread_trace, record_offthread
+
+
+def test_browsing_follows_the_capture_configuration(tmp_path):
+    assert not RequestProfiler(tmp_path).can_browse(None)
+    sampled = RequestProfiler(tmp_path, sample_rate=0.1)
+    assert sampled.can_browse(None)
+    guarded = RequestProfiler(tmp_path, token="s3cret", sample_rate=0.1)
+    assert not guarded.can_browse(None)
+    assert not guarded.can_browse("wrong")
+    assert guarded.can_browse("s3cret")
+
+
+def test_no_trace_outside_a_capture():
+    assert offthread_trace() is None
+
+
+def test_batcher_work_lands_in_the_request_profile(tmp_path):
+    def score_on_batcher_thread(items):
+        return [item * 2 for item in items]
+
+    profiler = RequestProfiler(tmp_path, sample_rate=1.0)
+    batcher = MicroBatcher(score_on_batcher_thread, max_wait_ms=1)
+
+    def request():
+        capture = profiler.start("/predict", "POST", "sampled")
+        trace = offthread_trace()
+        assert batcher.submit(21, trace=trace) == 42
+        record_offthread("microBatcher", trace)
+        profiler.finish(capture, 200)
+
+    # Captures are per thread, as in a request handler
+    thread = threading.Thread(target=request)
+    thread.start()
+    thread.join(10)
+
+    [summary] = profiler.list_captures()
+    [batch] = summary["offThread"]["microBatcher"]
+    assert batch["batchSize"] == 1
+    assert batch["batchSeconds"] >= 0
+    path = profiler.capture_path(summary["id"], ".pstats")
+    assert os.path.exists(path)
+    functions = {name for _, _, name in pstats.Stats(path).stats}
+    assert "score_on_batcher_thread" in functions
+    with open(profiler.capture_path(summary["id"], ".json")) as f:
+        assert "offThreadProfilers" not in json.load(f)
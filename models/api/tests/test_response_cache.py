@@ -0,0 +1,97 @@
+import multiprocessing
+
+import pytest
+from flask import Flask, jsonify
+
+from response_cache import ResponseCache
+
+
+@pytest.fixture
+def served():
+    """A Flask app with one cached read, counting how often the view runs."""
+    cache = ResponseCache(max_entries=8, ttl_seconds=60)
+    app = Flask(__name__)
+    calls = []
+
+    @app.route("/items")
+    @cache.cached("items")
+    def items():
+        calls.append(1)
+        return jsonify({"version": len(calls)})
+
+    @app.route("/items/<int:item_id>")
+    @cache.cached("items", tags_for=lambda item_id: [f"item:{item_id}"])
+    def item(item_id):
+        calls.append(1)
+        return jsonify({"item": item_id, "version": len(calls)})
+
+    return cache, app.test_client(), calls
+
+
+def test_repeated_reads_are_served_from_cache(served):
+    cache, client, calls = served
+    first = client.get("/items")
+    second = client.get("/items")
+    assert first.get_json() == second.get_json() == {"version": 1}
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_invalidate_makes_entries_stale(served):
+    cache, client, calls = served
+    etag = client.get("/items").headers["ETag"]
+    cache.invalidate("items")
+    response = client.get("/items", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.get_json() == {"version": 2}
+    assert len(calls) == 2
+
+
+def test_unchanged_data_answers_304(served):
+    _, client, _ = served
+    etag = client.get("/items").headers["ETag"]
+    assert client.get("/items", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_per_request_tags_invalidate_only_their_entries(served):
+    cache, client, calls = served
+    client.get("/items/1")
+    client.get("/items/2")
+    cache.invalidate("item:1")
+    assert client.get("/items/1").get_json()["version"] == 3
+    assert client.get("/items/2").get_json()["version"] == 2
+
+
+def _invalidate_in_child(cache):
+    cache.invalidate("items")
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="needs fork"
+)
+def test_invalidation_in_a_forked_worker_reaches_the_parent(served):
+    cache, client, calls = served
+    client.get("/items")
+    worker = multiprocessing.get_context("fork").Process(
+        target=_invalidate_in_child, args=(cache,)
+    )
+    worker.start()
+    worker.join(10)
+    assert worker.exitcode == 0
+    assert client.get("/items").get_json() == {"version": 2}
+
+
+def test_write_during_render_is_not_cached(served):
+    cache, client, calls = served
+    app = client.application
+
+    @app.route("/racy")
+    @cache.cached("items")
+    def racy():
+        calls.append(1)
+        cache.invalidate("items")
+        return jsonify({"version": len(calls)})
+
+    client.get("/racy")
+    client.get("/racy")
+    assert len(calls) == 2
@@ -0,0 +1,93 @@
+import itertools
+
+import numpy as np
+import pytest
+
+joblib = pytest.importorskip("joblib")
+
+from feature_encoding import (  # noqa: E402
+    FEATURE_COLUMNS,
+    FEATURE_RENAME_MAP,
+    FeatureEncoder,
+    encoder_paths,
+)
+from scenarios import ScenarioBuilder, parse_values  # noqa: E402
+
+CATEGORIES = {
+    "BusinessTravel": "Travel_Rarely",
+    "Department": "Sales",
+    "EducationField": "Marketing",
+    "Gender": "Female",
+    "JobRole": "Sales Executive",
+    "MaritalStatus": "Married",
+    "OverTime": "No",
+}
+CAMEL = {target: source for source, target in FEATURE_RENAME_MAP.items()}
+# An employee record as stored, with camelCase keys
+BASE = {CAMEL.get(col, col): CATEGORIES.get(col, 3) for col in FEATURE_COLUMNS}
+BASE |= {"age": 35, "monthlyIncome": 5000}
+
+
+@pytest.fixture(scope="module")
+def feature_encoder():
+    encoders = {col: joblib.load(path) for col, path in encoder_paths("../Encoders/").items()}
+    return FeatureEncoder(encoders, FEATURE_COLUMNS)
+
+
+@pytest.fixture
+def builder(feature_encoder):
+    return ScenarioBuilder(feature_encoder, max_variants=100)
+
+
+def test_ranges_include_their_stop():
+    assert parse_values({"start": 1, "stop": 2, "step": 0.25}) == [1.0, 1.25, 1.5, 1.75, 2.0]
+    assert parse_values({"start": 0, "stop": 0.3, "step": 0.1}) == pytest.approx([0, 0.1, 0.2, 0.3])
+
+
+def test_grid_rows_follow_itertools_product(builder, feature_encoder):
+    grid = {
+        "overTime": ["No", "Yes"],
+        "monthlyIncome": {"start": 3000, "stop": 5000, "step": 1000},
+        "age": [30, 40],
+    }
+    matrix, layout = builder.build(BASE, grid=grid)
+    base_row = feature_encoder.transform_records([BASE])[0]
+    names, values, rows = layout["grid"]
+    assert matrix.shape == (1 + 2 * 3 * 2, len(FEATURE_COLUMNS))
+    np.testing.assert_array_equal(matrix[0], base_row)
+
+    for offset, combo in enumerate(itertools.product(*values)):
+        expected = feature_encoder.transform_records([BASE | dict(zip(names, combo))])[0]
+        np.testing.assert_array_equal(matrix[rows][offset], expected)
+
+    table = ScenarioBuilder.sensitivity_table(layout, np.linspace(0, 1, len(matrix)))
+    assert table["variants"] == 12
+    assert table["grid"]["rows"][:3] == [["No", 3000.0, 30], ["No", 3000.0, 40], ["No", 4000.0, 30]]
+    assert len(table["grid"]["risk"]) == len(table["grid"]["rows"])
+
+
+def test_sweeps_vary_one_feature_each(builder, feature_encoder):
+    matrix, layout = builder.build(BASE, sweeps={"age": [25, 45], "department": ["Human Resources"]})
+    base_row = feature_encoder.transform_records([BASE])[0]
+    assert matrix.shape[0] == 1 + 2 + 1
+    for name, values, rows in layout["sweeps"]:
+        for value, row in zip(values, matrix[rows]):
+            expected = feature_encoder.transform_records([BASE | {name: value}])[0]
+            np.testing.assert_array_equal(row, expected)
+    assert layout["grid"] is None
+
+
+def test_oversized_requests_are_rejected_before_expansion(builder):
+    with pytest.raises(ValueError, match="limit is 100"):
+        builder.build(BASE, grid={"age": {"start": 0, "stop": 1e12, "step": 1}})
+    with pytest.raises(ValueError, match="limit is 100"):
+        builder.build(BASE, grid={"age": list(range(10)), "monthlyIncome": list(range(10))})
+
+
+def test_unknown_features_and_classes_are_rejected(builder):
+    with pytest.raises(ValueError, match="Unknown feature"):
+        builder.build(BASE, sweeps={"shoeSize": [40]})
+    with pytest.raises(ValueError, match="Unknown department values"):
+        builder.build(BASE, grid={"department": ["Sales", "Marketing"]})
+    with pytest.raises(ValueError, match="numeric"):
+        builder.build(BASE, sweeps={"age": ["old"]})
@@ -0,0 +1,213 @@
+import itertools
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from feedback_ingest import FeedbackIngestor
+from sentiment_dashboard import POSITIVE_THRESHOLD, sentiment_filters, sentiment_response
+from sentiment_rollups import SentimentRollups
+
+# Midnight, so the whole-day date ranges of the rollups and the exact ones of
+# the raw pipeline select the same feedback
+NOW = datetime(2024, 6, 30)
+DEPARTMENTS = ["Sales", "Research & Development", "Human Resources", None]
+TYPES = ["all", "positive", "negative", "neutral"]
+DATE_RANGES = ["All", "Last 7 Days", "Last 30 Days", "Last 6 Months", "Last Year"]
+
+
+def raw_summary(db, type_param, start_date, department):
+    """What sentiment_dashboard.sentiment_pipeline computes, in Python."""
+    employees = {employee["_id"]: employee for employee in db["employees"].find()}
+    rows = []
+    for feedback in db["sentimentfeedbacks"].find():
+        date = feedback.get("date")
+        if start_date is not None and not (isinstance(date, datetime) and date >= start_date):
+            continue
+        # The $lookup converts string references to ObjectId
+        employee = employees.get(feedback["employee"]) or next(
+            (e for key, e in employees.items() if str(key) == feedback["employee"]), None
+        )
+        if employee is None or "employeeId" not in employee:
+            continue
+        row = {
+            "employeeId": employee["employeeId"],
+            "email": employee.get("email", ""),
+            "name": employee.get("name", "N/A"),
+            "department": employee.get("department") or "Unknown",
+            "sentimentScore": feedback["sentimentScore"],
+            "date": date,
+            "parsedDate": date if isinstance(date, datetime) else datetime.fromisoformat(date),
+        }
+        rows.append(row)
+
+    if department != "All Departments":
+        rows = [row for row in rows if row["department"] == department]
+    score = {
+        "positive": lambda s: s > POSITIVE_THRESHOLD,
+        "negative": lambda s: s < 0,
+        "neutral": lambda s: 0 <= s <= POSITIVE_THRESHOLD,
+    }.get(type_param, lambda s: True)
+    rows = [row for row in rows if score(row["sentimentScore"])]
+
+    def bson_date(value):
+        # BSON orders every date after every string
+        return (1, value) if isinstance(value, datetime) else (0, value)
+
+    months, departments, latest = {}, {}, {}
+    for row in rows:
+        date = row["date"]
+        month = date.strftime("%Y-%m") if isinstance(date, datetime) else date[:7]
+        months.setdefault(month, []).append(row["sentimentScore"])
+        departments.setdefault(row["department"], []).append(row["sentimentScore"])
+        key = bson_date(date)
+        latest[row["department"]] = max(latest.get(row["department"], key), key)
+
+    newest = {}
+    for row in sorted(rows, key=lambda r: r["parsedDate"], reverse=True):
+        newest.setdefault(row["employeeId"], row)
+    negatives = sorted(
+        (row for row in newest.values() if row["sentimentScore"] < 0),
+        key=lambda row: row["sentimentScore"],
+    )
+    return {
+        "total": len(rows),
+        "positive": sum(row["sentimentScore"] > POSITIVE_THRESHOLD for row in rows),
+        "negative": sum(row["sentimentScore"] < 0 for row in rows),
+        "scoreSum": sum(row["sentimentScore"] for row in rows),
+        "months": [{"month": m, "sum": sum(v), "count": len(v)} for m, v in months.items()],
+        "departments": [
+            {"department": d, "sum": sum(departments[d]), "count": len(departments[d])}
+            for d in sorted(departments, key=latest.get, reverse=True)
+        ],
+        "employees": [
+            {key: row[key] for key in ("employeeId", "email", "name", "department", "date")}
+            | {"sentimentScore": row["sentimentScore"]}
+            for row in negatives
+        ],
+    }
+
+
+def rounded(value):
+    if isinstance(value, float):
+        return round(value, 9)
+    if isinstance(value, dict):
+        return {key: rounded(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [rounded(item) for item in value]
+    return value
+
+
+def assert_matches_raw(db, rollups):
+    departments = ["All Departments", "Unknown"] + [d for d in DEPARTMENTS if d]
+    for type_param, date_range, department in itertools.product(TYPES, DATE_RANGES, departments):
+        args = {"type": type_param, "dateRange": date_range, "department": department}
+        filters = sentiment_filters(args, now=NOW)
+        expected = raw_summary(db, *filters)
+        actual = rollups.summary(*filters)
+        if expected["total"] == 0:
+            assert actual["total"] == 0, args
+            continue
+        assert rounded(sentiment_response(actual)) == rounded(sentiment_response(expected)), args
+
+
+def feedback_for(employee, rng, dated):
+    when = NOW - timedelta(days=rng.uniform(0, 500), seconds=rng.randrange(86400))
+    if dated:
+        return {
+            "employee": employee["_id"],
+            "employeeId": employee["employeeId"],
+            "sentimentScore": rng.uniform(-1, 1),
+            "date": when.replace(microsecond=0),
+        }
+    # /analyze-sentiment stores the employee reference and date as strings
+    return {
+        "employee": str(employee["_id"]),
+        "sentimentScore": rng.uniform(-1, 1),
+        "date": when.isoformat(),
+    }
+
+
+@pytest.fixture
+def seeded(mongo_db):
+    rng = random.Random(11)
+    employees = []
+    for employee_id in range(1, 31):
+        employee = {"employeeId": employee_id, "name": f"E{employee_id}"}
+        employee["email"] = f"{employee_id}@example.com"
+        department = DEPARTMENTS[employee_id % len(DEPARTMENTS)]
+        if department is not None or employee_id % 8:
+            employee["department"] = department
+        employees.append(employee)
+    mongo_db["employees"].insert_many(employees)
+    employees = list(mongo_db["employees"].find())
+    feedback = [feedback_for(rng.choice(employees), rng, rng.random() < 0.8) for _ in range(300)]
+    return mongo_db, employees, feedback
+
+
+def rollups_for_test(db):
+    return SentimentRollups(
+        db["sentimentrollups"], db["sentimentemployeerollups"], db["sentimentrollupmeta"]
+    )
+
+
+def test_rollups_match_raw_after_rebuild_and_apply(seeded):
+    db, employees, feedback = seeded
+    rollups = rollups_for_test(db)
+    db["sentimentfeedbacks"].insert_many(feedback[:150])
+    assert rollups.rebuild(db["sentimentfeedbacks"], db["employees"]) == 150
+    assert rollups.ready()
+    assert_matches_raw(db, rollups)
+
+    by_id = {str(employee["_id"]): employee for employee in employees}
+    ingestor = FeedbackIngestor(db["employees"], db["sentimentfeedbacks"], None, None, rollups)
+    for start in range(150, 300, 50):
+        docs = feedback[start:start + 50]
+        ingestor.store(docs, [by_id[str(doc["employee"])] for doc in docs], {})
+    assert db["sentimentfeedbacks"].count_documents({}) == 300
+    assert_matches_raw(db, rollups)
+
+
+def test_rollups_match_raw_after_delete(seeded):
+    db, employees, feedback = seeded
+    rollups = rollups_for_test(db)
+    db["sentimentfeedbacks"].insert_many(feedback)
+    rollups.rebuild(db["sentimentfeedbacks"], db["employees"])
+
+    victim = employees[4]["employeeId"]
+    db["employees"].delete_one({"employeeId": victim})
+    rollups.remove_employee(victim)
+    assert not rollups.ready()
+    rollups.rebuild(db["sentimentfeedbacks"], db["employees"])
+    assert rollups.ready()
+    assert_matches_raw(db, rollups)
+
+
+def test_failed_apply_marks_rollups_dirty(seeded):
+    db, employees, feedback = seeded
+    rollups = rollups_for_test(db)
+    rollups.rebuild(db["sentimentfeedbacks"], db["employees"])
+
+    def broken(entries):
+        raise RuntimeError("bucket write failed")
+
+    rollups._fold = broken
+    ingestor = FeedbackIngestor(db["employees"], db["sentimentfeedbacks"], None, None, rollups)
+    by_id = {str(employee["_id"]): employee for employee in employees}
+    ingestor.store(feedback[:5], [by_id[str(doc["employee"])] for doc in feedback[:5]], {})
+    assert db["sentimentfeedbacks"].count_documents({}) == 5
+    assert not rollups.ready()
+
+    del rollups._fold
+    rollups.rebuild(db["sentimentfeedbacks"], db["employees"])
+    assert_matches_raw(db, rollups)
+
+
+def test_rebuild_waits_for_another_claim(seeded):
+    db, *_ = seeded
+    rollups = rollups_for_test(db)
+    db["sentimentrollupmeta"].insert_one(
+        {"_id": "rollups", "rebuilding": "other", "rebuildingSince": datetime.utcnow()}
+    )
+    assert rollups.rebuild(db["sentimentfeedbacks"], db["employees"]) is None
+    assert db["sentimentrollupmeta"].find_one({"_id": "rollups"})["rebuilding"] == "other"